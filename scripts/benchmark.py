@@ -0,0 +1,743 @@
+#!/usr/bin/env python3
+"""
+Wiki Guesser - Offline Benchmarks
+=================================
+Replays recorded Wikipedia, Gemini and Open Trivia DB responses
+(bench_fixtures/recorded.json) through a local stub server with injected
+latency and error rates, and measures the mining and import pipelines end
+to end: articles/sec, per-stage throughput and latency, peak RSS, and SQL
+emit (and optionally Postgres load) rates.
+
+Usage:
+    python benchmark.py run                                  # sizes 10 and 1000
+    python benchmark.py run --sizes 10,1000,100000 --scenarios miner-concurrent,sql-emit
+    python benchmark.py run --gemini-latency 1500 --error-rate 0.02 --real-limits
+    python benchmark.py compare bench_results/A.json bench_results/B.json --threshold 10
+    python benchmark.py record --titles "Apollo 11" "The Beatles"   # refresh fixtures
+
+Every scenario runs in its own subprocess against the stub server, so
+peak RSS and the metrics registry belong to that scenario alone. Results
+are written to bench_results/<timestamp>-<commit>.json; `compare` exits 1
+when any throughput drops (or peak RSS grows) by more than the threshold.
+
+The corpus is synthetic: article i is a recorded fixture with its title
+suffixed " (i)", so every summary, prompt and question is distinct and
+caches and the near-duplicate index behave as on real data.
+
+Requirements:
+    pip install -r requirements.txt   (the scenarios import miner.py)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Optional
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from urllib.request import Request, urlopen
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+FIXTURES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures", "recorded.json")
+RESULTS_DIR = "bench_results"
+
+DEFAULT_SIZES = "10,1000"  # Articles (or questions / rows) per scenario
+WIKI_LATENCY_MS = 60  # Injected per-request latency of the stub endpoints
+GEMINI_LATENCY_MS = 150
+OPENTDB_LATENCY_MS = 60
+LATENCY_JITTER = 0.2  # +/- fraction applied to every injected latency
+ERROR_RATE = 0.0  # Fraction of requests answered with 429 (Gemini, OpenTDB) or 503 (Wikipedia)
+STREAM_CHUNK_CHARS = 120  # Characters per chunk when a generation is streamed
+UNTHROTTLED_RATE = 1e6  # Limiter rate used unless --real-limits
+REGRESSION_THRESHOLD = 10.0  # Percent change flagged by `compare`
+
+SCENARIOS = {
+    "miner-serial": "miner.py, serial loop, cold cache",
+    "miner-concurrent": "miner.py --concurrent, cold cache",
+    "miner-replay": "miner.py re-run over a warm cache (no network)",
+    "miner-stream": "miner.py --stream, cold cache",
+    "opentdb": "opentdb_importer.py --exhaust",
+    "sql-emit": "write_table / write_csv_rows throughput",
+}
+
+WIKI_TITLE_RE = re.compile(r"^(.*) \((\d+)\)$")
+PROMPT_TITLE_RE = re.compile(r"\*\*Article Title:\*\* (.+)")
+
+
+def load_fixtures(path: str = FIXTURES_FILE) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def corpus_titles(fixtures: dict, count: int) -> list[str]:
+    """Synthetic article titles: recorded titles suffixed with their position."""
+    bases = [page["title"] for page in fixtures["wikipedia"]]
+    return [f"{bases[i % len(bases)]} ({i})" for i in range(count)]
+
+
+def split_title(title: str) -> tuple[str, Optional[int]]:
+    match = WIKI_TITLE_RE.match(title)
+    return (match.group(1), int(match.group(2))) if match else (title, None)
+
+
+# =============================================================================
+# STUB SERVER
+# =============================================================================
+
+class StubState:
+    """Recorded responses plus the latency / error injection settings."""
+
+    def __init__(self, fixtures: dict, latency_ms: dict[str, float], error_rate: float,
+                 opentdb_pool: int, seed: int = 0):
+        self.wikipedia = {page["title"]: page for page in fixtures["wikipedia"]}
+        self.gemini = {entry["title"]: entry for entry in fixtures["gemini"]}
+        self.gemini_order = list(fixtures["gemini"])
+        self.opentdb = fixtures["opentdb"]
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.opentdb_pool = opentdb_pool
+        self.tokens: dict[str, dict] = {}
+        self.requests: dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay_and_fail(self, route: str) -> bool:
+        """Sleep for the route's latency; True if this request should fail."""
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            jitter = self._rng.uniform(1 - LATENCY_JITTER, 1 + LATENCY_JITTER)
+            fail = self._rng.random() < self.error_rate
+        time.sleep(self.latency_ms.get(route, 0) * jitter / 1000)
+        return fail
+
+    # -------------------------------------------------------------------------
+    # MediaWiki Action API (formatversion=2)
+    # -------------------------------------------------------------------------
+
+    def wiki_page(self, title: str, with_extract: bool) -> dict:
+        if title.startswith("Missing"):
+            return {"title": title, "missing": True}
+        base, number = split_title(title)
+        recorded = self.wikipedia.get(base)
+        if recorded:
+            page = {"title": title, "lastrevid": recorded["lastrevid"] + (number or 0)}
+            extract = recorded["extract"].replace(base, title)
+        else:
+            page = {"title": title, "lastrevid": 1_000_000 + sum(map(ord, title))}
+            extract = f"{title} is a subject covered by Wikipedia."
+        if with_extract:
+            page["extract"] = extract
+        return page
+
+    def wiki_query(self, params: dict) -> dict:
+        titles = params.get("titles", "").split("|")
+        with_extracts = "extracts" in params.get("prop", "")
+        offset = int(params.get("excontinue", 0))
+        normalized, pages = [], []
+        for position, title in enumerate(titles):
+            if title[:1].islower():
+                normalized.append({"from": title, "to": title[0].upper() + title[1:]})
+                title = title[0].upper() + title[1:]
+            # Like the real API, at most 20 intro extracts per response
+            pages.append(self.wiki_page(title, with_extracts and offset <= position < offset + 20))
+        data = {"batchcomplete": True, "query": {"normalized": normalized, "pages": pages}}
+        if with_extracts and offset + 20 < len(titles):
+            data = {"continue": {"excontinue": offset + 20, "continue": "||"}, "query": data["query"]}
+        return data
+
+    # -------------------------------------------------------------------------
+    # Gemini
+    # -------------------------------------------------------------------------
+
+    def recorded_generation(self, title: str) -> tuple[str, dict]:
+        base, number = split_title(title)
+        entry = self.gemini.get(base) or self.gemini_order[(number or 0) % len(self.gemini_order)]
+        return entry["response"].replace(entry["title"], title), entry["usage"]
+
+    def gemini_generate(self, prompt: str) -> dict:
+        titles = PROMPT_TITLE_RE.findall(prompt)
+        if "### Article" not in prompt:
+            text, usage = self.recorded_generation(titles[0] if titles else "")
+            return {"text": text, "usage": usage}
+        items, usage = [], {"prompt_token_count": 0, "candidates_token_count": 0}
+        for title in titles:
+            text, item_usage = self.recorded_generation(title)
+            body = text.strip().removeprefix("```json").removesuffix("```")
+            items.append({"title": title, **json.loads(body)})
+            for key in usage:
+                usage[key] += item_usage.get(key, 0)
+        return {"text": json.dumps(items), "usage": usage}
+
+    # -------------------------------------------------------------------------
+    # Open Trivia DB
+    # -------------------------------------------------------------------------
+
+    def opentdb_token(self) -> dict:
+        with self._lock:
+            token = f"bench{len(self.tokens)}"
+            self.tokens[token] = {}
+        return {"response_code": 0, "response_message": "Token Generated Successfully!", "token": token}
+
+    def opentdb_count(self, params: dict) -> dict:
+        counts = {f"total_{difficulty}_question_count": self.opentdb_pool for difficulty in ("easy", "medium", "hard")}
+        return {"category_id": int(params.get("category", 0)),
+                "category_question_count": {"total_question_count": 3 * self.opentdb_pool, **counts}}
+
+    def opentdb_page(self, params: dict) -> dict:
+        amount = int(params.get("amount", 10))
+        pool = (params.get("category", ""), params.get("difficulty", ""))
+        with self._lock:
+            served = self.tokens.get(params.get("token"))
+            if params.get("token") and served is None:
+                return {"response_code": 3, "results": []}
+            start = served.get(pool, 0) if served is not None else 0
+            remaining = self.opentdb_pool - start
+            if remaining <= 0:
+                return {"response_code": 4, "results": []}
+            if remaining < amount:
+                return {"response_code": 1, "results": []}
+            if served is not None:
+                served[pool] = start + amount
+        results = []
+        for n in range(start, start + amount):
+            recorded = self.opentdb[n % len(self.opentdb)]
+            question = unquote(recorded["question"]).rstrip(".?") + f" ({'-'.join(pool)}-{n})?"
+            results.append({**recorded, "question": quote(question, safe="")})
+        return {"response_code": 0, "results": results}
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, as WikiClient expects
+
+        def reply(self, status: int, payload: Optional[dict] = None) -> None:
+            body = json.dumps(payload or {"error": status}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+            if parts.path == "/w/api.php":
+                if state.delay_and_fail("wiki"):
+                    return self.reply(503)
+                return self.reply(200, state.wiki_query(params))
+            if parts.path in ("/opentdb/api.php", "/opentdb/api_token.php", "/opentdb/api_count.php"):
+                if state.delay_and_fail("opentdb"):
+                    return self.reply(429)
+                if parts.path.endswith("api_token.php"):
+                    return self.reply(200, state.opentdb_token())
+                if parts.path.endswith("api_count.php"):
+                    return self.reply(200, state.opentdb_count(params))
+                return self.reply(200, state.opentdb_page(params))
+            self.reply(404)
+
+        def do_POST(self):
+            prompt = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+            if self.path != "/gemini":
+                return self.reply(404)
+            if state.delay_and_fail("gemini"):
+                return self.reply(429)
+            self.reply(200, state.gemini_generate(prompt))
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_stub_server(state: StubState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class ReplayModel:
+    """
+    Stands in for genai.GenerativeModel: generate_content() asks the stub
+    server, which answers with the recorded response for the prompt's titles.
+    """
+
+    def __init__(self, stub_url: str, google_exceptions=None):
+        self.url = stub_url + "/gemini"
+        self.google_exceptions = google_exceptions
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        request = Request(self.url, data=prompt.encode("utf-8"), method="POST")
+        try:
+            with urlopen(request, timeout=60) as response:
+                data = json.loads(response.read().decode("utf-8"))
+        except HTTPError as e:
+            if e.code == 429 and self.google_exceptions is not None:
+                raise self.google_exceptions.TooManyRequests("429 Resource has been exhausted (quota)") from e
+            raise Exception(f"{e.code} Resource has been exhausted (quota)") from e
+        if stream:
+            text = data["text"]
+            chunks = [SimpleNamespace(text=text[i:i + STREAM_CHUNK_CHARS], usage_metadata=None)
+                      for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+            chunks[-1].usage_metadata = SimpleNamespace(**data["usage"])
+            return iter(chunks)
+        return SimpleNamespace(text=data["text"], usage_metadata=SimpleNamespace(**data["usage"]))
+
+
+# =============================================================================
+# SCENARIOS (each runs in a child process)
+# =============================================================================
+
+def unthrottle(limiter) -> None:
+    """Take a TokenBucket out of the measurement."""
+    limiter.rate = limiter.max_rate = limiter.capacity = UNTHROTTLED_RATE
+    limiter.min_rate = UNTHROTTLED_RATE / 8
+
+
+def peak_rss_mb() -> dict:
+    if not RESOURCE_AVAILABLE:
+        return {}
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KiB on Linux
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def stage_summary(snapshot: dict, elapsed: float) -> dict:
+    stages = {}
+    for stage in snapshot["stages"]:
+        name = stage["name"] + "".join(f"[{value}]" for value in stage["labels"].values())
+        stages[name] = {
+            "count": stage["count"],
+            "per_second": stage["count"] / elapsed if elapsed else 0.0,
+            "total_seconds": stage["sum"],
+            "p50_ms": stage["p50"] * 1000,
+            "p95_ms": stage["p95"] * 1000,
+            "p99_ms": stage["p99"] * 1000,
+        }
+    return stages
+
+
+def metric_values(entries: list[dict], name: str) -> float:
+    return sum(entry["value"] for entry in entries if entry["name"] == name)
+
+
+def run_miner(name: str, size: int, args: argparse.Namespace, workdir: str) -> dict:
+    os.environ["WIKI_API_URL"] = args.stub_url + "/w/api.php"
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    import miner
+    from metrics import metrics
+
+    fixtures = load_fixtures()
+    miner.initialize_gemini = lambda *a, **k: ReplayModel(args.stub_url, miner.google_exceptions)
+    miner.get_top_articles = lambda count, language="en", *window: corpus_titles(fixtures, count)
+    if not args.real_limits:
+        unthrottle(miner.gemini_limiter)
+
+    argv = [
+        "--max-articles", str(size),
+        "--output", os.path.join(workdir, "seed_generated.sql"),
+        "--cache", os.path.join(workdir, "cache.sqlite3"),
+        "--dedup-index", os.path.join(workdir, "dedup.sqlite3"),
+        # Keep fixture articles out of the real ledger, routing stats and connection pool
+        "--ledger", os.path.join(workdir, "mined.sqlite3"),
+        "--route-stats", os.path.join(workdir, "router_stats.json"),
+        "--connection-pool", os.path.join(workdir, "connection_pool.json"),
+        "--workers", str(args.workers),
+        "--gemini-batch", str(args.gemini_batch),
+    ]
+    if not args.dedup:
+        argv.append("--no-dedup")
+    if name == "miner-concurrent":
+        argv.append("--concurrent")
+    if name == "miner-stream":
+        argv.append("--stream")
+
+    def run_main(runs_dir: str) -> float:
+        sys.argv = ["miner.py", *argv, "--runs-dir", os.path.join(workdir, runs_dir)]
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            miner.main()
+        return time.perf_counter() - start
+
+    if name == "miner-replay":
+        run_main("warmup")  # Fill the cache; only the second run is measured
+        metrics.reset()
+    elapsed = run_main("runs")
+
+    snapshot = metrics.snapshot()
+    articles = metric_values(snapshot["gauges"], "articles.succeeded")
+    questions = metric_values(snapshot["gauges"], "questions")
+    write_seconds = next((s["sum"] for s in snapshot["stages"] if s["name"] == "output.write"), 0.0)
+    return {
+        "seconds": elapsed,
+        "counts": {"articles": articles, "questions": questions},
+        "throughput": {
+            "articles_per_second": articles / elapsed if elapsed else 0.0,
+            "sql_rows_per_second": questions / write_seconds if write_seconds else 0.0,
+        },
+        "stages": stage_summary(snapshot, elapsed),
+        "counters": {
+            entry["name"] + "".join(f"[{value}]" for value in entry["labels"].values()): entry["value"]
+            for entry in snapshot["counters"]
+        },
+    }
+
+
+def run_opentdb(size: int, args: argparse.Namespace, workdir: str) -> dict:
+    import opentdb_importer
+
+    opentdb_importer.API_BASE = args.stub_url + "/opentdb/api.php"
+    opentdb_importer.TOKEN_URL = args.stub_url + "/opentdb/api_token.php"
+    opentdb_importer.COUNT_URL = args.stub_url + "/opentdb/api_count.php"
+    if not args.real_limits:
+        unthrottle(opentdb_importer.opentdb_limiter)
+    output = os.path.join(workdir, "seed_opentdb.sql")
+    sys.argv = ["opentdb_importer.py", "--exhaust", "--output", output,
+                "--dedup-index", os.path.join(workdir, "dedup.sqlite3")]
+    if not args.dedup:
+        sys.argv.append("--no-dedup")
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        opentdb_importer.main()
+    elapsed = time.perf_counter() - start
+
+    with open(output, encoding="utf-8") as f:
+        match = re.search(r"^-- Total questions: (\d+)$", f.read(), re.MULTILINE)
+    questions = int(match.group(1)) if match else 0
+    return {
+        "seconds": elapsed,
+        "counts": {"questions": questions},
+        "throughput": {"questions_per_second": questions / elapsed if elapsed else 0.0},
+    }
+
+
+def synthetic_rows(size: int) -> dict[str, list[tuple]]:
+    """`size` rows per category, built from the recorded generations."""
+    from postprocess import build_wikipedia_url, questions_to_rows
+
+    fixtures = load_fixtures()
+    rows: dict[str, list[tuple]] = {}
+    for n, title in enumerate(corpus_titles(fixtures, size)):
+        entry = fixtures["gemini"][n % len(fixtures["gemini"])]
+        text = entry["response"].replace(entry["title"], title).strip()
+        questions = json.loads(text.removeprefix("```json").removesuffix("```"))
+        for category, row in questions_to_rows(questions, build_wikipedia_url(title)).items():
+            rows.setdefault(category, []).append(row)
+    return rows
+
+
+def run_sql_emit(size: int, args: argparse.Namespace, workdir: str) -> dict:
+    from sql_writer import write_csv_rows, write_table
+
+    rows = synthetic_rows(size)
+    total = sum(len(category_rows) for category_rows in rows.values())
+    throughput, seconds = {}, 0.0
+    variants = [("insert", 1), ("insert", 500), ("copy", 1), ("csv", 1)]
+    for fmt, batch_size in variants:
+        path = os.path.join(workdir, f"emit.{fmt}")
+        start = time.perf_counter()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for category, category_rows in rows.items():
+                if fmt == "csv":
+                    write_csv_rows(f, category, category_rows, header=True)
+                else:
+                    write_table(f, category, category_rows, fmt, batch_size)
+        elapsed = time.perf_counter() - start
+        seconds += elapsed
+        label = f"{fmt}_batch{batch_size}" if fmt == "insert" else fmt
+        throughput[f"{label}_rows_per_second"] = total / elapsed if elapsed else 0.0
+
+    if args.database_url:
+        from loader import PostgresLoader
+
+        loader = PostgresLoader(args.database_url, method="copy")
+        try:
+            report = loader.load_all(rows)
+        finally:
+            loader.close()
+        seconds += report["seconds"]
+        throughput["load_rows_per_second"] = report["rows_per_second"]
+    return {"seconds": seconds, "counts": {"rows": total}, "throughput": throughput}
+
+
+def run_scenario(args: argparse.Namespace) -> None:
+    """Child process entry point: run one scenario and print its result as JSON."""
+    workdir = tempfile.mkdtemp(prefix=f"bench-{args.name}-")
+    if args.name == "opentdb":
+        result = run_opentdb(args.size, args, workdir)
+    elif args.name == "sql-emit":
+        result = run_sql_emit(args.size, args, workdir)
+    else:
+        result = run_miner(args.name, args.size, args, workdir)
+    result.update(peak_rss_mb())
+    print(json.dumps(result))
+
+
+# =============================================================================
+# HARNESS
+# =============================================================================
+
+def git_commit() -> str:
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, check=True, cwd=repo).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, cwd=repo).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> dict:
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_benchmarks(args: argparse.Namespace) -> None:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenario(s): {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    print("=" * 60)
+    print("🎮 Wiki Guesser - Offline Benchmarks")
+    print("=" * 60)
+    env = environment()
+    config = {
+        "latency_ms": {"wiki": args.wiki_latency, "gemini": args.gemini_latency, "opentdb": args.opentdb_latency},
+        "error_rate": args.error_rate,
+        "real_limits": args.real_limits,
+        "workers": args.workers,
+        "gemini_batch": args.gemini_batch,
+        "dedup": args.dedup,
+        "seed": args.seed,
+    }
+    results = []
+    for size in sizes:
+        # OpenTDB pools are per category x difficulty (10 x 3)
+        state = StubState(load_fixtures(), config["latency_ms"], args.error_rate,
+                          opentdb_pool=max(1, -(-size // 30)), seed=args.seed)
+        server = start_stub_server(state)
+        stub_url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            for name in names:
+                print(f"\n⏱️ {name} x {size}: {SCENARIOS[name]}")
+                command = [
+                    sys.executable, os.path.abspath(__file__), "scenario", name,
+                    "--size", str(size), "--stub-url", stub_url,
+                    "--workers", str(args.workers), "--gemini-batch", str(args.gemini_batch),
+                ]
+                command += ["--real-limits"] if args.real_limits else []
+                command += ["--dedup"] if args.dedup else []
+                command += ["--database-url", args.database_url] if args.database_url else []
+                child = subprocess.run(command, capture_output=True, text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)))
+                if child.returncode != 0:
+                    print(f"   ❌ Failed:\n{child.stderr.strip()}")
+                    continue
+                result = {"scenario": name, "size": size, **json.loads(child.stdout.strip().splitlines()[-1])}
+                results.append(result)
+                print_result(result)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{env['commit']}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "created": datetime.now().isoformat(), "environment": env,
+                   "config": config, "results": results}, f, indent=2)
+    print(f"\n✅ Results written to: {output}")
+    print("=" * 60)
+
+
+def print_result(result: dict) -> None:
+    for metric, value in result["throughput"].items():
+        print(f"   📈 {metric}: {value:,.1f}")
+    print(f"   ⏲️ {result['seconds']:.2f}s, peak RSS {result.get('peak_rss_mb', 0):.0f} MB")
+    for stage, stats in result.get("stages", {}).items():
+        print(f"   ⏱️ {stage}: {stats['count']} calls, {stats['per_second']:.1f}/s, "
+              f"p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms")
+
+
+# =============================================================================
+# COMPARE
+# =============================================================================
+
+def compare_results(baseline_path: str, candidate_path: str, threshold: float) -> int:
+    """Print per-metric changes; returns the number of regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(candidate_path, encoding="utf-8") as f:
+        candidate = json.load(f)
+    before = {(r["scenario"], r["size"]): r for r in baseline["results"]}
+
+    print(f"Baseline:  {baseline['environment']['commit']} ({baseline['created']})")
+    print(f"Candidate: {candidate['environment']['commit']} ({candidate['created']})")
+    if baseline["config"] != candidate["config"]:
+        print("⚠️ Benchmark settings differ; changes may not be comparable")
+    regressions = 0
+    for result in candidate["results"]:
+        old = before.get((result["scenario"], result["size"]))
+        if not old:
+            continue
+        print(f"\n{result['scenario']} x {result['size']}")
+        # (metric, old, new, higher is better)
+        pairs = [(metric, old["throughput"].get(metric), value, True)
+                 for metric, value in result["throughput"].items()]
+        pairs.append(("peak_rss_mb", old.get("peak_rss_mb"), result.get("peak_rss_mb"), False))
+        for metric, old_value, new_value, higher_is_better in pairs:
+            if not old_value or new_value is None:
+                continue
+            change = (new_value - old_value) / old_value * 100
+            worse = -change if higher_is_better else change
+            flag = "❌" if worse > threshold else "✅"
+            regressions += worse > threshold
+            print(f"   {flag} {metric}: {old_value:,.1f} -> {new_value:,.1f} ({change:+.1f}%)")
+    print(f"\n{regressions} regression(s) beyond {threshold:.0f}%")
+    return regressions
+
+
+# =============================================================================
+# RECORD
+# =============================================================================
+
+def record_fixtures(args: argparse.Namespace) -> None:
+    """Capture real responses for `titles` into the fixtures file."""
+    import miner
+    import opentdb_importer
+    from wiki_client import get_client
+
+    fixtures = load_fixtures() if os.path.exists(args.fixtures) else {}
+    pages = get_client().fetch_summaries(args.titles)
+    fixtures["wikipedia"] = [
+        {"title": page["title"], "lastrevid": page["revision"], "extract": page["summary"]}
+        for page in pages.values() if page
+    ]
+    print(f"✅ Recorded {len(fixtures['wikipedia'])} Wikipedia extracts")
+
+    model = miner.initialize_gemini()
+    if model:
+        captured = []
+        generate_content = model.generate_content
+
+        def capture(prompt, *a, **k):
+            response = generate_content(prompt, *a, **k)
+            usage = getattr(response, "usage_metadata", None)
+            captured.append({"response": response.text, "usage": {
+                "prompt_token_count": getattr(usage, "prompt_token_count", 0),
+                "candidates_token_count": getattr(usage, "candidates_token_count", 0),
+            }})
+            return response
+
+        model.generate_content = capture
+        fixtures["gemini"] = []
+        for page in fixtures["wikipedia"]:
+            captured.clear()
+            if miner.generate_questions(model, page["title"], miner.truncate_words(page["extract"], 500)):
+                fixtures["gemini"].append({"title": page["title"], **captured[-1]})
+        print(f"✅ Recorded {len(fixtures['gemini'])} Gemini responses")
+
+    code, results = opentdb_importer.fetch_page(next(iter(opentdb_importer.CATEGORIES)), 10)
+    if code == opentdb_importer.CODE_SUCCESS:
+        fixtures["opentdb"] = results
+        print(f"✅ Recorded {len(results)} Open Trivia DB questions")
+
+    with open(args.fixtures, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"📁 Fixtures written to: {args.fixtures}")
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def add_scenario_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--workers", type=int, default=1, help="miner.py --workers (post-processing processes)")
+    parser.add_argument("--gemini-batch", type=int, default=1, help="miner.py --gemini-batch")
+    parser.add_argument("--real-limits", action="store_true",
+                        help="Keep the configured rate limits (default: unthrottled, to measure the pipeline)")
+    parser.add_argument("--dedup", action="store_true", help="Enable the near-duplicate index")
+    parser.add_argument("--database-url", default=None,
+                        help="Also measure Postgres loads (inserts rows - use a scratch database)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the mining and import pipelines offline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run scenarios and write a results file")
+    run.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated sizes (default: {DEFAULT_SIZES})")
+    run.add_argument("--scenarios", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    run.add_argument("--wiki-latency", type=float, default=WIKI_LATENCY_MS, help="Injected Wikipedia latency (ms)")
+    run.add_argument("--gemini-latency", type=float, default=GEMINI_LATENCY_MS, help="Injected Gemini latency (ms)")
+    run.add_argument("--opentdb-latency", type=float, default=OPENTDB_LATENCY_MS,
+                     help="Injected Open Trivia DB latency (ms)")
+    run.add_argument("--error-rate", type=float, default=ERROR_RATE, help="Fraction of requests that fail")
+    run.add_argument("--seed", type=int, default=0, help="Seed for latency jitter and error injection")
+    run.add_argument("--output", help="Results file (default: bench_results/<timestamp>-<commit>.json)")
+    add_scenario_options(run)
+
+    scenario = commands.add_parser("scenario", help=argparse.SUPPRESS)
+    scenario.add_argument("name", choices=list(SCENARIOS))
+    scenario.add_argument("--size", type=int, required=True)
+    scenario.add_argument("--stub-url", required=True)
+    add_scenario_options(scenario)
+
+    compare = commands.add_parser("compare", help="Compare two results files")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                         help=f"Percent change treated as a regression (default: {REGRESSION_THRESHOLD:.0f})")
+
+    record = commands.add_parser("record", help="Refresh the fixtures from the live APIs")
+    record.add_argument("--titles", nargs="+", required=True, help="Wikipedia articles to record")
+    record.add_argument("--fixtures", default=FIXTURES_FILE)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "run":
+        run_benchmarks(args)
+    elif args.command == "scenario":
+        run_scenario(args)
+    elif args.command == "compare":
+        sys.exit(1 if compare_results(args.baseline, args.candidate, args.threshold) else 0)
+    elif args.command == "record":
+        record_fixtures(args)
+
+
+if __name__ == "__main__":
+    main()
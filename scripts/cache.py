@@ -0,0 +1,141 @@
+"""
+Wiki Guesser - Persistent Response Cache
+========================================
+SQLite-backed, content-addressed cache for Wikipedia summaries and Gemini
+generations, so warm re-runs of miner.py (and prompt-only experiments)
+make no network calls.
+
+Keys are SHA-256 digests of the inputs that determine a response:
+    summaries   - (language, title, revision id)
+    generations - (model, system prompt hash, prompt hash, generation config)
+
+Entries expire after a TTL, and the least recently used entries are evicted
+once the cache grows past its size limit. Each namespace keeps hit/miss
+counters for the run summary.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Optional
+
+DEFAULT_CACHE_PATH = ".miner_cache.sqlite3"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+
+def content_key(*parts: Any) -> str:
+    """Stable SHA-256 digest of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Key/value cache in a single SQLite file. Safe to share between threads.
+    `ttl` is the default lifetime in seconds (None = never expire) and
+    `max_bytes` bounds the total size of stored values.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses[namespace] += 1
+                return None
+            self._db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+            self.hits[namespace] += 1
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value, evicting old entries if needed."""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        with self._lock:
+            old = self._db.execute(
+                "SELECT size FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, payload, size, now + ttl if ttl else None, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones down to 90% of max_bytes."""
+        self._db.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        if self._total_bytes <= target:
+            return
+        freed = 0
+        doomed = []
+        for namespace, key, size in self._db.execute(
+            "SELECT namespace, key, size FROM entries ORDER BY accessed_at"
+        ):
+            doomed.append((namespace, key))
+            freed += size
+            if self._total_bytes - freed <= target:
+                break
+        self._db.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", doomed)
+        self._total_bytes -= freed
+
+    def stats(self) -> dict:
+        """Hit/miss counters per namespace."""
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            ns: {
+                "hits": self.hits[ns],
+                "misses": self.misses[ns],
+                "hit_rate": self.hits[ns] / max(1, self.hits[ns] + self.misses[ns]),
+            }
+            for ns in namespaces
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
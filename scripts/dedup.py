@@ -0,0 +1,268 @@
+"""
+Wiki Guesser - Near-Duplicate Question Index
+============================================
+Persistent MinHash/LSH index over normalized question text, shared by
+miner.py and opentdb_importer.py so the same (or nearly the same) question
+is never inserted twice across runs and sources.
+
+Each question is reduced to the text that identifies it (the statement, the
+event, the four items/titles plus the connection), normalized, cut into
+character shingles and summarized by a MinHash signature. The signature is
+split into LSH bands stored in an indexed SQLite table, so a lookup touches
+only the handful of questions that share a band with the new one - the cost
+per question stays flat with hundreds of thousands of questions indexed.
+Candidates are confirmed by their estimated Jaccard similarity.
+
+Usage:
+    python dedup.py seed ../supabase/*.sql seed_opentdb.sql
+    python dedup.py stats
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import struct
+import threading
+import unicodedata
+from array import array
+from typing import Optional
+
+from sql_writer import QUESTION_TABLES, columns_for, iter_sql_rows, row_from_values
+
+DEFAULT_INDEX_PATH = ".dedup_index.sqlite3"
+
+NUM_PERM = 64  # MinHash signature length
+BANDS = 16  # LSH bands (NUM_PERM / BANDS rows each)
+SHINGLE_SIZE = 5  # Characters per shingle
+SIMILARITY_THRESHOLD = 0.6  # Estimated Jaccard at or above this is a duplicate
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _permutations(count: int) -> list[tuple[int, int]]:
+    """Deterministic (a, b) pairs for the universal hash family."""
+    pairs = []
+    for i in range(count):
+        digest = hashlib.blake2b(f"wiki-guesser-minhash-{i}".encode(), digest_size=16).digest()
+        a, b = struct.unpack("<QQ", digest)
+        pairs.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+    return pairs
+
+
+_PERMUTATIONS = _permutations(NUM_PERM)
+
+
+# =============================================================================
+# TEXT NORMALIZATION
+# =============================================================================
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def question_text(category: str, row: tuple) -> str:
+    """The text that identifies a question, from its table row."""
+    values = dict(zip(columns_for(category), row))
+    if category == "odd_wiki_out":
+        return " | ".join(sorted(map(str, values.get("items") or []))) + " | " + str(values.get("connection") or "")
+    if category == "when_in_wiki":
+        return str(values.get("event") or "")
+    if category == "wiki_or_fiction":
+        return str(values.get("statement") or "")
+    if category == "wiki_links":
+        return " | ".join(sorted(map(str, values.get("titles") or []))) + " | " + str(values.get("connection") or "")
+    raise ValueError(f"Unknown category: {category}")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash(text: str) -> array:
+    """MinHash signature (NUM_PERM unsigned 32-bit values) of normalized text."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles(text)
+    ]
+    signature = array("I")
+    for a, b in _PERMUTATIONS:
+        signature.append(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes))
+    return signature
+
+
+def band_hashes(signature: array) -> list[int]:
+    """One 63-bit hash per LSH band."""
+    rows = len(signature) // BANDS
+    result = []
+    for band in range(BANDS):
+        chunk = signature[band * rows:(band + 1) * rows].tobytes()
+        result.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little") >> 1)
+    return result
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+# =============================================================================
+# PERSISTENT INDEX
+# =============================================================================
+
+class DedupIndex:
+    """
+    SQLite-backed LSH index. `check` finds a near-duplicate without adding
+    anything; `add_if_new` checks and records in one step.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, threshold: float = SIMILARITY_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.rejected = 0
+        self.accepted = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                category TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                source TEXT,
+                text TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                UNIQUE (category, fingerprint)
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                category TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                hash INTEGER NOT NULL,
+                question_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_buckets_lookup ON buckets(category, band, hash);
+        """)
+
+    def _find(self, category: str, normalized: str, signature: array) -> Optional[dict]:
+        fingerprint = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        row = self._db.execute(
+            "SELECT id, source, text FROM questions WHERE category = ? AND fingerprint = ?",
+            (category, fingerprint),
+        ).fetchone()
+        if row:
+            return {"id": row[0], "source": row[1], "text": row[2], "similarity": 1.0}
+
+        candidates = set()
+        for band, value in enumerate(band_hashes(signature)):
+            for (question_id,) in self._db.execute(
+                "SELECT question_id FROM buckets WHERE category = ? AND band = ? AND hash = ?",
+                (category, band, value),
+            ):
+                candidates.add(question_id)
+        best = None
+        for question_id in candidates:
+            source, text, blob = self._db.execute(
+                "SELECT source, text, signature FROM questions WHERE id = ?", (question_id,)
+            ).fetchone()
+            other = array("I")
+            other.frombytes(blob)
+            score = similarity(signature, other)
+            if score >= self.threshold and (best is None or score > best["similarity"]):
+                best = {"id": question_id, "source": source, "text": text, "similarity": score}
+        return best
+
+    def check(self, category: str, row: tuple) -> Optional[dict]:
+        """Return the closest indexed near-duplicate of a question row, if any."""
+        normalized = normalize_text(question_text(category, row))
+        with self._lock:
+            return self._find(category, normalized, minhash(normalized))
+
+    def add_if_new(self, category: str, row: tuple, source: str = "") -> Optional[dict]:
+        """
+        Index a question unless a near-duplicate from a different source is
+        already indexed. Returns that duplicate (rejected) or None (added).
+        A match with the same `source` counts as new, so replaying an
+        article after a crash does not reject its own questions.
+        """
+        normalized = normalize_text(question_text(category, row))
+        signature = minhash(normalized)
+        with self._lock:
+            match = self._find(category, normalized, signature)
+            if match:
+                if match["source"] == source and source:
+                    self.accepted += 1
+                    return None
+                self.rejected += 1
+                return match
+            fingerprint = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+            cursor = self._db.execute(
+                "INSERT INTO questions (category, fingerprint, source, text, signature) VALUES (?, ?, ?, ?, ?)",
+                (category, fingerprint, source, normalized, signature.tobytes()),
+            )
+            self._db.executemany(
+                "INSERT INTO buckets VALUES (?, ?, ?, ?)",
+                [(category, band, value, cursor.lastrowid)
+                 for band, value in enumerate(band_hashes(signature))],
+            )
+            self._db.commit()
+            self.accepted += 1
+            return None
+
+    def filter_rows(self, rows: dict, source: str = "") -> dict:
+        """Drop near-duplicate rows from a {category: row} mapping."""
+        return {
+            category: row for category, row in rows.items()
+            if self.add_if_new(category, row, source) is None
+        }
+
+    def seed_from_sql(self, path: str) -> tuple[int, int]:
+        """Index every question in a seed .sql file. Returns (added, duplicates)."""
+        added = duplicates = 0
+        for category, values in iter_sql_rows(path):
+            if self.add_if_new(category, row_from_values(category, values), source=f"seed:{path}") is None:
+                added += 1
+            else:
+                duplicates += 1
+        return added, duplicates
+
+    def counts(self) -> dict:
+        return dict(self._db.execute("SELECT category, COUNT(*) FROM questions GROUP BY category").fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser near-duplicate index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    seed = sub.add_parser("seed", help="Index questions from existing .sql seed files")
+    seed.add_argument("files", nargs="+")
+    sub.add_parser("stats", help="Show indexed questions per category")
+    args = parser.parse_args()
+
+    index = DedupIndex(args.index)
+    if args.command == "seed":
+        for path in args.files:
+            added, duplicates = index.seed_from_sql(path)
+            print(f"📥 {path}: {added} indexed (or already present), {duplicates} near-duplicates")
+    for category in QUESTION_TABLES:
+        print(f"   {category}: {index.counts().get(category, 0)} questions")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
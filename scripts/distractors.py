@@ -0,0 +1,350 @@
+"""
+Wiki Guesser - Local Distractor Engine
+======================================
+Makes the wrong answers locally instead of having Gemini write them, so
+responses are shorter and the decoys do not give the answer away:
+
+    when_in_wiki.year_options        - the correct year plus 3 years sampled
+                                       around it (never duplicated, never in
+                                       the future), with a spread that grows
+                                       with the event's age
+    wiki_links.connection_options    - the correct connection plus 3 real
+                                       connections from other questions on
+                                       the same topic
+
+Years are drawn in one weighted batch from a precomputed offset table
+(closer years more likely, round years favoured when the answer is round),
+and the correct year lands at a random rank among the four, so "pick the
+middle one" stops working. Connection decoys come from a pool built from
+the existing questions (`build`), grouped by topic; candidates that
+overlap the correct answer are skipped and ones of similar length are
+preferred. Every choice is seeded by the question's text, so regenerating
+a question gives the same options (for connections, from the same pool).
+
+With `miner.py --local-distractors` the prompt stops asking for
+year_options and connection_options and this module fills them in.
+
+Usage:
+    python distractors.py build --sql ../supabase/seed_all_categories.sql seed_opentdb.sql
+    python distractors.py build --database      # from the live tables (DATABASE_URL)
+    python distractors.py stats
+"""
+
+import argparse
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from dedup import normalize_text
+from scheduler import OTHER_TOPIC, canonical_topic, classify
+from sql_writer import iter_sql_rows, table_for
+
+try:
+    import psycopg2
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+DEFAULT_POOL_PATH = ".connection_pool.json"
+OPTION_COUNT = 4
+
+# Fields the engine fills in, per category
+DISTRACTOR_FIELDS = {"when_in_wiki": "year_options", "wiki_links": "connection_options"}
+
+MIN_YEAR_SPREAD = 3  # Typical distance of a distractor year from the answer, in years...
+MAX_YEAR_SPREAD = 40
+YEAR_SPREAD_RATIO = 0.08  # ...as a fraction of the event's age
+ROUND_YEAR_BONUS = 3.0  # Weight multiplier for round decoys when the answer is round
+MIN_POOL_SIZE = 12  # Connections needed before --local-distractors can be used
+MAX_DECOY_OVERLAP = 0.5  # Decoys sharing more of their words with the answer are skipped
+
+
+def seed_for(*parts: str) -> int:
+    return int.from_bytes(hashlib.sha256("\x1f".join(parts).encode("utf-8")).digest()[:8], "big")
+
+
+# =============================================================================
+# YEARS
+# =============================================================================
+
+@lru_cache(maxsize=256)
+def _offset_table(spread: int, round_answer: bool) -> tuple[tuple[int, ...], tuple[float, ...]]:
+    """Offsets 1..4*spread (each direction is drawn separately) and their weights."""
+    offsets = tuple(range(1, 4 * spread + 1))
+    weights = tuple(
+        math.exp(-offset / spread) * (ROUND_YEAR_BONUS if round_answer and offset % 5 == 0 else 1.0)
+        for offset in offsets
+    )
+    return offsets, weights
+
+
+def _take(years: list[int], wanted: int, taken: set[int]) -> list[int]:
+    """The first `wanted` distinct years not already taken."""
+    picked = []
+    for year in years:
+        if len(picked) >= wanted:
+            break
+        if year not in taken:
+            picked.append(year)
+            taken.add(year)
+    return picked
+
+
+def year_options(correct_year: int, key: str, latest: Optional[int] = None,
+                 count: int = OPTION_COUNT) -> list[int]:
+    """`count` sorted, distinct, non-future years including `correct_year`."""
+    latest = latest or datetime.now().year
+    rng = random.Random(seed_for("year", key))
+    age = max(1, latest - correct_year)
+    spread = min(MAX_YEAR_SPREAD, max(MIN_YEAR_SPREAD, round(age * YEAR_SPREAD_RATIO)))
+    offsets, weights = _offset_table(spread, correct_year % 5 == 0)
+
+    below = rng.randrange(count)  # How many options come before the answer
+    earlier = [correct_year - offset for offset in rng.choices(offsets, weights, k=4 * count)]
+    later = [correct_year + offset for offset in rng.choices(offsets, weights, k=4 * count)
+             if correct_year + offset <= latest]
+    chosen = _take(earlier, below, set())
+    chosen += _take(later, count - 1 - below, set(chosen))
+    # Recent answers leave little room after them: make up the rest from before
+    chosen += _take(earlier + [correct_year - step for step in range(1, 4 * count)],
+                    count - 1 - len(chosen), set(chosen))
+    return sorted(chosen + [correct_year])
+
+
+# =============================================================================
+# CONNECTION POOL
+# =============================================================================
+
+def pool_topic(connection: str, topic: Optional[str]) -> str:
+    """The pool bucket of a connection: its question's topic, else a guess from its text."""
+    bucket = canonical_topic(topic)
+    return bucket if bucket != OTHER_TOPIC else classify(connection)
+
+
+def iter_sql_connections(paths: Iterable[str]) -> Iterable[tuple[str, Optional[str]]]:
+    """(connection, topic) from the wiki_links and odd_wiki_out rows of seed .sql files."""
+    for path in paths:
+        for category, values in iter_sql_rows(path):
+            if category == "wiki_links":
+                for option in values.get("connection_options") or []:
+                    yield option, values.get("topic")
+            if category in ("wiki_links", "odd_wiki_out") and values.get("connection"):
+                yield values["connection"], values.get("topic")
+
+
+def iter_database_connections(dsn: Optional[str] = None) -> Iterable[tuple[str, Optional[str]]]:
+    if not PSYCOPG2_AVAILABLE:
+        raise RuntimeError("psycopg2 not installed. Run: pip install psycopg2-binary")
+    dsn = dsn or os.getenv("DATABASE_URL")
+    if not dsn:
+        raise RuntimeError("DATABASE_URL not set")
+    connection = psycopg2.connect(dsn)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT connection, connection_options, topic FROM {table_for('wiki_links')}")
+            for answer, options, topic in cursor.fetchall():
+                yield answer, topic
+                for option in options or []:
+                    yield option, topic
+            cursor.execute(f"SELECT connection, topic FROM {table_for('odd_wiki_out')}")
+            yield from cursor.fetchall()
+    finally:
+        connection.close()
+
+
+class DistractorEngine:
+    """
+    Fills in year_options and connection_options. The connection pool is
+    {topic: [connection]}; connections the run generates are added to it
+    as they arrive. Each bucket is also kept sorted as (connection,
+    normalized text, word set), so picking decoys only copies a bucket
+    under the lock and scores it outside. Safe to share between threads.
+    """
+
+    def __init__(self, pool: Optional[dict[str, list[str]]] = None):
+        self.pool: dict[str, list[str]] = {}
+        self._entries: dict[str, list[tuple[str, str, frozenset]]] = {}
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+        for topic, connections in (pool or {}).items():
+            for connection in connections:
+                self._add(connection, topic)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_POOL_PATH) -> "DistractorEngine":
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, path: str = DEFAULT_POOL_PATH) -> None:
+        with self._lock:
+            data = {topic: sorted(connections) for topic, connections in sorted(self.pool.items())}
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _add(self, connection: str, bucket: str) -> bool:
+        connection = re.sub(r"\s+", " ", connection or "").strip()
+        normalized = normalize_text(connection)
+        if not normalized or normalized in self._seen:
+            return False
+        self._seen.add(normalized)
+        self.pool.setdefault(bucket, []).append(connection)
+        bisect.insort(self._entries.setdefault(bucket, []), (connection, normalized, frozenset(normalized.split())))
+        return True
+
+    def add(self, connection: str, topic: Optional[str] = None) -> bool:
+        with self._lock:
+            return self._add(connection, pool_topic(connection, topic))
+
+    def connection_options(self, connection: str, topic: Optional[str] = None,
+                           count: int = OPTION_COUNT) -> Optional[list[str]]:
+        """
+        [connection, decoy, decoy, decoy], decoys from the same topic first;
+        None if the pool cannot supply enough.
+        """
+        bucket = pool_topic(connection, topic)
+        answer = normalize_text(connection)
+        answer_words = set(answer.split())
+        rng = random.Random(seed_for("connection", answer))
+
+        def usable(entries: Iterable[tuple[str, str, frozenset]]) -> list[str]:
+            kept = []
+            for candidate, normalized, words in entries:
+                overlap = len(words & answer_words) / (len(words | answer_words) or 1)
+                if overlap <= MAX_DECOY_OVERLAP and normalized != answer:
+                    kept.append(candidate)
+            return kept
+
+        def pick(candidates: list[str], wanted: int) -> list[str]:
+            # Weighted sampling without replacement (key = u ** (1 / weight)),
+            # favouring decoys about as long as the answer
+            length = len(connection.split())
+            keyed = ((rng.random() ** (1 + abs(len(candidate.split()) - length)), candidate)
+                     for candidate in candidates)
+            return [candidate for _, candidate in heapq.nlargest(wanted, keyed)]
+
+        with self._lock:
+            same = list(self._entries.get(bucket, ()))
+        decoys = pick(usable(same), count - 1)
+        if len(decoys) < count - 1:
+            # Too few on the topic: every other bucket, in one sorted order
+            with self._lock:
+                others = [list(entries) for other, entries in self._entries.items() if other != bucket]
+            decoys += pick(usable(heapq.merge(*others)), count - 1 - len(decoys))
+        if len(decoys) < count - 1:
+            return None
+        return [connection, *decoys]
+
+    def fill_section(self, category: str, section: dict) -> dict:
+        """
+        A copy of one generated section with its year_options or
+        connection_options filled in, without adding to the pool. Sections
+        that lack the answer they are built around are left as they are.
+        """
+        section = dict(section)
+        if category == "when_in_wiki" and isinstance(section.get("correct_year"), int):
+            section["year_options"] = year_options(section["correct_year"],
+                                                   normalize_text(str(section.get("event", ""))))
+        connection = section.get("connection")
+        if category == "wiki_links" and isinstance(connection, str) and connection.strip():
+            options = self.connection_options(connection.strip(), section.get("topic"))
+            if options:
+                section["connection_options"] = options
+        return section
+
+    def fill(self, questions: dict) -> dict:
+        """
+        A copy of a generated question set with year_options and
+        connection_options filled in (sections that lack the answer they
+        are built around are left for validation to reject). The set's
+        connections join the pool.
+        """
+        questions = dict(questions)
+        for category in DISTRACTOR_FIELDS:
+            if isinstance(questions.get(category), dict):
+                questions[category] = self.fill_section(category, questions[category])
+        links = questions.get("wiki_links")
+        if isinstance(links, dict) and isinstance(links.get("connection"), str) and links["connection"].strip():
+            self.add(links["connection"], links.get("topic"))
+        odd = questions.get("odd_wiki_out")
+        if isinstance(odd, dict) and isinstance(odd.get("connection"), str):
+            self.add(odd["connection"], odd.get("topic"))
+        return questions
+
+
+# =============================================================================
+# PROMPT AND SCHEMA VARIANTS
+# =============================================================================
+
+def without_distractors(instruction: str) -> str:
+    """A system instruction with the distractor fields and rules taken out (rules renumbered)."""
+    lines = [line for line in instruction.split("\n")
+             if not any(field in line for field in DISTRACTOR_FIELDS.values())]
+    number = 0
+
+    def renumber(match: re.Match) -> str:
+        nonlocal number
+        number += 1
+        return f"{number}. "
+
+    return "\n".join(re.sub(r"^\d+\. ", renumber, line) for line in lines)
+
+
+def without_distractor_fields(schema: dict) -> dict:
+    """A question-set response schema without the distractor fields."""
+    properties = dict(schema["properties"])
+    for category, field in DISTRACTOR_FIELDS.items():
+        section = properties.get(category)
+        if section:
+            fields = {name: value for name, value in section["properties"].items() if name != field}
+            properties[category] = {**section, "properties": fields, "required": list(fields)}
+    return {**schema, "properties": properties, "required": list(properties)}
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser local distractor engine")
+    parser.add_argument("--pool", default=DEFAULT_POOL_PATH, help="Connection pool file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Add existing questions' connections to the pool")
+    build.add_argument("--sql", nargs="*", default=[], help="Seed .sql files")
+    build.add_argument("--database", action="store_true", help="Read the live tables (DATABASE_URL)")
+    build.add_argument("--database-url", default=None, help="Postgres DSN (default: $DATABASE_URL)")
+    sub.add_parser("stats", help="Show the pool's connections per topic")
+    args = parser.parse_args()
+
+    engine = DistractorEngine.load(args.pool)
+    if args.command == "build":
+        before = len(engine)
+        for connection, topic in iter_sql_connections(args.sql):
+            engine.add(connection, topic)
+        if args.database:
+            for connection, topic in iter_database_connections(args.database_url):
+                engine.add(connection, topic)
+        engine.save(args.pool)
+        print(f"🎭 Added {len(engine) - before} connections ({len(engine)} in {args.pool})")
+    else:
+        for topic, connections in sorted(engine.pool.items(), key=lambda item: -len(item[1])):
+            print(f"   {topic}: {len(connections)} connections")
+        print(f"   Total: {len(engine)}")
+
+
+if __name__ == "__main__":
+    main()
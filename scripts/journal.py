@@ -0,0 +1,178 @@
+"""
+Wiki Guesser - Mining Run Journal
+=================================
+Append-only journal that makes miner.py runs checkpointed and resumable.
+
+Each run lives in its own directory:
+    runs/<run-id>/articles.json    - the article list (or --balance candidates) the run started with
+    runs/<run-id>/journal.jsonl    - one line per state change
+    runs/<run-id>/<category>.jsonl - question rows, appended as articles finish
+
+Articles move through fetched -> generated -> validated -> emitted (or
+failed). Results are emitted strictly in article order through a small
+reorder buffer, and every "emitted"/"failed" record stores the size of each
+part file after the write. On resume the part files are truncated back to
+the last recorded sizes (dropping anything written after the last
+checkpoint) and processing continues from the first article that was not
+emitted, so nothing is written twice and memory stays flat however long the
+run is.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+RUNS_DIR = "runs"
+
+# Terminal states; everything before the first non-terminal article is done
+DONE_STATES = ("emitted", "failed")
+
+
+def new_run_id() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+class RunJournal:
+    """
+    Journal plus incremental SQL output for one mining run.
+    `categories` fixes the part files (and their order in the final output).
+    `row_filter(index, rows)` runs on each article's rows in emission order,
+    just before they are written (e.g. to drop near-duplicates).
+    """
+
+    def __init__(self, run_id: str, categories: list[str], runs_dir: str = RUNS_DIR,
+                 row_filter: Optional[Callable[[int, dict], dict]] = None):
+        self.run_id = run_id
+        self.categories = categories
+        self.row_filter = row_filter
+        self.run_dir = os.path.join(runs_dir, run_id)
+        self.journal_path = os.path.join(self.run_dir, "journal.jsonl")
+        self.articles_path = os.path.join(self.run_dir, "articles.json")
+        os.makedirs(self.run_dir, exist_ok=True)
+
+        self.next_index = 0
+        self.success = 0
+        self.counts = {category: 0 for category in categories}
+        self.done_titles: list[str] = []  # Titles of the finished articles, in order
+        self._pending: dict[int, tuple[str, Optional[dict]]] = {}
+        self._restore()
+
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._parts = {
+            category: open(self.part_path(category), "ab")
+            for category in categories
+        }
+
+    def part_path(self, category: str) -> str:
+        return os.path.join(self.run_dir, f"{category}.jsonl")
+
+    def _restore(self) -> None:
+        """Replay the journal and roll part files back to the last checkpoint."""
+        offsets = {category: 0 for category in self.categories}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                good = 0  # End of the last complete record
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        break  # torn final line from a crash
+                    if not line.endswith(b"\n"):
+                        break
+                    good += len(line)
+                    if record.get("state") not in DONE_STATES:
+                        continue
+                    self.next_index = record["index"] + 1
+                    del self.done_titles[record["index"]:]
+                    self.done_titles.append(record["title"])
+                    if record["state"] == "emitted":
+                        self.success += 1
+                    offsets.update(record.get("offsets", {}))
+                    self.counts.update(record.get("counts", {}))
+                # Drop the torn tail so new records start on a fresh line
+                f.truncate(good)
+        for category in self.categories:
+            path = self.part_path(category)
+            if os.path.exists(path) and os.path.getsize(path) > offsets[category]:
+                with open(path, "r+b") as f:
+                    f.truncate(offsets[category])
+
+    # -------------------------------------------------------------------------
+    # Article list
+    # -------------------------------------------------------------------------
+
+    def save_articles(self, articles: list[str]) -> None:
+        with open(self.articles_path, "w", encoding="utf-8") as f:
+            json.dump(articles, f, ensure_ascii=False)
+
+    def load_articles(self) -> Optional[list[str]]:
+        if not os.path.exists(self.articles_path):
+            return None
+        with open(self.articles_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    # -------------------------------------------------------------------------
+    # State changes
+    # -------------------------------------------------------------------------
+
+    def _append(self, record: dict) -> None:
+        record["ts"] = time.time()
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+    def mark(self, index: int, title: str, state: str, **extra) -> None:
+        """Record an intermediate state (fetched, generated, validated)."""
+        self._append({"index": index, "title": title, "state": state, **extra})
+
+    def is_done(self, index: int) -> bool:
+        return index < self.next_index
+
+    def complete(self, index: int, title: str, rows: Optional[dict]) -> None:
+        """
+        Finish an article with its question rows by category (None if it
+        failed). Output is written once every earlier article has finished.
+        """
+        self._pending[index] = (title, rows)
+        while self.next_index in self._pending:
+            title, rows = self._pending.pop(self.next_index)
+            self._emit(self.next_index, title, rows)
+            self.next_index += 1
+
+    def _emit(self, index: int, title: str, rows: Optional[dict]) -> None:
+        if rows and self.row_filter:
+            rows = self.row_filter(index, rows) or None
+        if rows:
+            for category, row in rows.items():
+                line = json.dumps(list(row), ensure_ascii=False) + "\n"
+                self._parts[category].write(line.encode("utf-8"))
+                self.counts[category] += 1
+            for part in self._parts.values():
+                part.flush()
+            self.success += 1
+        offsets = {category: part.tell() for category, part in self._parts.items()}
+        self.done_titles.append(title)
+        self._append({
+            "index": index,
+            "title": title,
+            "state": "emitted" if rows else "failed",
+            "offsets": offsets,
+            "counts": dict(self.counts),
+        })
+
+    # -------------------------------------------------------------------------
+    # Final output
+    # -------------------------------------------------------------------------
+
+    def iter_rows(self, category: str):
+        """Stream the rows emitted for a category, in article order."""
+        self._parts[category].flush()
+        with open(self.part_path(category), encoding="utf-8") as f:
+            for line in f:
+                yield tuple(json.loads(line))
+
+    def close(self) -> None:
+        self._journal.close()
+        for part in self._parts.values():
+            part.close()
@@ -0,0 +1,151 @@
+"""
+Wiki Guesser - Incremental Section Parser
+=========================================
+Parses a streamed Gemini answer of the shape
+
+    {"odd_wiki_out": {...}, "when_in_wiki": {...}, "wiki_or_fiction": {...}, "wiki_links": {...}}
+
+chunk by chunk, handing over each top-level section the moment its closing
+brace arrives, and raising StreamViolation as soon as the text can no
+longer become a valid answer (so the caller can cancel the stream instead
+of paying for the rest of it):
+
+    - anything but "{" first (a leading ``` / ```json fence line is skipped)
+    - a key that is not one of the expected sections, or a repeated one
+    - a section whose value is not an object, or does not parse as JSON
+
+Everything after the root object's closing brace is ignored, so trailing
+fences or chatter are never waited for. Each character is scanned once,
+however the text is split into chunks.
+"""
+
+import json
+from typing import Iterable, Optional
+
+
+class StreamViolation(ValueError):
+    """The streamed text cannot become a valid question set."""
+
+
+class SectionParser:
+    """
+    feed() chunks of text; it returns the [(key, value)] sections completed
+    by that chunk. `done` is set once the root object has closed.
+    """
+
+    def __init__(self, sections: Iterable[str]):
+        self.expected = set(sections)
+        self.seen: dict[str, dict] = {}
+        self.done = False
+        self._text = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._start = 0  # Where the current key or section began
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> list[tuple[str, dict]]:
+        if self.done:
+            return []
+        self._text += chunk
+        completed = []
+        text = self._text
+        while self._pos < len(text) and not self.done:
+            char = text[self._pos]
+            state = self._state
+
+            if state in ("key", "value"):
+                # Inside a key string or a section: track strings and nesting
+                if self._in_string:
+                    if self._escaped:
+                        self._escaped = False
+                    elif char == "\\":
+                        self._escaped = True
+                    elif char == '"':
+                        self._in_string = False
+                        if state == "key":
+                            self._end_key(text[self._start:self._pos + 1])
+                elif char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        completed.append(self._end_section(text[self._start:self._pos + 1]))
+                self._pos += 1
+                continue
+
+            if char.isspace():
+                self._pos += 1
+            elif state == "start":
+                if char == "`":
+                    newline = text.find("\n", self._pos)
+                    if newline == -1:
+                        break  # Wait for the rest of the fence line
+                    self._pos = newline + 1
+                elif char == "{":
+                    self._state = "first_key"
+                    self._pos += 1
+                else:
+                    raise StreamViolation(f"expected a JSON object, got {char!r}")
+            elif state in ("first_key", "next_key"):
+                if char == '"':
+                    self._state = "key"
+                    self._start = self._pos
+                    self._in_string = True
+                elif char == "}" and state == "first_key":
+                    self.done = True
+                else:
+                    raise StreamViolation(f"expected a section name, got {char!r}")
+                self._pos += 1
+            elif state == "colon":
+                if char != ":":
+                    raise StreamViolation(f"expected ':' after {self._key!r}, got {char!r}")
+                self._state = "section"
+                self._pos += 1
+            elif state == "section":
+                if char != "{":
+                    raise StreamViolation(f"section {self._key!r} is not an object")
+                self._state = "value"
+                self._start = self._pos
+                self._depth = 1
+                self._pos += 1
+            elif state == "after":
+                if char == ",":
+                    self._state = "next_key"
+                elif char == "}":
+                    self.done = True
+                else:
+                    raise StreamViolation(f"expected ',' or '}}' after {self._key!r}, got {char!r}")
+                self._pos += 1
+
+        # Drop what has been consumed, unless a key or section is still open
+        keep = self._start if self._state in ("key", "value") else self._pos
+        self._text = text[keep:]
+        self._start -= keep
+        self._pos -= keep
+        return completed
+
+    def _end_key(self, literal: str) -> None:
+        try:
+            key = json.loads(literal)
+        except json.JSONDecodeError as e:
+            raise StreamViolation(f"bad section name {literal}: {e}") from e
+        if key not in self.expected:
+            raise StreamViolation(f"unexpected section {key!r}")
+        if key in self.seen:
+            raise StreamViolation(f"section {key!r} repeated")
+        self._key = key
+        self._state = "colon"
+
+    def _end_section(self, literal: str) -> tuple[str, dict]:
+        try:
+            value = json.loads(literal)
+        except json.JSONDecodeError as e:
+            raise StreamViolation(f"section {self._key!r} is not valid JSON: {e}") from e
+        self.seen[self._key] = value
+        self._state = "after"
+        return self._key, value
@@ -0,0 +1,157 @@
+"""
+Wiki Guesser - Shared Rate Limiting
+===================================
+Token-bucket rate limiter with adaptive backoff, plus a jittered retry
+helper. Used by miner.py (Gemini) and opentdb_importer.py (Open Trivia DB)
+instead of fixed sleeps between requests.
+
+Callers signal what went wrong by raising:
+    RetryableError  - transient failure, try again after a backoff
+    RateLimited     - the server asked us to slow down (429 / quota);
+                      the limiter slows its rate and honors retry_after
+Any other exception is not retried.
+"""
+
+import random
+import re
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RetryableError(Exception):
+    """A transient failure that is worth retrying."""
+
+    def __init__(self, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(RetryableError):
+    """The remote API rejected the request because of rate limits or quota."""
+
+
+# =============================================================================
+# TOKEN BUCKET
+# =============================================================================
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    `rate` tokens are added per second up to `capacity`; each request takes
+    one token. On a rate-limit signal the bucket halves its rate (down to
+    `min_rate`) and blocks until the server's Retry-After has passed; every
+    success afterwards restores a little of the configured rate.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, min_rate: Optional[float] = None,
+                 recovery: float = 0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 8
+        self.capacity = capacity
+        self.recovery = recovery
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.total_wait = 0.0  # Seconds callers have spent blocked in acquire()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - max(self._updated, self._paused_until))
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = max(now, self._updated)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.total_wait += waited
+                    return waited
+                delay = max(self._paused_until - now, (tokens - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        """Slow down after a rate-limit response."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def reward(self) -> None:
+        """Recover toward the configured rate after a successful request."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+
+# =============================================================================
+# RETRIES
+# =============================================================================
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given (0-based) attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    Extract a retry delay in seconds from a Retry-After header value or an
+    error message (e.g. Gemini's "retry_delay { seconds: 37 }").
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    match = re.search(r"retry[_ -]?(?:delay|after)\D{0,20}(\d+(?:\.\d+)?)", text, re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def retry_call(
+    fn: Callable[..., T],
+    *args,
+    limiter: Optional[TokenBucket] = None,
+    retries: int = 4,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    on_retry: Optional[Callable[[int, Exception, float], None]] = None,
+    **kwargs,
+) -> T:
+    """
+    Call `fn(*args, **kwargs)`, taking a limiter token before every attempt
+    and retrying RetryableError up to `retries` times with jittered backoff.
+    The last error is re-raised once retries are exhausted.
+    """
+    attempt = 0
+    while True:
+        if limiter:
+            limiter.acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except RetryableError as e:
+            if isinstance(e, RateLimited) and limiter:
+                limiter.penalize(e.retry_after)
+            if attempt >= retries:
+                raise
+            delay = max(backoff_delay(attempt, base_delay, max_delay), e.retry_after or 0.0)
+            if on_retry:
+                on_retry(attempt + 1, e, delay)
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if limiter:
+            limiter.reward()
+        return result
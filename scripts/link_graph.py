@@ -0,0 +1,646 @@
+"""
+Wiki Guesser - Offline Link Graph & wiki_links Generator
+========================================================
+Builds a compact, memory-mapped graph of Wikipedia articles, their
+categories and the links between them from the SQL dumps, then mines
+wiki_links questions from it - four real articles and what connects them -
+with no API calls. Gemini is only used, optionally (--phrase), to turn
+category names into quiz-style answers.
+
+Inputs (MySQL dumps, plain, .gz or .bz2, from https://dumps.wikimedia.org/enwiki/latest/):
+    page            enwiki-latest-page.sql.gz           article ids and titles
+    categorylinks   enwiki-latest-categorylinks.sql.gz  article -> category
+    pagelinks       enwiki-latest-pagelinks.sql.gz      article -> article (optional)
+    linktarget      enwiki-latest-linktarget.sql.gz     needed by dumps whose links
+                                                        point at link target ids
+Columns are found from each dump's CREATE TABLE, so both the older
+title-based and the newer target-id-based schemas work. Redirects,
+non-article pages and maintenance categories are left out.
+
+The build is pure Python and holds every edge in memory (about 8 bytes per
+link while parsing, 4 per link in the graph). That is fine for page and
+categorylinks, but the full enwiki pagelinks dump (~1.5B rows) needs tens
+of GB and hours: use --pagelinks with a smaller wiki or a filtered dump,
+or leave it out (category mode does not need links).
+
+Graph layout (little-endian, every section 8-byte aligned):
+    header, section table
+    title offsets, titles         articles, sorted bytewise (id = position)
+    category offsets, categories  category names, sorted bytewise
+    article -> categories         CSR: (articles + 1) x uint64 row starts,
+    category -> articles               then uint32 ids, sorted per row
+    article -> linked articles
+    article <- linking articles
+
+Sets are mined two ways:
+    category   4 members of a category with MIN_MEMBERS..MAX_MEMBERS articles;
+               the decoys are other categories some, but not all, of the four
+               are in
+    neighbor   4 articles that link to a hub article and are linked back from
+               it; the answer is the hub, the decoys are articles some of the
+               four link to
+
+Usage:
+    python link_graph.py build --output enwiki.lg --pages enwiki-latest-page.sql.gz \\
+        --categorylinks enwiki-latest-categorylinks.sql.gz --pagelinks enwiki-latest-pagelinks.sql.gz
+    python link_graph.py generate --graph enwiki.lg --count 500 --output seed_wiki_links.sql
+    python link_graph.py generate --graph enwiki.lg --count 100 --mode neighbor --title-index enwiki.idx
+    python link_graph.py stats --graph enwiki.lg
+"""
+
+import argparse
+import bz2
+import gzip
+import json
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from dedup import DEFAULT_INDEX_PATH, DedupIndex
+from postprocess import build_wikipedia_url, question_row
+from scheduler import classify
+from sql_writer import FORMATS, section_header, write_table
+from title_index import TitleIndex
+
+MAGIC = b"WGLG"
+VERSION = 1
+
+SET_SIZE = 4  # Articles per wiki_links question
+MIN_MEMBERS = 6  # Categories smaller than this make trivial sets...
+MAX_MEMBERS = 400  # ...and bigger ones make vague connections
+MIN_HUB_LINKS = SET_SIZE + 2  # Mutual links a neighbor-mode hub needs
+MEMBER_SAMPLE = 24  # Members considered per set (the most viewed win with --title-index)
+MAX_TRIES = 50  # Random draws before giving up on a set
+PHRASE_BATCH = 25  # Questions per Gemini phrasing request
+
+# Tracking, maintenance and list-like categories that make poor connections
+MAINTENANCE_CATEGORY = re.compile(
+    r"^(Articles|All |Pages|Wikipedia|Webarchive|CS1|Use |Short description|Commons|Wikidata|"
+    r"Coordinates|Official website|Good articles|Featured articles|Harv|Accuracy|Redirects|"
+    r"Living people|Possibly living people|Missing people|Year of birth|Year of death|"
+    r"\d+s? (births|deaths)|Dead people|Engvar|Biography with|AC with|Infobox|Template|"
+    r"Vague or ambiguous|Dynamic lists|Lists of|Disambiguation|Stub)|(stubs| stub)$"
+)
+
+_HEADER = struct.Struct("<4sIQQQQQQ")  # magic, version, articles, categories, memberships, links, built, reserved
+_SECTIONS = struct.Struct("<12Q")  # title offsets/blob, category offsets/blob, 4 x (indptr, indices)
+_INSERT = re.compile(r"^INSERT INTO `(\w+)` VALUES ")
+_ROW = re.compile(r"\(((?:'(?:[^'\\]|\\.)*'|[^'()])*)\)")
+_VALUE = re.compile(r"'((?:[^'\\]|\\.)*)'|(NULL)|([^,]+)")
+_ESCAPE = re.compile(r"\\(.)")
+_ESCAPES = {"0": "\0", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+
+
+def _check_byteorder() -> None:
+    if sys.byteorder != "little":
+        raise RuntimeError("link graphs are little-endian; this host is big-endian")
+
+
+def _open_dump(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+# =============================================================================
+# DUMP PARSING
+# =============================================================================
+
+def _unescape(text: str) -> str:
+    return _ESCAPE.sub(lambda match: _ESCAPES.get(match.group(1), match.group(1)), text)
+
+
+def iter_dump_rows(path: str, columns: list[str]) -> Iterator[tuple]:
+    """
+    Yield the requested columns of every row of a MySQL dump, as str / int
+    / None, using the column order from its CREATE TABLE. Rows missing a
+    requested column yield None for it.
+    """
+    table_columns: list[str] = []
+    in_create = False
+    positions: list[Optional[int]] = []
+    with _open_dump(path) as f:
+        for line in f:
+            if line.startswith("CREATE TABLE"):
+                in_create, table_columns = True, []
+                continue
+            if in_create:
+                match = re.match(r"\s*`(\w+)`", line)
+                if match:
+                    table_columns.append(match.group(1))
+                elif line.startswith(")"):
+                    in_create = False
+                    positions = [table_columns.index(c) if c in table_columns else None for c in columns]
+                continue
+            if not _INSERT.match(line):
+                continue
+            for row in _ROW.finditer(line, line.index(" VALUES ") + 8):
+                values = []
+                for quoted, null, bare in _VALUE.findall(row.group(1)):
+                    if null:
+                        values.append(None)
+                    elif bare:
+                        bare = bare.strip()
+                        values.append(int(bare) if bare.lstrip("-").isdigit() else bare)
+                    else:
+                        values.append(_unescape(quoted))
+                yield tuple(values[p] if p is not None and p < len(values) else None for p in positions)
+
+
+# =============================================================================
+# BUILDING
+# =============================================================================
+
+def _align(f) -> int:
+    padding = -f.tell() % 8
+    f.write(b"\0" * padding)
+    return f.tell()
+
+
+def _row_starts(rows: Iterable[int], row_count: int) -> array:
+    """CSR row starts (row_count + 1 x uint64) from the row id of every entry."""
+    starts = array("Q", bytes(8 * (row_count + 1)))
+    for row, count in Counter(rows).items():
+        starts[row + 1] = count
+    for i in range(row_count):
+        starts[i + 1] += starts[i]
+    return starts
+
+
+def build_csr(rows: array, cols: array, row_count: int) -> tuple[array, array]:
+    """
+    Counting-sort (row, col) pairs into CSR arrays: row starts
+    (row_count + 1 x uint64) and column ids (uint32), sorted and
+    de-duplicated within each row. Rows are sorted in place and shifted
+    down over the dropped duplicates, so the ids are held once.
+    """
+    starts = _row_starts(rows, row_count)
+    filled = array("I", bytes(4 * len(cols)))
+    cursor = starts[:-1]
+    for row, col in zip(rows, cols):
+        filled[cursor[row]] = col
+        cursor[row] += 1
+    del cursor
+
+    end = 0
+    for i in range(row_count):
+        ids = sorted(set(filled[starts[i]:starts[i + 1]]))
+        starts[i] = end
+        filled[end:end + len(ids)] = array("I", ids)
+        end += len(ids)
+    starts[row_count] = end
+    del filled[end:]
+    return starts, filled
+
+
+def transpose_csr(starts: array, ids: array, col_count: int) -> tuple[array, array]:
+    """
+    The reverse of a CSR built by build_csr. Its rows are read in order, so
+    every reverse row comes out sorted and unique without sorting.
+    """
+    reverse_starts = _row_starts(ids, col_count)
+    reverse = array("I", bytes(4 * len(ids)))
+    cursor = reverse_starts[:-1]
+    for row in range(len(starts) - 1):
+        for col in ids[starts[row]:starts[row + 1]]:
+            reverse[cursor[col]] = row
+            cursor[col] += 1
+    return reverse_starts, reverse
+
+
+def build_graph(output: str, page_files: list[str], categorylink_files: list[str] = (),
+                pagelink_files: list[str] = (), linktarget_files: list[str] = ()) -> dict:
+    """Ingest dump files and write a graph. Returns build stats."""
+    _check_byteorder()
+    start = time.perf_counter()
+
+    page_titles: dict[int, str] = {}
+    for path in page_files:
+        print(f"   📥 {path}")
+        for page_id, namespace, title, redirect in iter_dump_rows(
+                path, ["page_id", "page_namespace", "page_title", "page_is_redirect"]):
+            if namespace == 0 and not redirect and title:
+                page_titles[page_id] = title.replace("_", " ")
+    keys = sorted({title.encode("utf-8") for title in page_titles.values()})
+    article_ids = {key.decode("utf-8"): i for i, key in enumerate(keys)}
+    page_ids = {page_id: article_ids[title] for page_id, title in page_titles.items()}
+    del page_titles
+
+    targets: dict[int, tuple[int, str]] = {}
+    for path in linktarget_files:
+        print(f"   📥 {path}")
+        for target_id, namespace, title in iter_dump_rows(path, ["lt_id", "lt_namespace", "lt_title"]):
+            if namespace in (0, 14):
+                targets[target_id] = (namespace, title.replace("_", " "))
+
+    category_ids: dict[str, int] = {}
+    member_rows, member_cols = array("I"), array("I")
+    for path in categorylink_files:
+        print(f"   📥 {path}")
+        for page_id, name, target_id, kind in iter_dump_rows(
+                path, ["cl_from", "cl_to", "cl_target_id", "cl_type"]):
+            article = page_ids.get(page_id)
+            if article is None or kind not in (None, "page"):
+                continue
+            if name is None:
+                namespace, name = targets.get(target_id, (None, None))
+                if namespace != 14:
+                    continue
+            name = name.replace("_", " ")
+            if MAINTENANCE_CATEGORY.search(name):
+                continue
+            member_rows.append(article)
+            member_cols.append(category_ids.setdefault(name, len(category_ids)))
+
+    link_rows, link_cols = array("I"), array("I")
+    for path in pagelink_files:
+        print(f"   📥 {path}")
+        for page_id, from_namespace, namespace, title, target_id in iter_dump_rows(
+                path, ["pl_from", "pl_from_namespace", "pl_namespace", "pl_title", "pl_target_id"]):
+            source = page_ids.get(page_id)
+            if source is None or from_namespace not in (None, 0):
+                continue
+            if title is None:
+                namespace, title = targets.get(target_id, (None, None))
+            if namespace != 0 or title is None:
+                continue
+            target = article_ids.get(title.replace("_", " "))
+            if target is not None and target != source:
+                link_rows.append(source)
+                link_cols.append(target)
+    del page_ids, targets
+
+    # Renumber categories in sorted name order
+    names = sorted(category_ids, key=lambda name: name.encode("utf-8"))
+    renumber = array("I", bytes(4 * len(names)))
+    for position, name in enumerate(names):
+        renumber[category_ids[name]] = position
+    member_cols = array("I", (renumber[c] for c in member_cols))
+    category_keys = [name.encode("utf-8") for name in names]
+
+    print("   🧮 Building adjacency...")
+    memberships = build_csr(member_rows, member_cols, len(keys))
+    del member_rows, member_cols
+    links = build_csr(link_rows, link_cols, len(keys))
+    del link_rows, link_cols
+    sections_data = [
+        memberships,
+        transpose_csr(*memberships, len(category_keys)),
+        links,
+        transpose_csr(*links, len(keys)),
+    ]
+
+    with open(output + ".tmp", "wb") as f:
+        f.write(b"\0" * (_HEADER.size + _SECTIONS.size))
+        sections = []
+        for blob_keys in (keys, category_keys):
+            offsets = array("Q", [0])
+            for key in blob_keys:
+                offsets.append(offsets[-1] + len(key))
+            sections.append(_align(f)); offsets.tofile(f)
+            sections.append(_align(f)); f.writelines(blob_keys)
+        for indptr, indices in sections_data:
+            sections.append(_align(f)); indptr.tofile(f)
+            sections.append(_align(f)); indices.tofile(f)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, len(keys), len(category_keys), len(sections_data[0][1]),
+                             len(sections_data[2][1]), int(time.time()), 0))
+        f.write(_SECTIONS.pack(*sections))
+    os.replace(output + ".tmp", output)
+    return {
+        "articles": len(keys),
+        "categories": len(category_keys),
+        "memberships": len(sections_data[0][1]),
+        "links": len(sections_data[2][1]),
+        "bytes": os.path.getsize(output),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+class LinkGraph:
+    """Read-only view of a graph file; opening it only maps the file."""
+
+    def __init__(self, path: str):
+        _check_byteorder()
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, articles, categories, memberships, links, built, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} link graph")
+        self.article_count = articles
+        self.category_count = categories
+        self.built = built
+        at = _SECTIONS.unpack_from(self._mm, _HEADER.size)
+
+        view = memoryview(self._mm)
+        self._views = []
+
+        def section(offset: int, count: int, code: str) -> memoryview:
+            size = struct.calcsize(code) * count
+            cast = view[offset:offset + size].cast(code)
+            self._views.append(cast)
+            return cast
+
+        self._title_offsets = section(at[0], articles + 1, "Q")
+        self._titles_at = at[1]
+        self._category_offsets = section(at[2], categories + 1, "Q")
+        self._categories_at = at[3]
+        self._csr = []
+        for n, (rows, count) in enumerate(((articles, memberships), (categories, memberships),
+                                           (articles, links), (articles, links))):
+            self._csr.append((section(at[4 + 2 * n], rows + 1, "Q"), section(at[5 + 2 * n], count, "I")))
+        self._eligible: Optional[list[int]] = None
+        self.eligible: set[int] = set()
+
+    def _blob(self, offsets: memoryview, base: int, i: int) -> bytes:
+        return self._mm[base + offsets[i]:base + offsets[i + 1]]
+
+    def title(self, i: int) -> str:
+        return self._blob(self._title_offsets, self._titles_at, i).decode("utf-8")
+
+    def category(self, i: int) -> str:
+        return self._blob(self._category_offsets, self._categories_at, i).decode("utf-8")
+
+    def find(self, title: str) -> Optional[int]:
+        """Article id of a title (spaces or underscores), or None."""
+        key = title.replace("_", " ").encode("utf-8")
+        lo, hi = 0, self.article_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._blob(self._title_offsets, self._titles_at, mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.article_count and self._blob(self._title_offsets, self._titles_at, lo) == key:
+            return lo
+        return None
+
+    def _row(self, which: int, i: int) -> memoryview:
+        indptr, indices = self._csr[which]
+        return indices[indptr[i]:indptr[i + 1]]
+
+    def categories_of(self, article: int) -> memoryview:
+        return self._row(0, article)
+
+    def members(self, category: int) -> memoryview:
+        return self._row(1, category)
+
+    def links_from(self, article: int) -> memoryview:
+        return self._row(2, article)
+
+    def links_to(self, article: int) -> memoryview:
+        return self._row(3, article)
+
+    def eligible_categories(self) -> list[int]:
+        """Categories with MIN_MEMBERS..MAX_MEMBERS articles (computed once)."""
+        if self._eligible is None:
+            indptr = self._csr[1][0]
+            self._eligible = [c for c in range(self.category_count)
+                              if MIN_MEMBERS <= indptr[c + 1] - indptr[c] <= MAX_MEMBERS]
+            self.eligible = set(self._eligible)
+        return self._eligible
+
+    def stats(self) -> dict:
+        return {
+            "articles": self.article_count,
+            "categories": self.category_count,
+            "eligible categories": len(self.eligible_categories()),
+            "memberships": len(self._csr[0][1]),
+            "links": len(self._csr[2][1]),
+            "built": datetime.fromtimestamp(self.built).isoformat(),
+            "bytes": os.path.getsize(self.path),
+        }
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._csr = []
+        self._mm.close()
+        self._file.close()
+
+
+# =============================================================================
+# MINING
+# =============================================================================
+
+def _pick_members(graph: LinkGraph, candidates: list[int], rng: random.Random,
+                  views: Optional[TitleIndex]) -> list[int]:
+    """SET_SIZE of the candidates; the most viewed of a random sample with a title index."""
+    sample = rng.sample(candidates, min(len(candidates), MEMBER_SAMPLE if views else SET_SIZE))
+    if views:
+        def popularity(article: int) -> int:
+            found = views.find(graph.title(article))
+            return views.views(found) if found is not None else 0
+        sample.sort(key=popularity, reverse=True)
+    return sample[:SET_SIZE]
+
+
+def mine_category_set(graph: LinkGraph, rng: random.Random,
+                      views: Optional[TitleIndex] = None) -> Optional[dict]:
+    """A wiki_links section from one category, or None if no draw worked."""
+    eligible = graph.eligible_categories()
+    for _ in range(MAX_TRIES if eligible else 0):
+        category = rng.choice(eligible)
+        chosen = _pick_members(graph, list(graph.members(category)), rng, views)
+        shared = Counter(c for article in chosen for c in graph.categories_of(article) if c != category)
+        if any(count == SET_SIZE for count in shared.values()):
+            continue  # Another category fits all four: the answer would be ambiguous
+        decoys = [c for c, _ in shared.most_common() if c in graph.eligible][:SET_SIZE - 1]
+        if len(decoys) < SET_SIZE - 1:
+            # The four share too few other categories: top up with random ones
+            others = [c for c in rng.sample(eligible, min(len(eligible), 2 * SET_SIZE))
+                      if c != category and c not in decoys]
+            decoys += others[:SET_SIZE - 1 - len(decoys)]
+            if len(decoys) < SET_SIZE - 1:
+                return None  # Too few categories for a question
+        connection = graph.category(category)
+        return {
+            "titles": [graph.title(article) for article in chosen],
+            "connection": connection,
+            "connection_options": [connection, *(graph.category(c) for c in decoys)],
+            "topic": classify(connection),
+            "source": f"Category:{connection}",
+        }
+    return None
+
+
+def mine_neighbor_set(graph: LinkGraph, rng: random.Random,
+                      views: Optional[TitleIndex] = None) -> Optional[dict]:
+    """A wiki_links section around one hub article, or None if no draw worked."""
+    for _ in range(MAX_TRIES if graph.article_count else 0):
+        hub = rng.randrange(graph.article_count)
+        inbound = graph.links_to(hub)
+        if len(inbound) < MIN_HUB_LINKS:
+            continue
+        mutual = sorted(set(inbound) & set(graph.links_from(hub)))
+        if len(mutual) < MIN_HUB_LINKS:
+            continue
+        chosen = _pick_members(graph, mutual, rng, views)
+        shared = Counter(target for article in chosen for target in graph.links_from(article)
+                         if target != hub and target not in chosen)
+        decoys = [target for target, count in shared.most_common() if count < SET_SIZE][:SET_SIZE - 1]
+        if len(decoys) < SET_SIZE - 1:
+            continue
+        connection = graph.title(hub)
+        return {
+            "titles": [graph.title(article) for article in chosen],
+            "connection": connection,
+            "connection_options": [connection, *(graph.title(target) for target in decoys)],
+            "topic": classify(connection),
+            "source": connection,
+        }
+    return None
+
+
+MINERS = {"category": mine_category_set, "neighbor": mine_neighbor_set}
+
+
+def iter_sets(graph: LinkGraph, count: int, mode: str = "category", seed: Optional[int] = None,
+              views: Optional[TitleIndex] = None) -> Iterator[dict]:
+    """Up to `count` distinct sets ("mixed" alternates the two miners)."""
+    rng = random.Random(seed)
+    modes = list(MINERS) if mode == "mixed" else [mode]
+    seen: set[tuple] = set()
+    misses = 0
+    while len(seen) < count and misses < MAX_TRIES:
+        found = MINERS[modes[len(seen) % len(modes)]](graph, rng, views)
+        key = found and (found["connection"], tuple(sorted(found["titles"])))
+        if not found or key in seen:
+            misses += 1
+            continue
+        misses = 0
+        seen.add(key)
+        yield found
+
+
+def phrase_sets(sets: list[dict]) -> list[dict]:
+    """
+    Ask Gemini to turn every option of each set into a short quiz answer
+    ("Members of the Beatles" rather than "The Beatles members"), the same
+    way for the answer and its decoys. Sets whose phrasing fails keep
+    their raw names.
+    """
+    import miner  # Only needed for --phrase (google-generativeai, GOOGLE_API_KEY)
+
+    model = miner.initialize_gemini(
+        "You rewrite Wikipedia category and article names as short, natural quiz answers "
+        "describing what connects a group of articles. Keep each under 8 words and keep the "
+        "meaning exact. Return ONLY a JSON array of arrays of strings, one array per input "
+        "array, same order and lengths."
+    )
+    if not model:
+        return sets
+    for start in range(0, len(sets), PHRASE_BATCH):
+        batch = sets[start:start + PHRASE_BATCH]
+        prompt = json.dumps([entry["connection_options"] for entry in batch], ensure_ascii=False)
+        try:
+            text = miner.call_gemini(model, prompt)
+            phrased = json.loads(text.removeprefix("```json").removeprefix("```").removesuffix("```"))
+        except Exception as e:
+            print(f"   ⚠️ Phrasing failed: {e}")
+            continue
+        if not isinstance(phrased, list) or len(phrased) != len(batch):
+            print("   ⚠️ Phrasing answer did not match the request; keeping raw names")
+            continue
+        for entry, options in zip(batch, phrased):
+            if (isinstance(options, list) and len(options) == len(entry["connection_options"])
+                    and all(isinstance(option, str) and option.strip() for option in options)
+                    and len({option.casefold() for option in options}) == len(options)):
+                entry["connection_options"] = [option.strip() for option in options]
+                entry["connection"] = entry["connection_options"][0]
+    return sets
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser offline link graph")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build a graph from dump files")
+    build.add_argument("--output", required=True)
+    build.add_argument("--pages", nargs="+", required=True, help="page table dumps")
+    build.add_argument("--categorylinks", nargs="*", default=[], help="categorylinks table dumps")
+    build.add_argument("--pagelinks", nargs="*", default=[], help="pagelinks table dumps, for neighbor mode (impractical for full enwiki)")
+    build.add_argument("--linktarget", nargs="*", default=[], help="linktarget table dumps")
+    generate = sub.add_parser("generate", help="Mine wiki_links questions into a seed file")
+    generate.add_argument("--graph", required=True)
+    generate.add_argument("--count", type=int, default=100)
+    generate.add_argument("--mode", choices=[*MINERS, "mixed"], default="category")
+    generate.add_argument("--title-index", help="title_index.py index: prefer well-known articles")
+    generate.add_argument("--seed", type=int, default=None, help="Random seed (repeatable questions and option order)")
+    generate.add_argument("--phrase", action="store_true", help="Phrase the options with Gemini")
+    generate.add_argument("--output", default="seed_wiki_links.sql")
+    generate.add_argument("--format", choices=[fmt for fmt in FORMATS if fmt != "csv"], default="insert")
+    generate.add_argument("--batch-size", type=int, default=1, help="Rows per INSERT statement")
+    generate.add_argument("--dedup-index", default=DEFAULT_INDEX_PATH,
+                          help="Near-duplicate index shared with miner.py (see dedup.py)")
+    generate.add_argument("--no-dedup", action="store_true", help="Disable near-duplicate rejection")
+    stats = sub.add_parser("stats", help="Describe a graph")
+    stats.add_argument("--graph", required=True)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"🔨 Building {args.output}...")
+        result = build_graph(args.output, args.pages, args.categorylinks, args.pagelinks, args.linktarget)
+        print(f"✅ {result['articles']} articles, {result['categories']} categories, "
+              f"{result['memberships']} memberships, {result['links']} links "
+              f"in {result['bytes'] / 1e6:.1f} MB, {result['seconds']:.1f}s")
+        return
+
+    graph = LinkGraph(args.graph)
+    if args.command == "stats":
+        for key, value in graph.stats().items():
+            print(f"   {key}: {value}")
+        graph.close()
+        return
+
+    views = TitleIndex(args.title_index) if args.title_index else None
+    start = time.perf_counter()
+    sets = list(iter_sets(graph, args.count, args.mode, args.seed, views))
+    elapsed = time.perf_counter() - start
+    print(f"🕸️ Mined {len(sets)} sets in {elapsed:.2f}s ({len(sets) / elapsed if elapsed else 0:,.0f}/s)")
+    if args.phrase:
+        sets = phrase_sets(sets)
+
+    shuffler = random.Random(args.seed)  # Option order too, so --seed repeats the questions exactly
+    rows = [question_row("wiki_links", entry, build_wikipedia_url(entry["source"]), shuffler) for entry in sets]
+    dedup_index = None if args.no_dedup else DedupIndex(args.dedup_index)
+    if dedup_index:
+        source = f"link_graph:{datetime.now().isoformat()}"
+        rows = [row for row in rows if dedup_index.add_if_new("wiki_links", row, source) is None]
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write("-- Wiki Guesser - Offline wiki_links Questions\n")
+        generated = f"with --seed {args.seed}" if args.seed is not None else f"on {datetime.now().isoformat()}"
+        f.write(f"-- Generated {generated} from {os.path.basename(args.graph)}\n\n")
+        f.write(section_header("wiki_links", len(rows)))
+        write_table(f, "wiki_links", rows, args.format, args.batch_size)
+        f.write(f"-- Total questions: {len(rows)}\n")
+    print(f"✅ {len(rows)} questions written to {args.output}")
+    if dedup_index:
+        print(f"   Near-duplicates rejected: {dedup_index.rejected}")
+        dedup_index.close()
+    if views:
+        views.close()
+    graph.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Wiki Guesser - Run Metrics
+==========================
+Lightweight, thread-safe instrumentation for miner.py: per-stage latency
+histograms (p50/p95/p99), counters for retries, errors, tokens and waits,
+and gauges, written at the end of a run (and optionally every N seconds
+during it) as JSON and/or Prometheus text exposition format.
+
+    with metrics.timer("wikipedia.summaries"):
+        ...
+    metrics.incr("gemini.retries")
+    metrics.incr("gemini.tokens", 812, direction="in")
+
+Each stage keeps its count, sum, min and max exactly, plus a uniform
+reservoir of up to RESERVOIR_SIZE samples for the percentiles, so memory
+stays bounded however long the run is.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+RESERVOIR_SIZE = 10_000
+QUANTILES = (0.5, 0.95, 0.99)
+PROMETHEUS_PREFIX = "wiki_guesser"
+
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.samples: list[float] = []
+
+    def observe(self, value: float, rng: random.Random) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(value)
+        else:
+            slot = rng.randrange(self.count)
+            if slot < RESERVOIR_SIZE:
+                self.samples[slot] = value
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def pick(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            **{f"p{int(q * 100)}": pick(q) for q in QUANTILES},
+        }
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+
+def _metric_name(name: str) -> str:
+    return f"{PROMETHEUS_PREFIX}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_text(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Metrics:
+    """Registry of stage timers, counters and gauges."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._histograms: dict[tuple, _Histogram] = {}
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._reporter: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # -------------------------------------------------------------------------
+    # Recording
+    # -------------------------------------------------------------------------
+
+    def observe(self, stage: str, seconds: float, **labels) -> None:
+        with self._lock:
+            histogram = self._histograms.setdefault(_key(stage, labels), _Histogram())
+            histogram.observe(seconds, self._rng)
+
+    @contextmanager
+    def timer(self, stage: str, **labels):
+        """Time a block; failures are timed too and counted as `<stage>.errors`."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.incr(f"{stage}.errors", **labels)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator form of timer()."""
+        def decorate(fn):
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            wrapper.__wrapped__ = fn
+            return wrapper
+        return decorate
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            key = _key(name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def reset(self) -> None:
+        """Forget everything recorded so far (e.g. between benchmark runs)."""
+        with self._lock:
+            self.started = time.time()
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    # -------------------------------------------------------------------------
+    # Reporting
+    # -------------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """Everything recorded so far, as JSON-serializable data."""
+        def entries(store: dict, render: Callable) -> list[dict]:
+            return [
+                {"name": name, "labels": dict(labels), **render(value)}
+                for (name, labels), value in sorted(store.items())
+            ]
+
+        with self._lock:
+            return {
+                "started": self.started,
+                "elapsed_seconds": time.time() - self.started,
+                "stages": entries(self._histograms, lambda histogram: histogram.summary()),
+                "counters": entries(self._counters, lambda value: {"value": value}),
+                "gauges": entries(self._gauges, lambda value: {"value": value}),
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (stages as summaries)."""
+        snapshot = self.snapshot()
+        lines = []
+        name = f"{PROMETHEUS_PREFIX}_stage_seconds"
+        lines.append(f"# TYPE {name} summary")
+        for stage in snapshot["stages"]:
+            labels = {"stage": stage["name"], **stage["labels"]}
+            for q in QUANTILES:
+                lines.append(f"{name}{_label_text({**labels, 'quantile': q})} {stage[f'p{int(q * 100)}']}")
+            lines.append(f"{name}_sum{_label_text(labels)} {stage['sum']}")
+            lines.append(f"{name}_count{_label_text(labels)} {stage['count']}")
+
+        seen = set()
+        for kind, entries in (("counter", snapshot["counters"]), ("gauge", snapshot["gauges"])):
+            for entry in entries:
+                name = _metric_name(entry["name"]) + ("_total" if kind == "counter" else "")
+                if name not in seen:
+                    lines.append(f"# TYPE {name} {kind}")
+                    seen.add(name)
+                lines.append(f"{name}{_label_text(entry['labels'])} {entry['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> None:
+        """Write the report files atomically (safe to read while a run is going)."""
+        for path, render in ((json_path, lambda: json.dumps(self.snapshot(), indent=2)),
+                             (prometheus_path, self.to_prometheus)):
+            if not path:
+                continue
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(render())
+            os.replace(path + ".tmp", path)
+
+    def start_reporting(self, interval: float, json_path: Optional[str] = None,
+                        prometheus_path: Optional[str] = None,
+                        before_write: Optional[Callable[[], None]] = None) -> None:
+        """Rewrite the report files every `interval` seconds until stop_reporting()."""
+        def loop():
+            while not self._stop.wait(interval):
+                if before_write:
+                    before_write()
+                self.write(json_path, prometheus_path)
+
+        self._stop.clear()
+        self._reporter = threading.Thread(target=loop, daemon=True)
+        self._reporter.start()
+
+    def stop_reporting(self) -> None:
+        if self._reporter:
+            self._stop.set()
+            self._reporter.join()
+            self._reporter = None
+
+
+def print_stage_report(metrics: "Metrics") -> None:
+    for stage in metrics.snapshot()["stages"]:
+        print(f"   ⏱️ {stage['name']}: {stage['count']} calls, "
+              f"p50 {stage['p50'] * 1000:.0f} ms, p95 {stage['p95'] * 1000:.0f} ms, "
+              f"p99 {stage['p99'] * 1000:.0f} ms, total {stage['sum']:.1f}s")
+
+
+# Shared registry for the process
+metrics = Metrics()
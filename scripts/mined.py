@@ -0,0 +1,236 @@
+"""
+Wiki Guesser - Mined Article Ledger
+===================================
+Persistent record of which revision of each article its questions were
+generated from, so `miner.py --delta` only sends new or materially changed
+articles to Gemini.
+
+For every mined article the ledger keeps the revision id, a sketch of the
+summary the questions were written from, and the ids of the questions
+emitted for it ("<category>:<fingerprint>", the SHA-1 of the normalized
+question text the near-duplicate index uses). Before generation the
+article list is checked in bulk:
+
+    not in the ledger               -> mine
+    same revision                   -> skip
+    new revision, similar summary   -> skip (the ledger moves to the new revision)
+    new revision, summary rewritten -> mine again; with --flag-refresh the
+                                       old questions are listed for refresh
+
+Summaries are compared by estimated Jaccard similarity of their word
+3-grams (a bottom-k MinHash sketch), so typo fixes and small edits do not
+count as changes but a rewritten intro does.
+
+Usage:
+    python mined.py stats
+    python mined.py refresh            # questions flagged for refresh
+    python mined.py refresh --clear
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Optional
+
+from dedup import normalize_text, question_text
+
+DEFAULT_LEDGER_PATH = ".mined_articles.sqlite3"
+
+SKETCH_SIZE = 64  # Smallest shingle hashes kept per summary
+SHINGLE_WORDS = 3  # Words per shingle
+CHANGE_THRESHOLD = 0.7  # Summaries less similar than this count as rewritten
+LOOKUP_BATCH = 500  # Titles per SQL lookup
+
+
+# =============================================================================
+# SUMMARY SKETCHES
+# =============================================================================
+
+def summary_sketch(text: str) -> array:
+    """The SKETCH_SIZE smallest 64-bit hashes of the summary's word shingles."""
+    words = normalize_text(text).split()
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = (
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles
+    )
+    return array("Q", sorted(heapq.nsmallest(SKETCH_SIZE, hashes)))
+
+
+def sketch_similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of the texts behind two sketches."""
+    if not a or not b:
+        return 1.0 if not a and not b else 0.0
+    union = heapq.nsmallest(SKETCH_SIZE, set(a) | set(b))
+    shared = set(a) & set(b)
+    return sum(1 for value in union if value in shared) / len(union)
+
+
+def question_id(category: str, row: tuple) -> str:
+    normalized = normalize_text(question_text(category, row))
+    return f"{category}:{hashlib.sha1(normalized.encode('utf-8')).hexdigest()}"
+
+
+# =============================================================================
+# LEDGER
+# =============================================================================
+
+class MinedLedger:
+    """
+    SQLite-backed (language, title) -> last mined revision ledger. Safe to
+    share between threads.
+
+    The miner calls note() as each summary is fetched and record() once the
+    article's rows are emitted, so only questions that reached the output
+    are recorded.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH, threshold: float = CHANGE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.recorded = 0
+        self._pending: dict[tuple[str, str], tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                language TEXT NOT NULL,
+                title TEXT NOT NULL,
+                revision INTEGER,
+                sketch BLOB NOT NULL,
+                question_ids TEXT NOT NULL,
+                run_id TEXT,
+                mined_at REAL NOT NULL,
+                PRIMARY KEY (language, title)
+            );
+            CREATE TABLE IF NOT EXISTS refresh (
+                question_id TEXT PRIMARY KEY,
+                language TEXT NOT NULL,
+                title TEXT NOT NULL,
+                flagged_at REAL NOT NULL
+            );
+        """)
+
+    def lookup(self, titles: list[str], language: str = "en") -> dict[str, dict]:
+        """{title: {"revision", "sketch", "question_ids"}} for the titles already mined."""
+        found = {}
+        titles = list(dict.fromkeys(titles))
+        with self._lock:
+            for start in range(0, len(titles), LOOKUP_BATCH):
+                batch = titles[start:start + LOOKUP_BATCH]
+                for title, revision, blob, ids in self._db.execute(
+                    f"SELECT title, revision, sketch, question_ids FROM articles "
+                    f"WHERE language = ? AND title IN ({', '.join('?' * len(batch))})",
+                    (language, *batch),
+                ):
+                    sketch = array("Q")
+                    sketch.frombytes(blob)
+                    found[title] = {"revision": revision, "sketch": sketch, "question_ids": json.loads(ids)}
+        return found
+
+    def is_rewritten(self, entry: dict, summary: str) -> bool:
+        """Has the summary drifted too far from the one the questions came from?"""
+        return sketch_similarity(entry["sketch"], summary_sketch(summary)) < self.threshold
+
+    def note(self, title: str, revision: Optional[int], summary: str, language: str = "en") -> None:
+        """Remember the revision and summary an article is about to be mined from."""
+        sketch = summary_sketch(summary).tobytes()
+        with self._lock:
+            self._pending[(language, title)] = (revision, sketch)
+
+    def record(self, title: str, rows: dict, run_id: str = "", language: str = "en") -> bool:
+        """
+        Record an article's emitted {category: row} questions against the
+        revision noted for it. Returns False if no summary was noted.
+        """
+        ids = [question_id(category, row) for category, row in rows.items()]
+        with self._lock:
+            pending = self._pending.pop((language, title), None)
+            if pending is None:
+                return False
+            revision, sketch = pending
+            self._db.execute(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (language, title, revision, sketch, json.dumps(ids), run_id, time.time()),
+            )
+            self._db.commit()
+            self.recorded += 1
+        return True
+
+    def touch(self, title: str, revision: int, language: str = "en") -> None:
+        """Move an article to a new revision without re-mining it (its sketch is kept)."""
+        with self._lock:
+            self._db.execute("UPDATE articles SET revision = ? WHERE language = ? AND title = ?",
+                             (revision, language, title))
+            self._db.commit()
+
+    def flag_refresh(self, title: str, question_ids: list[str], language: str = "en") -> None:
+        """List an article's old questions for refresh (their source text changed)."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO refresh VALUES (?, ?, ?, ?)",
+                [(qid, language, title, now) for qid in question_ids],
+            )
+            self._db.commit()
+
+    def flagged(self) -> list[tuple[str, str, str]]:
+        """(language, title, question id) for every question flagged for refresh."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT language, title, question_id FROM refresh ORDER BY language, title"
+            ).fetchall()
+
+    def clear_flagged(self) -> int:
+        with self._lock:
+            count = self._db.execute("DELETE FROM refresh").rowcount
+            self._db.commit()
+        return count
+
+    def counts(self) -> dict:
+        with self._lock:
+            articles = dict(self._db.execute("SELECT language, COUNT(*) FROM articles GROUP BY language"))
+            flagged = self._db.execute("SELECT COUNT(*) FROM refresh").fetchone()[0]
+        return {"articles": articles, "flagged": flagged}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser mined-article ledger")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER_PATH, help="Ledger file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show mined articles per language")
+    refresh = sub.add_parser("refresh", help="List questions flagged for refresh")
+    refresh.add_argument("--clear", action="store_true", help="Forget the flags after listing them")
+    args = parser.parse_args()
+
+    ledger = MinedLedger(args.ledger)
+    if args.command == "refresh":
+        for language, title, qid in ledger.flagged():
+            print(f"{language}\t{title}\t{qid}")
+        if args.clear:
+            print(f"🧹 Cleared {ledger.clear_flagged()} flags")
+    else:
+        counts = ledger.counts()
+        for language, count in counts["articles"].items():
+            print(f"   {language}: {count} articles mined")
+        print(f"   Flagged for refresh: {counts['flagged']} questions")
+    ledger.close()
+
+
+if __name__ == "__main__":
+    main()
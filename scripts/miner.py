@@ -7,6 +7,23 @@ using Google Gemini 2.0 Flash, outputting SQL INSERT statements.
 
 Usage:
     python miner.py
+    python miner.py --concurrent --fetch-workers 8 --generate-workers 4
+    python miner.py --resume 20241224-031500
+    python miner.py --concurrent --gemini-batch 5
+    python miner.py --stream   # parse generations as they stream, abort malformed ones early
+    python miner.py --local-distractors   # shorter responses; decoys from distractors.py
+    python miner.py --format copy --output seed_generated.sql   # psql -f
+    python miner.py --load   # also insert straight into Postgres (DATABASE_URL)
+    python miner.py --max-articles 100000 --workers 8   # replay cached generations
+    python miner.py --metrics run.json --prometheus run.prom --metrics-interval 30
+    python miner.py --title-index enwiki.idx --band 1:5 --topic "river|mountain"   # offline selection
+    python miner.py --delta --flag-refresh   # only new or rewritten articles
+    python miner.py --languages en,de,fr --concurrent   # one worker pool per language
+    python miner.py --pageview-days 90 --pageview-score median   # steady favourites, not spikes
+    python miner.py --balance --balance-sql ../supabase/seed_all_categories.sql   # even out topics
+    python miner.py --packs ../public/packs   # also update the static question packs
+    python miner.py --route --max-cost 5   # cheapest reliable model per article, escalate on failure
+    python miner.py --queue work.sqlite3 --enqueue   # then run any number of: python miner.py --queue work.sqlite3
 
 Requirements:
     pip install google-generativeai wikipedia-api pageviewapi python-dotenv
@@ -18,13 +35,55 @@ Created for Wiki Guesser quiz game - December 2024
 """
 
 import os
+import copy
 import json
 import time
 import random
+import re
+import heapq
+import asyncio
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from itertools import islice
 from typing import Optional
 from dotenv import load_dotenv
 
+from cache import DEFAULT_CACHE_PATH, ResponseCache, content_key, text_hash
+from dedup import DEFAULT_INDEX_PATH, DedupIndex
+from distractors import (
+    DEFAULT_POOL_PATH, MIN_POOL_SIZE, DistractorEngine, without_distractor_fields, without_distractors,
+)
+from json_stream import SectionParser, StreamViolation
+from journal import RUNS_DIR, RunJournal, new_run_id
+from limiter import RateLimited, RetryableError, TokenBucket, parse_retry_after, retry_call
+from loader import DEFAULT_COMMIT_SIZE, LOAD_METHODS, PostgresLoader, print_load_report
+from metrics import metrics, print_stage_report
+from mined import DEFAULT_LEDGER_PATH, MinedLedger
+from packs import build_packs
+from postprocess import (
+    iter_postprocessed, make_validator, postprocess, question_row, write_table_parallel,
+)
+from router import (
+    DEFAULT_STATS_PATH, BudgetExhausted, ModelRouter, OutputTruncated, TokenBudget, estimate_tokens, is_truncated,
+    model_name_of, passes_checks, print_route_report,
+)
+from scheduler import (
+    BALANCE_OVERSAMPLE, BalancedOrder, BalanceScheduler, classify, count_database, count_sql, parse_target,
+    print_balance_report,
+)
+from sql_writer import (
+    FORMATS, QUESTION_TABLES, insert_statement, section_header, write_csv, write_table,
+)
+from title_index import TitleIndex, parse_band, parse_days
+from validation import CHECKS, QuestionValidator, print_validation_report
+from wiki_client import MAX_TITLES_PER_REQUEST, USER_AGENT, get_client
+from work_queue import (
+    CLAIM_SIZE, DEFAULT_QUEUE_NAME, LEASE_SECONDS, POLL_SECONDS, WorkQueue, default_worker_id, print_queue_report,
+)
+
 # Third-party imports
 try:
     import google.generativeai as genai
@@ -45,6 +104,11 @@ except ImportError:
     PAGEVIEW_AVAILABLE = False
     print("NOTE: pageviewapi not installed. Using fallback article list.")
 
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:
+    google_exceptions = None
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -54,14 +118,48 @@ load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 # API Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 MODEL_NAME = "gemini-2.0-flash"
+GENERATION_CONFIG = {
+    "temperature": 0.8,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
 
 # Processing Limits
-MAX_ARTICLES = 5  # Number of Wikipedia articles to process (reduced for rate limits)
+LANGUAGES = ["en"]  # Wikipedia editions to mine, each with its own workers and limiter (--languages)
+MAX_ARTICLES = 5  # Number of Wikipedia articles to process per language (reduced for rate limits)
 MAX_SUMMARY_WORDS = 500  # Maximum words to extract from each article
-API_DELAY_SECONDS = 1.5  # Delay between Gemini API calls (rate limiting)
+SUMMARY_BATCH_SIZE = MAX_TITLES_PER_REQUEST  # Titles per batched MediaWiki query
+
+# Rate Limiting (one token bucket per language, see limiter.py)
+GEMINI_REQUESTS_PER_MINUTE = 40  # Sustained Gemini request rate per language
+GEMINI_BURST = 2  # Requests allowed back-to-back before pacing kicks in
+GEMINI_MAX_RETRIES = 4  # Retries per article on transient errors / 429s
+GEMINI_BATCH_SIZE = 1  # Articles per Gemini request (--gemini-batch)
+GEMINI_STREAM = False  # Stream single-article generations and parse them as they arrive (--stream)
+
+# Article discovery (pageview top lists)
+PAGEVIEW_WINDOW_DAYS = 30  # Daily top lists merged into the candidate list (--pageview-days)
+PAGEVIEW_SCORE = "sum"  # How days are merged: sum, decay or median (--pageview-score)
+PAGEVIEW_HALF_LIFE_DAYS = 7  # Half-life of a day's views with --pageview-score decay
+PAGEVIEW_FETCH_WORKERS = 10  # Daily top lists fetched at once
+PAGEVIEW_REQUESTS_PER_SECOND = 20  # Pageview API pacing (its limit is 100/s)
+
+# Concurrent pipeline (--concurrent)
+FETCH_WORKERS = 4  # In-flight Wikipedia summary requests
+GENERATE_WORKERS = 2  # In-flight Gemini requests
+PIPELINE_QUEUE_SIZE = 8  # Fetched summaries waiting for a Gemini worker
+POSTPROCESS_WORKERS = 1  # Processes for validation/SQL rendering (--workers; >1 for big replays)
+
+# Cache Configuration (see cache.py)
+CACHE_FILE = DEFAULT_CACHE_PATH  # SQLite file for summaries and generations
+CACHE_TTL_DAYS = 30  # Cached entries expire after this many days
+CACHE_MAX_MB = 512  # Least recently used entries are evicted past this size
+REVISION_TTL_HOURS = 24  # How long a title -> revision lookup is trusted
 
 # Output Configuration
 OUTPUT_FILE = "seed_generated.sql"
+SQL_BATCH_SIZE = 1  # Rows per INSERT statement (raise for faster bulk loads)
 
 # Exclusion patterns for meta pages
 EXCLUDED_PATTERNS = [
@@ -81,6 +179,7 @@ EXCLUDED_PATTERNS = [
     "TimedText:",
     "Module:",
 ]
+_EXCLUDED_RE = re.compile("|".join(re.escape(pattern) for pattern in EXCLUDED_PATTERNS))
 
 
 # =============================================================================
@@ -132,59 +231,201 @@ CRITICAL RULES:
 10. wiki_or_fiction statements should be surprising but accurate
 """
 
+# Batched generation (--gemini-batch N): several articles per request, with a
+# JSON response schema instead of free-form text
+BATCH_SYSTEM_INSTRUCTION = SYSTEM_INSTRUCTION + """
+BATCH MODE:
+You may receive several articles in one request, each under a "### Article N" heading.
+Return a JSON array with exactly one object per article, in the same order.
+Each object has a "title" field (copied exactly from the article) plus the four
+question sections above. Every rule above applies to every article.
+"""
+
+
+def _schema_object(properties: dict) -> dict:
+    return {"type": "OBJECT", "properties": properties, "required": list(properties)}
+
+
+_STRING = {"type": "STRING"}
+_STRINGS = {"type": "ARRAY", "items": _STRING}
+
+QUESTION_SET_SCHEMA = _schema_object({
+    "title": _STRING,
+    "odd_wiki_out": _schema_object({
+        "items": _STRINGS,
+        "impostor_index": {"type": "INTEGER"},
+        "connection": _STRING,
+        "topic": _STRING,
+    }),
+    "when_in_wiki": _schema_object({
+        "event": _STRING,
+        "correct_year": {"type": "INTEGER"},
+        "year_options": {"type": "ARRAY", "items": {"type": "INTEGER"}},
+        "topic": _STRING,
+    }),
+    "wiki_or_fiction": _schema_object({
+        "statement": _STRING,
+        "is_true": {"type": "BOOLEAN"},
+        "explanation": _STRING,
+        "topic": _STRING,
+    }),
+    "wiki_links": _schema_object({
+        "titles": _STRINGS,
+        "connection": _STRING,
+        "connection_options": _STRINGS,
+        "topic": _STRING,
+    }),
+})
+
+BATCH_GENERATION_CONFIG = {
+    **GENERATION_CONFIG,
+    "max_output_tokens": 8192,
+    "response_mime_type": "application/json",
+    "response_schema": {"type": "ARRAY", "items": QUESTION_SET_SCHEMA},
+}
+
+# --local-distractors: Gemini only writes the answers, distractors.py the
+# year_options and wrong connection_options
+LOCAL_SYSTEM_INSTRUCTION = without_distractors(SYSTEM_INSTRUCTION)
+LOCAL_BATCH_SYSTEM_INSTRUCTION = without_distractors(BATCH_SYSTEM_INSTRUCTION)
+LOCAL_BATCH_GENERATION_CONFIG = {
+    **BATCH_GENERATION_CONFIG,
+    "response_schema": {"type": "ARRAY", "items": without_distractor_fields(QUESTION_SET_SCHEMA)},
+}
+
 
 # =============================================================================
 # HELPER FUNCTIONS: Wikipedia Fetching
 # =============================================================================
 
-def get_top_articles(count: int = 100) -> list[str]:
+def is_excluded(title: str) -> bool:
+    return _EXCLUDED_RE.search(title.replace(" ", "_")) is not None
+
+
+def fetch_daily_top(day: datetime, language: str = "en") -> list[tuple[str, int, int]]:
+    """
+    One day's most-viewed articles of an edition as (title, views, rank),
+    meta pages removed. Finished days never change, so they are cached for
+    the whole window.
     """
-    Fetch the most-viewed Wikipedia articles from the last 30 days.
+    key = content_key(language, day.strftime("%Y%m%d"))
+    if response_cache:
+        cached = response_cache.get("pageviews", key)
+        if cached is not None:
+            return [tuple(entry) for entry in cached]
+    pageview_limiter.acquire()
+    with metrics.timer("wikipedia.pageviews_day"):
+        result = pageviewapi.top(
+            project=f"{language}.wikipedia",
+            access="all-access",
+            year=str(day.year),
+            month=f"{day.month:02d}",
+            day=f"{day.day:02d}"
+        )
+    top = [
+        (article["article"].replace("_", " "), article.get("views", 0), article.get("rank", rank))
+        for item in (result or {}).get("items", [])
+        for rank, article in enumerate(item.get("articles", []), 1)
+        if article.get("article") and not is_excluded(article["article"])
+    ]
+    if response_cache and top:
+        response_cache.set("pageviews", key, top, ttl=(PAGEVIEW_WINDOW_DAYS + 1) * 86400)
+    return top
+
+
+def aggregate_top(days: list[list[tuple[str, int, int]]], count: int, score: str = "sum") -> list[str]:
+    """
+    Merge daily top lists (most recent day first) into the `count` best
+    titles: by total views ("sum"), by views decayed with a
+    PAGEVIEW_HALF_LIFE_DAYS half-life ("decay"), or by median daily rank
+    ("median", days a title missed count as one past the end of the list).
+    Ties go to the title that sorts first, so the order is stable.
+    """
+    if score == "median":
+        ranks: dict[str, list[int]] = {}
+        for top in days:
+            for title, _, rank in top:
+                ranks.setdefault(title, []).append(rank)
+        unlisted = max((len(top) for top in days), default=0) + 1
+        
+        def median_rank(title: str) -> float:
+            listed = sorted(ranks[title])
+            ordered = listed + [unlisted] * (len(days) - len(listed))
+            middle = len(ordered) // 2
+            return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+        
+        return heapq.nsmallest(count, ranks, key=lambda title: (median_rank(title), title))
+    
+    scores: dict[str, float] = {}
+    for age, top in enumerate(days):
+        weight = 0.5 ** (age / PAGEVIEW_HALF_LIFE_DAYS) if score == "decay" else 1.0
+        for title, views, _ in top:
+            scores[title] = scores.get(title, 0.0) + views * weight
+    return [title for title, _ in heapq.nsmallest(count, scores.items(), key=lambda item: (-item[1], item[0]))]
+
+
+@metrics.timed("wikipedia.top_articles")
+def get_top_articles(count: int = 100, language: str = "en", days: int = PAGEVIEW_WINDOW_DAYS,
+                     score: str = PAGEVIEW_SCORE) -> list[str]:
+    """
+    Fetch the most-viewed articles of a Wikipedia edition over the last
+    `days` days. The daily top lists are fetched concurrently (paced by the
+    pageview limiter, finished days served from the cache) and merged with
+    aggregate_top(), so one-day spikes do not crowd out steady favourites.
     Returns a list of article titles (already filtered for meta pages).
     """
-    print(f"\n📡 Fetching top {count} Wikipedia articles...")
+    print(f"\n📡 Fetching top {count} {language}.wikipedia articles ({days}-day {score})...")
     
     if not PAGEVIEW_AVAILABLE:
-        return get_fallback_articles(count)
+        return get_fallback_articles(count, language)
     
-    # Calculate date range (last 30 days)
+    # Most recent complete day first
     end_date = datetime.now() - timedelta(days=1)
+    window = [end_date - timedelta(days=age) for age in range(max(1, days))]
     
-    try:
-        # Get pageview data for the last month
-        result = pageviewapi.top(
-            project="en.wikipedia",
-            access="all-access",
-            year=str(end_date.year),
-            month=f"{end_date.month:02d}",
-            day=f"{end_date.day:02d}"
-        )
-        
-        articles = []
-        if result and "items" in result:
-            for item in result["items"]:
-                if "articles" in item:
-                    for article in item["articles"]:
-                        title = article.get("article", "")
-                        # Filter out meta pages
-                        if not any(pattern in title for pattern in EXCLUDED_PATTERNS):
-                            # Replace underscores with spaces for readability
-                            articles.append(title.replace("_", " "))
-                            if len(articles) >= count:
-                                break
-                        
-        print(f"✅ Found {len(articles)} valid articles")
-        return articles[:count] if articles else get_fallback_articles(count)
-        
-    except Exception as e:
-        print(f"❌ Error fetching pageviews: {e}")
+    daily: list[list[tuple[str, int, int]]] = []
+    errors = 0
+    with ThreadPoolExecutor(max_workers=min(PAGEVIEW_FETCH_WORKERS, len(window))) as pool:
+        futures = [pool.submit(fetch_daily_top, day, language) for day in window]
+        for future in futures:
+            try:
+                daily.append(future.result())
+            except Exception as e:
+                errors += 1
+                daily.append([])
+                last_error = e
+    if errors:
+        print(f"   ⚠️ {errors}/{len(window)} days unavailable ({last_error})")
+    
+    articles = aggregate_top(daily, count, score)
+    if not articles:
+        print("❌ No pageview data")
         print("   Falling back to curated popular topics...")
-        return get_fallback_articles(count)
+        return get_fallback_articles(count, language)
+    print(f"✅ Found {len(articles)} valid articles")
+    return articles
 
 
-def get_fallback_articles(count: int) -> list[str]:
+@metrics.timed("articles.index_select")
+def get_index_articles(index: TitleIndex, count: int, band: tuple[float, float] = (0.0, 100.0),
+                       days: tuple[Optional[str], Optional[str]] = (None, None),
+                       topic: Optional[str] = None, sample: bool = False,
+                       language: str = "en") -> list[str]:
+    """
+    Select articles offline from a title index built by title_index.py
+    (by view percentile band, date range and/or topic pattern).
+    """
+    print(f"\n🗂️ Selecting {count} articles from {index.path}...")
+    articles = index.select(count, band, *days, topic=topic, exclude=is_excluded, sample=sample)
+    print(f"✅ Found {len(articles)} valid articles")
+    return articles or get_fallback_articles(count, language)
+
+
+def get_fallback_articles(count: int, language: str = "en") -> list[str]:
     """
     Fallback list of popular Wikipedia topics in case pageview API fails.
+    For other editions the English titles are followed through their
+    interlanguage links.
     """
     fallback = [
         "Albert Einstein", "World War II", "The Beatles", "Moon landing",
@@ -197,40 +438,257 @@ def get_fallback_articles(count: int) -> list[str]:
         "Vincent van Gogh", "Napoleon Bonaparte", "Climate change"
     ]
     random.shuffle(fallback)
+    if language != "en":
+        try:
+            linked = get_client("en").query_langlinks(fallback, language)
+        except Exception as e:
+            print(f"   ❌ Error following interlanguage links: {e}")
+            return []
+        fallback = [linked[title] for title in fallback if linked.get(title)]
     return fallback[:count]
 
 
-def get_article_summary(title: str, max_words: int = 500) -> Optional[str]:
+_wiki_local = threading.local()
+
+
+def get_wiki(language: str = "en") -> wikipediaapi.Wikipedia:
+    """
+    Reuse one wikipedia-api client per thread and language. The client holds
+    a requests session, so connections stay alive between lookups.
+    """
+    wikis = getattr(_wiki_local, "wikis", None)
+    if wikis is None:
+        wikis = _wiki_local.wikis = {}
+    if language not in wikis:
+        wikis[language] = wikipediaapi.Wikipedia(user_agent=USER_AGENT, language=language)
+    return wikis[language]
+
+
+def truncate_words(text: str, max_words: int) -> str:
+    """Keep the first N words of a text."""
+    return " ".join(text.split()[:max_words])
+
+
+@metrics.timed("wikipedia.summary")
+def get_article_summary(title: str, max_words: int = 500, language: str = "en") -> Optional[str]:
     """
     Fetch the summary of a Wikipedia article using wikipedia-api.
     Returns the first N words of the article summary.
     """
-    wiki = wikipediaapi.Wikipedia(
-        user_agent="WikiGuesserBot/1.0 (https://wiki-guesser.vercel.app)",
-        language="en"
-    )
-    
     try:
-        page = wiki.page(title)
+        page = get_wiki(language).page(title)
         if not page.exists():
             print(f"   ⚠️ Article '{title}' not found")
             return None
             
-        summary = page.summary
-        words = summary.split()
-        truncated = " ".join(words[:max_words])
-        return truncated
+        return truncate_words(page.summary, max_words)
         
     except Exception as e:
         print(f"   ❌ Error fetching '{title}': {e}")
         return None
 
 
+# Set by main(); None disables caching
+response_cache: Optional[ResponseCache] = None
+
+# Replaced by main() with one that also checks wiki_links titles
+question_validator = QuestionValidator()
+
+# Set by main(); None disables the mined-article ledger
+mined_ledger: Optional[MinedLedger] = None
+
+# Set by main() with --local-distractors; None has Gemini write the distractors
+distractor_engine: Optional[DistractorEngine] = None
+
+# Set by main() from --stream
+stream_generations = GEMINI_STREAM
+
+# Set by main() with --balance; None keeps the popularity order
+balance_scheduler: Optional[BalanceScheduler] = None
+
+# Per-article model choice and run budget (--route); set by main()
+model_router: Optional[ModelRouter] = None
+routed_models: dict[str, genai.GenerativeModel] = {}
+_routed_models_lock = threading.Lock()
+
+
+def get_revisions(titles: list[str], language: str = "en") -> dict[str, Optional[dict]]:
+    """
+    Current {"title", "revision"} of each title (None if the page does not
+    exist), from a recent cached lookup when there is one, otherwise from
+    batched info queries. Titles that could not be checked are left out.
+    """
+    cache = response_cache
+    revisions: dict[str, Optional[dict]] = {}
+    unknown = []
+    for title in titles:
+        page = cache.get("revision", content_key(language, title)) if cache else None
+        if page is None:
+            unknown.append(title)
+        else:
+            revisions[title] = page
+    client = get_client(language)
+    for start in range(0, len(unknown), SUMMARY_BATCH_SIZE):
+        batch = unknown[start:start + SUMMARY_BATCH_SIZE]
+        try:
+            pages = client.query_revisions(batch)
+        except Exception as e:
+            print(f"   ❌ Error checking revisions: {e}")
+            continue
+        for title, page in pages.items():
+            revisions[title] = page
+            if page and cache:
+                cache.set("revision", content_key(language, title), page, ttl=REVISION_TTL_HOURS * 3600)
+    return revisions
+
+
+@metrics.timed("wikipedia.summaries")
+def get_article_summaries(titles: list[str], max_words: int = 500,
+                          language: str = "en") -> dict[str, Optional[str]]:
+    """
+    Fetch summaries for many articles with batched MediaWiki queries
+    (up to SUMMARY_BATCH_SIZE titles per request, redirects and missing
+    pages resolved in the same round trip).
+    
+    With the response cache enabled, summaries are stored by
+    (language, title, revision id). A recent title -> revision lookup is
+    trusted for REVISION_TTL_HOURS, so warm re-runs make no requests; after
+    that one cheap info query per batch decides which extracts changed.
+    Returns {title: first N words of the summary, or None}.
+    """
+    summaries: dict[str, Optional[str]] = {title: None for title in titles}
+    client = get_client(language)
+    cache = response_cache
+    
+    for start in range(0, len(titles), SUMMARY_BATCH_SIZE):
+        batch = titles[start:start + SUMMARY_BATCH_SIZE]
+        pending = batch
+        
+        if cache:
+            revisions = get_revisions(batch, language)
+            pending = []
+            for title in batch:
+                page = revisions.get(title)
+                summary = page and cache.get("summary", content_key(language, title, page["revision"]))
+                if summary is None:
+                    pending.append(title)
+                else:
+                    summaries[title] = truncate_words(summary, max_words)
+                    if mined_ledger:
+                        mined_ledger.note(title, page["revision"], summaries[title], language)
+        
+        if not pending:
+            continue
+        try:
+            pages = client.query_summaries(pending)
+        except Exception as e:
+            print(f"   ❌ Error fetching batch of {len(pending)} summaries: {e}")
+            continue
+        for title, page in pages.items():
+            if page is None:
+                print(f"   ⚠️ Article '{title}' not found")
+                continue
+            summaries[title] = truncate_words(page["summary"], max_words)
+            if mined_ledger:
+                mined_ledger.note(title, page["revision"], summaries[title], language)
+            if cache:
+                cache.set("revision", content_key(language, title),
+                          {"title": page["title"], "revision": page["revision"]},
+                          ttl=REVISION_TTL_HOURS * 3600)
+                cache.set("summary", content_key(language, title, page["revision"]), page["summary"])
+    
+    return summaries
+
+
+@metrics.timed("articles.delta")
+def select_delta(ledger: MinedLedger, titles: list[str], flag_refresh: bool = False,
+                 language: str = "en") -> list[str]:
+    """
+    Keep only the articles worth (re-)mining: never mined, or mined from a
+    revision whose summary has since been rewritten. Mined articles are
+    checked with one revision query per batch; only those with a new
+    revision have their summary fetched and compared. With `flag_refresh`,
+    the questions of rewritten articles are flagged in the ledger.
+    """
+    mined = ledger.lookup(titles, language)
+    if not mined:
+        return titles
+    revisions = get_revisions(list(mined), language)
+    moved = [
+        title for title, entry in mined.items()
+        if revisions.get(title) and revisions[title]["revision"] != entry["revision"]
+    ]
+    summaries = get_article_summaries(moved, MAX_SUMMARY_WORDS, language) if moved else {}
+    
+    changed = set()
+    for title in moved:
+        summary = summaries.get(title)
+        if summary is not None and not ledger.is_rewritten(mined[title], summary):
+            ledger.touch(title, revisions[title]["revision"], language)
+            continue
+        changed.add(title)
+        if flag_refresh and summary is not None:
+            ledger.flag_refresh(title, mined[title]["question_ids"], language)
+    
+    selected = [title for title in titles if title not in mined or title in changed]
+    print(f"🔁 Delta: {len(titles) - len(mined)} new, {len(changed)} changed, "
+          f"{len(mined) - len(changed)} unchanged (skipped)")
+    return selected
+
+
+def get_descriptions(titles: list[str], language: str = "en") -> dict[str, str]:
+    """
+    Short description of each title ("" if it has none), cached like
+    summaries. Titles that could not be looked up are left out.
+    """
+    cache = response_cache
+    descriptions: dict[str, str] = {}
+    unknown = []
+    for title in titles:
+        description = cache.get("description", content_key(language, title)) if cache else None
+        if description is None:
+            unknown.append(title)
+        else:
+            descriptions[title] = description
+    client = get_client(language)
+    for start in range(0, len(unknown), SUMMARY_BATCH_SIZE):
+        batch = unknown[start:start + SUMMARY_BATCH_SIZE]
+        try:
+            pages = client.query_descriptions(batch)
+        except Exception as e:
+            print(f"   ❌ Error fetching descriptions: {e}")
+            continue
+        for title, description in pages.items():
+            descriptions[title] = description or ""
+            if cache and description is not None:
+                cache.set("description", content_key(language, title), description)
+    return descriptions
+
+
+@metrics.timed("articles.balance")
+def balance_articles(scheduler: BalanceScheduler, titles: list[str], limit: int,
+                     language: str = "en", picked: list[str] = ()) -> BalancedOrder:
+    """
+    Pre-classify candidates by title and short description (no Gemini
+    calls) and let the scheduler pick the `limit` that best even out the
+    topic distribution as the run reaches them. `picked` are the titles a
+    resumed run already mined.
+    """
+    descriptions = get_descriptions(titles, language)
+    predicted = [(title, classify(title, descriptions.get(title, ""))) for title in titles]
+    candidates = Counter(topic for _, topic in predicted)
+    print(f"⚖️ Balancing {min(limit, len(titles))} of {len(titles)} candidates: "
+          + ", ".join(f"{topic} {count}" for topic, count in candidates.most_common()))
+    return scheduler.order(predicted, limit, picked)
+
+
 # =============================================================================
 # HELPER FUNCTIONS: Gemini Question Generation
 # =============================================================================
 
-def initialize_gemini() -> Optional[genai.GenerativeModel]:
+def initialize_gemini(system_instruction: str = SYSTEM_INSTRUCTION,
+                      generation_config: dict = GENERATION_CONFIG,
+                      model_name: str = MODEL_NAME) -> Optional[genai.GenerativeModel]:
     """
     Initialize the Gemini model with API key and configuration.
     """
@@ -242,25 +700,223 @@ def initialize_gemini() -> Optional[genai.GenerativeModel]:
     try:
         genai.configure(api_key=GOOGLE_API_KEY)
         model = genai.GenerativeModel(
-            model_name=MODEL_NAME,
-            system_instruction=SYSTEM_INSTRUCTION,
-            generation_config={
-                "temperature": 0.8,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 2048,
-            }
+            model_name=model_name,
+            system_instruction=system_instruction,
+            generation_config=generation_config
         )
-        print(f"✅ Initialized {MODEL_NAME} model")
+        print(f"✅ Initialized {model_name} model")
         return model
     except Exception as e:
         print(f"❌ Error initializing Gemini: {e}")
         return None
 
 
-def generate_questions(model: genai.GenerativeModel, title: str, summary: str) -> Optional[dict]:
+# Shared by the serial loop and every concurrent generate worker of a language
+gemini_limiter = TokenBucket(rate=GEMINI_REQUESTS_PER_MINUTE / 60, capacity=GEMINI_BURST)
+gemini_limiters = {"en": gemini_limiter}
+pageview_limiter = TokenBucket(rate=PAGEVIEW_REQUESTS_PER_SECOND, capacity=PAGEVIEW_FETCH_WORKERS)
+_limiters_lock = threading.Lock()
+
+
+def get_gemini_limiter(language: str = "en") -> TokenBucket:
+    """The Gemini limiter for a language's workers (created on first use)."""
+    with _limiters_lock:
+        if language not in gemini_limiters:
+            gemini_limiters[language] = TokenBucket(rate=gemini_limiter.max_rate, capacity=gemini_limiter.capacity)
+        return gemini_limiters[language]
+
+
+def system_instruction(batch: bool = False) -> str:
+    """The system instruction in use (without distractor fields with --local-distractors)."""
+    if distractor_engine:
+        return LOCAL_BATCH_SYSTEM_INSTRUCTION if batch else LOCAL_SYSTEM_INSTRUCTION
+    return BATCH_SYSTEM_INSTRUCTION if batch else SYSTEM_INSTRUCTION
+
+
+def answer_note() -> str:
+    """Prompt reminder about connection_options ("" when they are made locally)."""
+    return "" if distractor_engine else " The first connection_option must be the correct answer."
+
+
+def language_note(language: str) -> str:
+    """Prompt addition asking for questions in the article's language ("" for English)."""
+    if language == "en":
+        return ""
+    return (f"\nWrite every question, option, statement and explanation in the article's language "
+            f"({language}); keep \"topic\" in English.")
+
+
+def classify_gemini_error(error: Exception) -> Exception:
+    """
+    Map a Gemini client exception onto the limiter's retry signals.
+    Quota / 429 errors become RateLimited (with the server's retry delay when
+    it sends one), 5xx and timeouts become RetryableError, anything else is
+    returned unchanged.
+    """
+    if google_exceptions is not None:
+        if isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+            return RateLimited(str(error), retry_after=parse_retry_after(str(error)))
+        if isinstance(error, (google_exceptions.ServiceUnavailable,
+                              google_exceptions.InternalServerError,
+                              google_exceptions.DeadlineExceeded)):
+            return RetryableError(str(error))
+    elif "429" in str(error) or "quota" in str(error).lower():
+        return RateLimited(str(error), retry_after=parse_retry_after(str(error)))
+    return error
+
+
+def record_usage(response, model_name: str = MODEL_NAME) -> None:
+    """
+    Count prompt/response tokens from a Gemini response's usage metadata
+    (and charge them to the run budget with --route).
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        tokens_in = getattr(usage, "prompt_token_count", 0) or 0
+        tokens_out = getattr(usage, "candidates_token_count", 0) or 0
+        metrics.incr("gemini.tokens", tokens_in, direction="in")
+        metrics.incr("gemini.tokens", tokens_out, direction="out")
+        if model_router:
+            model_router.budget.charge(model_name, tokens_in, tokens_out)
+
+
+def call_gemini(model: genai.GenerativeModel, prompt: str, generation_config: Optional[dict] = None):
+    """
+    One timed generate_content call; errors are counted and classified for
+    retry. `generation_config` overrides the model's for this call. With
+    --route, an answer cut off at the output cap raises OutputTruncated
+    (a retry at the same cap would be cut off again; the router escalates).
+    """
+    options = {"generation_config": generation_config} if generation_config else {}
+    try:
+        with metrics.timer("gemini.request"):
+            response = model.generate_content(prompt, **options)
+            response_text = response.text.strip()
+    except Exception as e:
+        error = classify_gemini_error(e)
+        metrics.incr("gemini.errors", kind=type(error).__name__)
+        raise error from e
+    record_usage(response, model_name_of(model, MODEL_NAME))
+    if model_router and is_truncated(response):
+        metrics.incr("gemini.errors", kind="Truncated")
+        raise OutputTruncated("Answer cut off at the output token cap")
+    return response_text
+
+
+def request_questions(model: genai.GenerativeModel, prompt: str, generation_config: Optional[dict] = None) -> dict:
+    """
+    Make one Gemini call and parse the response.
+    Raises RetryableError for transient failures (including malformed JSON,
+    which a second sample usually fixes).
+    """
+    response_text = call_gemini(model, prompt, generation_config)
+    
+    # Clean up response (remove markdown code blocks if present)
+    if response_text.startswith("```"):
+        lines = response_text.split("\n")
+        response_text = "\n".join(lines[1:-1] if lines[-1].strip() == "```" else lines[1:])
+    response_text = response_text.strip()
+    
+    # Parse JSON
+    try:
+        questions = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        metrics.incr("gemini.errors", kind="MalformedJSON")
+        raise RetryableError(f"JSON parse error: {e}") from e
+    
+    # Validate structure
+    if not has_required_sections(questions):
+        metrics.incr("gemini.errors", kind="MissingSections")
+        raise RetryableError("Missing required keys in response")
+    
+    return questions
+
+
+def close_stream(chunks) -> None:
+    """Stop consuming a streamed response, so no more output tokens are generated."""
+    close = getattr(chunks, "close", None)  # Generators close; plain iterators have nothing to release
+    if callable(close):
+        close()
+
+
+def request_questions_stream(model: genai.GenerativeModel, prompt: str,
+                             generation_config: Optional[dict] = None) -> dict:
+    """
+    Like request_questions, but streamed: the answer is parsed as chunks
+    arrive, each section is shape-checked the moment it closes, and the
+    stream is closed as soon as the text cannot become a valid question set
+    - malformed JSON or a section failing its check - or once the JSON
+    object is complete. Raises RetryableError for aborted, truncated or
+    incomplete answers; with --route, an answer cut off at the output cap
+    raises OutputTruncated like call_gemini.
+    """
+    parser = SectionParser(CHECKS)
+    start = time.perf_counter()
+    chunks = None
+    chunk = None
+    usage = None
+    first_usable = True
+    try:
+        with metrics.timer("gemini.request"):
+            options = {"generation_config": generation_config} if generation_config else {}
+            chunks = iter(model.generate_content(prompt, stream=True, **options))
+            for chunk in chunks:
+                if getattr(chunk, "usage_metadata", None) is not None:
+                    usage = chunk
+                for category, section in parser.feed(chunk.text):
+                    # Checks repair in place, and local distractors are only filled in after the stream
+                    section = copy.deepcopy(section)
+                    if distractor_engine:
+                        section = distractor_engine.fill_section(category, section)
+                    failed, _ = CHECKS[category](section)
+                    metrics.incr("gemini.stream_sections", outcome="failed" if failed else "passed")
+                    if failed:
+                        raise StreamViolation(f"{category} failed {failed}")
+                    if first_usable:
+                        metrics.observe("gemini.first_usable_section", time.perf_counter() - start)
+                        first_usable = False
+                if parser.done:
+                    break
+    except StreamViolation as e:
+        metrics.incr("gemini.stream_aborted")
+        metrics.incr("gemini.errors", kind="StreamViolation")
+        raise RetryableError(f"Aborted stream: {e}") from e
+    except Exception as e:
+        error = classify_gemini_error(e)
+        metrics.incr("gemini.errors", kind=type(error).__name__)
+        raise error from e
+    finally:
+        close_stream(chunks)
+    if usage is not None:
+        record_usage(usage, model_name_of(model, MODEL_NAME))
+    
+    if model_router and chunk is not None and is_truncated(chunk):
+        metrics.incr("gemini.errors", kind="Truncated")
+        raise OutputTruncated("Answer cut off at the output token cap")
+    if not parser.done:
+        metrics.incr("gemini.errors", kind="MalformedJSON")
+        raise RetryableError("Stream ended before the JSON object was complete")
+    if not has_required_sections(parser.seen):
+        metrics.incr("gemini.errors", kind="MissingSections")
+        raise RetryableError("Missing required keys in response")
+    return parser.seen
+
+
+def has_required_sections(questions) -> bool:
+    """Check that a question set has all four category sections."""
+    required_keys = ["odd_wiki_out", "when_in_wiki", "wiki_or_fiction", "wiki_links"]
+    return isinstance(questions, dict) and all(key in questions for key in required_keys)
+
+
+@metrics.timed("gemini.generate")
+def generate_questions(model: genai.GenerativeModel, title: str, summary: str,
+                       language: str = "en", route: Optional[dict] = None) -> Optional[dict]:
     """
     Call Gemini API to generate quiz questions for an article.
+    Each attempt takes a token from the language's limiter; transient errors and
+    429s are retried with jittered exponential backoff. Successful responses
+    are cached by (model, system prompt, prompt, generation config).
+    A router `route` sets the model name and output cap of the request.
     Returns parsed JSON or None on failure.
     """
     prompt = f"""
@@ -271,218 +927,1066 @@ Generate 4 quiz questions based on this Wikipedia article:
 **Article Summary:**
 {summary}
 
-Remember: Return ONLY valid JSON (no markdown, no code blocks). The first connection_option must be the correct answer.
+Remember: Return ONLY valid JSON (no markdown, no code blocks).{answer_note()}{language_note(language)}
 """
 
+    cache = response_cache
+    # The output cap is left out of the key: a complete answer does not depend on it
+    model_name = route["model"] if route else MODEL_NAME
+    cache_key = content_key(model_name, text_hash(system_instruction()), text_hash(prompt), GENERATION_CONFIG)
+    generation_config = {**GENERATION_CONFIG, "max_output_tokens": route["max_output_tokens"]} if route else None
+    if cache:
+        cached = cache.get("generation", cache_key)
+        if cached is not None:
+            return cached
+
+    def log_retry(attempt: int, error: Exception, delay: float) -> None:
+        metrics.incr("gemini.retries")
+        metrics.incr("gemini.backoff_seconds", delay)
+        print(f"   🔁 Retry {attempt}/{GEMINI_MAX_RETRIES} for '{title}' in {delay:.1f}s: {error}")
+
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up response (remove markdown code blocks if present)
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1] if lines[-1].strip() == "```" else lines[1:])
-        response_text = response_text.strip()
-        
-        # Parse JSON
-        questions = json.loads(response_text)
-        
-        # Validate structure
-        required_keys = ["odd_wiki_out", "when_in_wiki", "wiki_or_fiction", "wiki_links"]
-        if not all(key in questions for key in required_keys):
-            print("   ⚠️ Missing required keys in response")
-            return None
-            
+        questions = retry_call(
+            request_questions_stream if stream_generations else request_questions, model, prompt, generation_config,
+            limiter=get_gemini_limiter(language),
+            retries=GEMINI_MAX_RETRIES,
+            on_retry=log_retry,
+        )
+        if cache:
+            cache.set("generation", cache_key, questions)
         return questions
-        
-    except json.JSONDecodeError as e:
-        print(f"   ⚠️ JSON parse error: {e}")
+    except RetryableError as e:
+        print(f"   ⚠️ Giving up on '{title}': {e}")
+        return None
+    except OutputTruncated as e:
+        print(f"   ✂️ '{title}': {e}")
         return None
     except Exception as e:
         print(f"   ❌ Gemini API error: {e}")
         return None
 
 
+def batch_article_prompt(title: str, summary: str) -> str:
+    """One article's section of a batched prompt (also its cache identity)."""
+    return f"""**Article Title:** {title}
+
+**Article Summary:**
+{summary}
+"""
+
+
+def request_questions_batch(model: genai.GenerativeModel, prompt: str) -> list:
+    """
+    Make one batched Gemini call and return the parsed JSON array.
+    API errors are classified for retry; a response that is not a JSON array
+    (usually truncated output) raises ValueError so the caller splits the
+    batch instead of paying for the same oversized request again.
+    """
+    response_text = call_gemini(model, prompt)
+    
+    parsed = json.loads(response_text)
+    if not isinstance(parsed, list):
+        raise ValueError("Batched response is not a JSON array")
+    return parsed
+
+
+@metrics.timed("gemini.generate_batch")
+def generate_questions_batch(model: genai.GenerativeModel, articles: list[tuple[str, str]],
+                             language: str = "en") -> dict[str, Optional[dict]]:
+    """
+    Generate questions for several articles in as few requests as possible.
+    
+    All (title, summary) pairs are packed into one request with a JSON
+    response schema, so the system instruction and per-call overhead are
+    paid once per batch. Articles missing or malformed in the response - or
+    the whole batch, if the request keeps failing - are split in half and
+    retried, down to single-article requests.
+    Returns {title: questions or None}.
+    """
+    results: dict[str, Optional[dict]] = {}
+    cache = response_cache
+    config_key = (MODEL_NAME, text_hash(system_instruction(batch=True)))
+    generation_config = LOCAL_BATCH_GENERATION_CONFIG if distractor_engine else BATCH_GENERATION_CONFIG
+    
+    def cache_key(title: str, summary: str) -> str:
+        prompt = batch_article_prompt(title, summary) + language_note(language)
+        return content_key(*config_key, text_hash(prompt), generation_config)
+    
+    pending = []
+    for title, summary in articles:
+        cached = cache.get("generation", cache_key(title, summary)) if cache else None
+        if cached is not None:
+            results[title] = cached
+        else:
+            pending.append((title, summary))
+    
+    def log_retry(attempt: int, error: Exception, delay: float) -> None:
+        metrics.incr("gemini.retries")
+        metrics.incr("gemini.backoff_seconds", delay)
+        print(f"   🔁 Retry {attempt}/{GEMINI_MAX_RETRIES} for batch of {len(batch)} in {delay:.1f}s: {error}")
+    
+    queue = [pending] if pending else []
+    while queue:
+        batch = queue.pop()
+        sections = "\n".join(
+            f"### Article {n}\n{batch_article_prompt(title, summary)}"
+            for n, (title, summary) in enumerate(batch, 1)
+        )
+        prompt = f"""
+Generate 4 quiz questions for EACH of these {len(batch)} Wikipedia articles.
+
+{sections}
+Return a JSON array with one object per article, in the same order, each including its "title".{answer_note()}{language_note(language)}
+"""
+        try:
+            generated = retry_call(
+                request_questions_batch, model, prompt,
+                limiter=get_gemini_limiter(language),
+                retries=GEMINI_MAX_RETRIES if len(batch) == 1 else 1,
+                on_retry=log_retry,
+            )
+        except (RetryableError, ValueError) as e:
+            print(f"   ⚠️ Batch of {len(batch)} failed: {e}")
+            generated = []
+        except Exception as e:
+            print(f"   ❌ Gemini API error: {e}")
+            generated = []
+        
+        by_title = {
+            item.get("title"): item for item in generated
+            if isinstance(item, dict) and has_required_sections(item)
+        }
+        missing = []
+        for position, (title, summary) in enumerate(batch):
+            questions = by_title.get(title)
+            if questions is None and len(generated) == len(batch):
+                # Title echoed back slightly differently; fall back to position
+                item = generated[position]
+                questions = item if has_required_sections(item) else None
+            if questions is None:
+                missing.append((title, summary))
+                continue
+            questions = {key: value for key, value in questions.items() if key != "title"}
+            results[title] = questions
+            if cache:
+                cache.set("generation", cache_key(title, summary), questions)
+        
+        if len(missing) > 1:
+            middle = len(missing) // 2
+            queue.extend([missing[middle:], missing[:middle]])
+        elif missing and len(batch) > 1:
+            queue.append(missing)
+        else:
+            for title, _ in missing:
+                print(f"   ⚠️ Giving up on '{title}'")
+                results[title] = None
+    
+    return results
+
+
+def routed_model(model_name: str) -> Optional[genai.GenerativeModel]:
+    """The single-article model for a router tier (initialized on first use)."""
+    with _routed_models_lock:
+        if model_name not in routed_models:
+            routed_models[model_name] = initialize_gemini(system_instruction(), GENERATION_CONFIG, model_name)
+        return routed_models[model_name]
+
+
+def generate_routed(title: str, summary: str, language: str = "en",
+                    above: Optional[str] = None) -> Optional[dict]:
+    """
+    Generate questions for one article on the model and output cap the
+    router picks, moving up a tier each time the answer fails validation's
+    shape checks (`above`: start past that model's tier). Returns None once
+    every tier has failed or the run budget is spent.
+    """
+    def attempt(route: dict) -> Optional[dict]:
+        model = routed_model(route["model"])
+        if model is None:
+            return None
+        budget = model_router.budget
+        print(f"   🧭 {title}: {route['model']}, {route['max_output_tokens']} output tokens "
+              f"(${budget.cost:.4f} spent)")
+        metrics.incr("router.attempts", model=route["model"], bucket=route["bucket"])
+        questions = generate_questions(model, title, summary, language, route)
+        if questions and distractor_engine:
+            with metrics.timer("distractors.fill"):
+                questions = distractor_engine.fill(questions)
+        return questions
+    
+    prompt_tokens = estimate_tokens(system_instruction()) + estimate_tokens(summary) + estimate_tokens(title) + 64
+    try:
+        return model_router.run(len(summary.split()), attempt, prompt_tokens, passes_checks, above)
+    except BudgetExhausted as e:
+        metrics.incr("router.refused")
+        print(f"   💸 Skipping '{title}': {e}")
+        return None
+
+
+def generate_many(model: genai.GenerativeModel, articles: list[tuple[str, str]],
+                  batch_model: Optional[genai.GenerativeModel] = None,
+                  language: str = "en") -> dict[str, Optional[dict]]:
+    """
+    Generate questions for a group of articles: one batched request when a
+    batch model is configured, otherwise one request per article. With
+    --local-distractors the decoy options are filled in here.
+    With --route, single articles go through the router; batched answers
+    that fail validation are routed from the tier above the batch model.
+    """
+    batched = batch_model is not None and len(articles) > 1
+    if model_router and model_router.budget.exhausted:
+        return {title: None for title, _ in articles}
+    if model_router and not batched:
+        return {title: generate_routed(title, summary, language) for title, summary in articles}
+    
+    if batched:
+        results = generate_questions_batch(batch_model, articles, language)
+    else:
+        results = {title: generate_questions(model, title, summary, language) for title, summary in articles}
+    if distractor_engine:
+        with metrics.timer("distractors.fill"):
+            results = {title: distractor_engine.fill(questions) if questions else questions
+                       for title, questions in results.items()}
+    if model_router:
+        for title, summary in articles:
+            if not passes_checks(results.get(title)):
+                results[title] = generate_routed(title, summary, language, above=model_name_of(batch_model, MODEL_NAME))
+    return results
+
+
 # =============================================================================
 # HELPER FUNCTIONS: SQL Generation
 # =============================================================================
 
-def escape_sql_string(s: str) -> str:
-    """Escape single quotes for SQL strings."""
-    if s is None:
-        return ""
-    return str(s).replace("'", "''")
+@metrics.timed("sql.insert")
+def generate_sql_insert(category: str, data: dict, wikipedia_url: str) -> str:
+    """
+    Generate SQL INSERT statement for a question category.
+    """
+    row = question_row(category, data, wikipedia_url)
+    return insert_statement(category, [row]) if row else ""
 
 
-def format_array_for_sql(items: list) -> str:
-    """Format a Python list as a PostgreSQL array literal."""
-    if not items:
-        return "ARRAY[]::TEXT[]"
-    escaped = [escape_sql_string(str(item)) for item in items]
-    return "ARRAY[" + ", ".join(f"'{item}'" for item in escaped) + "]"
+# =============================================================================
+# PIPELINE: Article Processing
+# =============================================================================
 
+CATEGORIES = list(QUESTION_TABLES)
 
-def format_int_array_for_sql(items: list) -> str:
-    """Format a Python list of integers as a PostgreSQL array literal."""
-    return "ARRAY[" + ", ".join(str(int(item)) for item in items) + "]"
 
+@metrics.timed("journal.emit")
+def finish_article(journal: RunJournal, index: int, title: str, rows: Optional[dict]) -> None:
+    """
+    Hand an article's validated rows to the journal, which writes them out
+    in article order. `rows` is None for articles that failed.
+    """
+    if rows:
+        journal.mark(index, title, "validated")
+    journal.complete(index, title, rows)
 
-def generate_sql_insert(category: str, data: dict, wikipedia_url: str) -> str:
+
+def mark_generated(journal: RunJournal, group: list[tuple[int, str, str]],
+                   results: dict[str, Optional[dict]]) -> None:
+    for index, title, _ in group:
+        if results.get(title):
+            print(f"   ✨ [{index + 1}] {title}: generated questions")
+            journal.mark(index, title, "generated")
+
+
+def finish_generated(journal: RunJournal, group: list[tuple[int, str, str]],
+                     results: dict[str, Optional[dict]], rows_list: list[Optional[dict]]) -> None:
+    """Journal and finish every article of a generated, post-processed group."""
+    mark_generated(journal, group, results)
+    for (index, title, _), rows in zip(group, rows_list):
+        finish_article(journal, index, title, rows)
+
+
+def iter_generated(model: genai.GenerativeModel, articles: list[str], max_articles: int,
+                   journal: RunJournal, batch_model: Optional[genai.GenerativeModel] = None,
+                   gemini_batch: int = GEMINI_BATCH_SIZE, language: str = "en"):
     """
-    Generate SQL INSERT statement for a question category.
+    Fetch and generate articles of one language edition in order: summaries
+    are fetched a batch at a time, then articles are generated one at a time
+    (or `gemini_batch` per request with a batch model), paced by the
+    language's Gemini limiter.
+    Yields (index, title, question set or None) in article order, skipping
+    articles the journal already finished. Titles are read from `articles`
+    a summary batch at a time, so a balanced order picks them as it goes.
     """
-    url = escape_sql_string(wikipedia_url)
+    count = min(max_articles, len(articles))
+    summaries: dict[str, Optional[str]] = {}
+    batch_start = None
+    group: list[tuple[int, str, str]] = []
+    
+    def flush_group():
+        results = generate_many(model, [(title, summary) for _, title, summary in group], batch_model, language)
+        mark_generated(journal, group, results)
+        finished = [(index, title, results.get(title)) for index, title, _ in group]
+        group.clear()
+        return finished
     
-    if category == "odd_wiki_out":
-        items = format_array_for_sql(data.get("items", []))
-        impostor = int(data.get("impostor_index", 0))
-        connection = escape_sql_string(data.get("connection", ""))
-        topic = escape_sql_string(data.get("topic", ""))
+    for index in range(count):
+        if journal.is_done(index):
+            continue
         
-        return f"""INSERT INTO odd_wiki_out_questions (items, impostor_index, connection, topic, wikipedia_url)
-VALUES ({items}, {impostor}, '{connection}', '{topic}', '{url}');"""
-
-    elif category == "when_in_wiki":
-        event = escape_sql_string(data.get("event", ""))
-        correct_year = int(data.get("correct_year", 2000))
-        year_options = format_int_array_for_sql(data.get("year_options", [2000, 2001, 2002, 2003]))
-        topic = escape_sql_string(data.get("topic", ""))
+        # Fetch the next batch of article summaries
+        if batch_start is None or index >= batch_start + SUMMARY_BATCH_SIZE:
+            batch_start = index
+            summaries = get_article_summaries(articles[index:min(index + SUMMARY_BATCH_SIZE, count)],
+                                              MAX_SUMMARY_WORDS, language)
+        title = articles[index]
+        print(f"\n[{index + 1}/{max_articles}] {title}")
+        summary = summaries.get(title)
+        if not summary:
+            if group:
+                yield from flush_group()
+            yield index, title, None
+            continue
+        print(f"   📖 Got {len(summary.split())} words")
+        journal.mark(index, title, "fetched")
         
-        return f"""INSERT INTO when_in_wiki_questions (event, correct_year, year_options, topic, wikipedia_url)
-VALUES ('{event}', {correct_year}, {year_options}, '{topic}', '{url}');"""
-
-    elif category == "wiki_or_fiction":
-        statement = escape_sql_string(data.get("statement", ""))
-        is_true = "true" if data.get("is_true", False) else "false"
-        explanation = escape_sql_string(data.get("explanation", ""))
-        topic = escape_sql_string(data.get("topic", ""))
+        # Generate questions via Gemini
+        group.append((index, title, summary))
+        if len(group) >= max(1, gemini_batch):
+            yield from flush_group()
+    
+    if group:
+        yield from flush_group()
+
+
+def run_serial(model: genai.GenerativeModel, articles: list[str], max_articles: int,
+               journal: RunJournal, batch_model: Optional[genai.GenerativeModel] = None,
+               gemini_batch: int = GEMINI_BATCH_SIZE, workers: int = 1,
+               check_titles: bool = True, cache_path: Optional[str] = None,
+               index_path: Optional[str] = None, validator: Optional[QuestionValidator] = None,
+               language: str = "en") -> None:
+    """
+    Process articles in order (see iter_generated). Each generated group is
+    validated and turned into rows inline, or with `workers` > 1 in chunks
+    on a process pool - worthwhile when replaying cached generations, where
+    post-processing is most of the work. Chunks never exceed one generated
+    group, so articles reach the journal (and --resume) as soon as they are
+    post-processed.
+    """
+    generated = iter_generated(model, articles, max_articles, journal, batch_model, gemini_batch, language)
+    chunk_size = max(1, gemini_batch)
+    for index, title, rows in iter_postprocessed(generated, validator or question_validator, workers,
+                                                 check_titles, cache_path, index_path, chunk_size, language):
+        finish_article(journal, index, title, rows)
+
+
+async def run_pipeline(
+    model: genai.GenerativeModel,
+    articles: list[str],
+    max_articles: int,
+    journal: RunJournal,
+    fetch_workers: int = FETCH_WORKERS,
+    generate_workers: int = GENERATE_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    batch_model: Optional[genai.GenerativeModel] = None,
+    gemini_batch: int = GEMINI_BATCH_SIZE,
+    validator: Optional[QuestionValidator] = None,
+    language: str = "en",
+) -> None:
+    """
+    Process one language's articles as two concurrent stages connected by a
+    bounded queue.
+    
+    Fetch workers pull batches of titles (one MediaWiki query each) and push
+    (index, title, summary) onto the queue; generate workers pull from the
+    queue (up to `gemini_batch` summaries at a time) and call Gemini. The
+    blocking client libraries run in threads, so each worker count is the
+    number of in-flight requests for that stage.
+    Results go to the journal, which emits them in article order, so the
+    SQL output matches a serial run. Articles the journal already finished
+    are skipped. Titles are read from `articles` only when a fetch worker
+    takes their batch, so a balanced order picks them as it goes.
+    """
+    count = min(max_articles, len(articles))
+    validator = validator or question_validator
+    
+    remaining = (index for index in range(count) if not journal.is_done(index))
+    summaries: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    
+    async def fetch_worker():
+        while True:
+            batch = [(index, articles[index]) for index in islice(remaining, SUMMARY_BATCH_SIZE)]
+            if not batch:
+                return
+            fetched = await asyncio.to_thread(
+                get_article_summaries, [title for _, title in batch], MAX_SUMMARY_WORDS, language
+            )
+            for index, title in batch:
+                summary = fetched.get(title)
+                if not summary:
+                    finish_article(journal, index, title, None)
+                    continue
+                print(f"   📖 [{index + 1}/{count}] {title}: {len(summary.split())} words")
+                journal.mark(index, title, "fetched")
+                await summaries.put((index, title, summary))
+    
+    async def generate_worker():
+        done = False
+        while not done:
+            item = await summaries.get()
+            if item is None:
+                return
+            group = [item]
+            while len(group) < max(1, gemini_batch):
+                try:
+                    item = summaries.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                group.append(item)
+            results = await asyncio.to_thread(
+                generate_many, model, [(title, summary) for _, title, summary in group], batch_model, language
+            )
+            rows_list = await asyncio.to_thread(
+                postprocess, validator, [(title, results.get(title)) for _, title, _ in group], language
+            )
+            finish_generated(journal, group, results, rows_list)
+    
+    async def feed():
+        await asyncio.gather(*(fetch_worker() for _ in range(max(1, fetch_workers))))
+        for _ in range(max(1, generate_workers)):
+            await summaries.put(None)
+    
+    # Watch every task at once: if one stage fails, the other would wait on the queue forever
+    tasks = [asyncio.create_task(feed())]
+    tasks += [asyncio.create_task(generate_worker()) for _ in range(max(1, generate_workers))]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def collect_run_gauges(lanes: list[dict] = ()) -> None:
+    """Refresh the gauges in the metrics report from the run's shared state."""
+    for language, limiter in list(gemini_limiters.items()):
+        metrics.gauge("gemini.rate_limit_wait_seconds", limiter.total_wait, language=language)
+        metrics.gauge("gemini.rate_per_second", limiter.rate, language=language)
+    if response_cache:
+        for namespace, counts in response_cache.stats().items():
+            metrics.gauge("cache.hits", counts["hits"], namespace=namespace)
+            metrics.gauge("cache.misses", counts["misses"], namespace=namespace)
+            metrics.gauge("cache.hit_rate", counts["hit_rate"], namespace=namespace)
+    if model_router:
+        budget = model_router.budget.summary()
+        metrics.gauge("router.cost_usd", budget["cost"])
+        metrics.gauge("router.tokens", budget["tokens"])
+        for model, usage in budget["models"].items():
+            metrics.gauge("router.requests", usage["requests"], model=model)
+    for lane in list(lanes):
+        language = lane["language"]
+        summary = lane["validator"].summary()
+        for rule, count in summary["failures"].items():
+            metrics.gauge("validation.failures", count, rule=rule, language=language)
+        for rule, count in summary["repairs"].items():
+            metrics.gauge("validation.repairs", count, rule=rule, language=language)
+        metrics.gauge("articles.succeeded", lane["journal"].success, language=language)
+        for category, count in lane["journal"].counts.items():
+            metrics.gauge("questions", count, category=category, language=language)
+
+
+@metrics.timed("output.write")
+def write_output(output_file: str, journal: RunJournal, processed: int,
+                 fmt: str = "insert", batch_size: int = 1, workers: int = 1) -> None:
+    """
+    Stream the journal's rows into the output, grouped by category.
+    For the csv format, `output_file` is a directory with one CSV per table.
+    With `workers` > 1, SQL literals are rendered on a process pool.
+    """
+    if fmt == "csv":
+        for category in CATEGORIES:
+            if journal.counts[category]:
+                write_csv(output_file, category, journal.iter_rows(category))
+        return
+    
+    total = sum(journal.counts.values())
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("-- Wiki Guesser - Generated Questions\n")
+        f.write(f"-- Generated on {datetime.now().isoformat()}\n")
+        f.write(f"-- Articles processed: {journal.success}/{processed}\n")
+        f.write(f"-- Total questions: {total}\n\n")
         
-        return f"""INSERT INTO wiki_or_fiction_questions (statement, is_true, explanation, topic, wikipedia_url)
-VALUES ('{statement}', {is_true}, '{explanation}', '{topic}', '{url}');"""
-
-    elif category == "wiki_links":
-        titles = format_array_for_sql(data.get("titles", []))
-        connection = escape_sql_string(data.get("connection", ""))
-        # Shuffle options so correct answer isn't always first
-        options = data.get("connection_options", ["", "", "", ""])
-        if options and len(options) >= 4:
-            # Keep track of correct answer, shuffle, then update
-            correct = options[0]
-            random.shuffle(options)
-            options_sql = format_array_for_sql(options)
+        for category in CATEGORIES:
+            count = journal.counts[category]
+            if count:
+                f.write(section_header(category, count))
+                if workers > 1:
+                    write_table_parallel(f, category, journal.iter_rows(category), fmt, batch_size, workers)
+                else:
+                    write_table(f, category, journal.iter_rows(category), fmt, batch_size)
+
+
+# =============================================================================
+# DISTRIBUTED WORKERS (see work_queue.py)
+# =============================================================================
+
+def mine_claimed(queue: WorkQueue, worker: str, items: list[dict], model: genai.GenerativeModel,
+                 batch_model: Optional[genai.GenerativeModel], gemini_batch: int,
+                 validator: QuestionValidator, language: str, outcome: Counter) -> None:
+    """
+    Fetch, generate and validate one language's claimed articles and hand
+    each result back to the queue. Rows the queue refuses (the lease lapsed
+    and another worker re-claimed the article) are dropped, so every article
+    is stored once.
+    """
+    summaries = get_article_summaries([item["title"] for item in items], MAX_SUMMARY_WORDS, language)
+    fetched = []
+    for item in items:
+        if summaries.get(item["title"]):
+            fetched.append(item)
         else:
-            options_sql = format_array_for_sql(options)
-        topic = escape_sql_string(data.get("topic", ""))
-        
-        return f"""INSERT INTO wiki_links_questions (titles, connection, connection_options, topic, wikipedia_url)
-VALUES ({titles}, '{connection}', {options_sql}, '{topic}', '{url}');"""
+            queue.fail(worker, item["position"], "no summary")
+            outcome["failed"] += 1
     
-    return ""
+    for start in range(0, len(fetched), max(1, gemini_batch)):
+        group = fetched[start:start + max(1, gemini_batch)]
+        results = generate_many(model, [(item["title"], summaries[item["title"]]) for item in group],
+                                batch_model, language)
+        rows_list = postprocess(validator, [(item["title"], results.get(item["title"])) for item in group],
+                                language)
+        for item, rows in zip(group, rows_list):
+            if not rows:
+                queue.fail(worker, item["position"], "generation or validation failed")
+                outcome["failed"] += 1
+            elif queue.complete(worker, item["position"], rows):
+                print(f"   ✨ [{item['position'] + 1}] {item['title']}: {len(rows)} questions")
+                if mined_ledger:
+                    mined_ledger.record(item["title"], rows, f"queue:{queue.name}", language)
+                outcome["done"] += 1
+            else:
+                print(f"   ⚠️ [{item['position'] + 1}] {item['title']}: lease lost, result dropped")
+                outcome["lost"] += 1
+    metrics.incr("queue.articles", len(items), language=language)
+
+
+def run_worker(queue: WorkQueue, worker: str, model: genai.GenerativeModel,
+               batch_model: Optional[genai.GenerativeModel], args: argparse.Namespace,
+               title_indexes: dict[str, TitleIndex]) -> tuple[Counter, dict[str, QuestionValidator]]:
+    """
+    Claim articles a batch at a time and mine them until the queue is
+    drained, heartbeating the leases meanwhile. When other workers still
+    hold articles, wait and poll, so a crashed worker's articles are picked
+    up once its leases lapse. Leases still held on exit (Ctrl+C, errors)
+    are released.
+    Returns this worker's {"done", "failed", "lost"} counts and validators.
+    """
+    outcome = Counter()
+    validators: dict[str, QuestionValidator] = {}
+    queue.start_heartbeat(worker)
+    try:
+        while True:
+            items = queue.claim(worker, args.claim_size)
+            if not items:
+                if queue.is_drained():
+                    break
+                time.sleep(POLL_SECONDS)
+                continue
+            print(f"\n📥 Claimed {len(items)} articles ({items[0]['position'] + 1}-{items[-1]['position'] + 1})")
+            for language in dict.fromkeys(item["language"] for item in items):
+                if language not in validators:
+                    validators[language] = make_validator(not args.no_title_check, response_cache,
+                                                          title_indexes.get(language), language)
+                mine_claimed(queue, worker, [item for item in items if item["language"] == language],
+                             model, batch_model, args.gemini_batch, validators[language], language, outcome)
+    finally:
+        queue.stop_heartbeat()
+        released = queue.release(worker)
+        if released:
+            print(f"   🔓 Released {released} unfinished articles")
+    return outcome, validators
 
 
 # =============================================================================
 # MAIN EXECUTION
 # =============================================================================
 
+def parse_languages(value: str) -> list[str]:
+    languages = list(dict.fromkeys(code.strip().lower() for code in value.split(",") if code.strip()))
+    for code in languages:
+        if not re.fullmatch(r"[a-z][a-z-]*", code):
+            raise argparse.ArgumentTypeError(f"Not a Wikipedia language code: {code}")
+    if not languages:
+        raise argparse.ArgumentTypeError("At least one language is needed")
+    return languages
+
+
+def parse_title_index(value: str) -> tuple[Optional[str], str]:
+    language, sep, path = value.partition("=")
+    if sep and re.fullmatch(r"[a-z][a-z-]*", language) and path:
+        return language, path
+    return None, value
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Wiki Guesser bulk question generator")
+    parser.add_argument("--languages", type=parse_languages, default=LANGUAGES,
+                        help="Comma-separated Wikipedia editions to mine in parallel, e.g. en,de,fr "
+                             "(several languages write one output per language: seed_generated.de.sql)")
+    parser.add_argument("--max-articles", type=int, default=MAX_ARTICLES,
+                        help="Number of articles to process per language")
+    parser.add_argument("--output", default=OUTPUT_FILE,
+                        help="SQL output file (directory for --format csv)")
+    parser.add_argument("--format", choices=FORMATS, default="insert",
+                        help="insert statements, COPY FROM STDIN blocks, or CSV per table")
+    parser.add_argument("--batch-size", type=int, default=SQL_BATCH_SIZE,
+                        help="Rows per INSERT statement (with --format insert)")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Run Wikipedia fetches and Gemini calls as concurrent stages")
+    parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS,
+                        help="In-flight Wikipedia requests (with --concurrent)")
+    parser.add_argument("--generate-workers", type=int, default=GENERATE_WORKERS,
+                        help="In-flight Gemini requests (with --concurrent)")
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE,
+                        help="Summaries buffered between the stages (with --concurrent)")
+    parser.add_argument("--gemini-batch", type=int, default=GEMINI_BATCH_SIZE,
+                        help="Articles per Gemini request (JSON-schema batched generation when > 1)")
+    parser.add_argument("--stream", action="store_true", default=GEMINI_STREAM,
+                        help="Stream single-article generations, cancelling malformed answers early")
+    parser.add_argument("--local-distractors", action="store_true",
+                        help="Make year_options and wrong connection_options locally (see distractors.py)")
+    parser.add_argument("--connection-pool", default=DEFAULT_POOL_PATH,
+                        help=f"Connection pool for --local-distractors (default: {DEFAULT_POOL_PATH})")
+    parser.add_argument("--cache", default=CACHE_FILE,
+                        help="SQLite cache for summaries and Gemini responses")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Resume an interrupted run from its journal in runs/RUN_ID")
+    parser.add_argument("--runs-dir", default=RUNS_DIR, help="Directory for run journals")
+    parser.add_argument("--load", action="store_true",
+                        help="Also load rows directly into Postgres (DATABASE_URL)")
+    parser.add_argument("--database-url", default=None, help="Postgres DSN (default: $DATABASE_URL)")
+    parser.add_argument("--commit-size", type=int, default=DEFAULT_COMMIT_SIZE,
+                        help="Rows per transaction (with --load)")
+    parser.add_argument("--load-method", choices=LOAD_METHODS, default="copy",
+                        help="COPY or multi-row parameterized INSERT (with --load)")
+    parser.add_argument("--dedup-index", default=DEFAULT_INDEX_PATH,
+                        help="Near-duplicate index shared across runs (see dedup.py)")
+    parser.add_argument("--no-dedup", action="store_true", help="Disable near-duplicate rejection")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER_PATH,
+                        help=f"Mined-article ledger file (default: {DEFAULT_LEDGER_PATH})")
+    parser.add_argument("--no-ledger", action="store_true", help="Do not record mined articles")
+    parser.add_argument("--delta", action="store_true",
+                        help="Skip articles already mined from an unchanged (or barely edited) revision")
+    parser.add_argument("--flag-refresh", action="store_true",
+                        help="With --delta, flag the old questions of rewritten articles for refresh")
+    parser.add_argument("--pageview-days", type=int, default=PAGEVIEW_WINDOW_DAYS,
+                        help="Days of pageview top lists to merge into the candidate list (1 = yesterday only)")
+    parser.add_argument("--pageview-score", choices=["sum", "decay", "median"], default=PAGEVIEW_SCORE,
+                        help="Rank candidates by total views, recency-decayed views or median daily rank")
+    parser.add_argument("--balance", action="store_true",
+                        help="Order candidates towards an even topic distribution (see scheduler.py); "
+                             "repeat it with --resume")
+    parser.add_argument("--balance-target", type=parse_target, default=None, metavar="TOPIC=WEIGHT,...",
+                        help="Topic weights for --balance, e.g. Science=2,Sports=0.5 (others 1)")
+    parser.add_argument("--balance-sql", nargs="*", default=[], metavar="FILE",
+                        help="Seed .sql files whose questions count towards the distribution")
+    parser.add_argument("--balance-db", action="store_true",
+                        help="Count the questions already in the database (DATABASE_URL) too")
+    parser.add_argument("--packs", metavar="DIR",
+                        help="Also add the run's questions to the static question packs in DIR (see packs.py)")
+    parser.add_argument("--route", action="store_true",
+                        help="Pick the model and output cap per article, escalating on failed validation "
+                             "(see router.py)")
+    parser.add_argument("--max-tokens", type=int, default=None, help="Run-wide token budget (with --route)")
+    parser.add_argument("--max-cost", type=float, default=None, help="Run-wide budget in USD (with --route)")
+    parser.add_argument("--route-stats", default=DEFAULT_STATS_PATH,
+                        help=f"Failure rates learned across runs (default: {DEFAULT_STATS_PATH})")
+    parser.add_argument("--queue", metavar="URL",
+                        help="Work through a shared work queue (SQLite file or postgresql:// DSN; "
+                             "see work_queue.py) instead of a local run")
+    parser.add_argument("--queue-name", default=DEFAULT_QUEUE_NAME, help="Queue within --queue")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="With --queue, select articles as usual and add them to the queue, then exit")
+    parser.add_argument("--worker-id", default=default_worker_id(), help="Lease holder name (with --queue)")
+    parser.add_argument("--claim-size", type=int, default=CLAIM_SIZE, help="Articles claimed at a time")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help="Seconds a silent worker keeps its articles before others may take them")
+    parser.add_argument("--no-title-check", action="store_true",
+                        help="Skip checking that wiki_links titles are real articles")
+    parser.add_argument("--workers", type=int, default=POSTPROCESS_WORKERS,
+                        help="Processes for validation and SQL rendering (serial mode)")
+    parser.add_argument("--metrics", metavar="PATH", help="Write a JSON run report (stage latencies, counters)")
+    parser.add_argument("--prometheus", metavar="PATH", help="Write the run report in Prometheus text format")
+    parser.add_argument("--metrics-interval", type=float, default=0,
+                        help="Also rewrite the reports every N seconds during the run")
+    parser.add_argument("--title-index", metavar="[LANG=]PATH", type=parse_title_index, action="append",
+                        help="Select articles offline from a title_index.py index (repeat as de=dewiki.idx "
+                             "for other languages; a bare PATH is for the first language)")
+    parser.add_argument("--band", type=parse_band, default=(0.0, 100.0),
+                        help="View percentile band to sample from, e.g. 1:5 (with --title-index)")
+    parser.add_argument("--days", type=parse_days, default=(None, None),
+                        help="Rank by views in YYYYMMDD:YYYYMMDD (with --title-index)")
+    parser.add_argument("--topic", help="Title regular expression (with --title-index)")
+    return parser.parse_args()
+
+
+def language_output(path: str, language: str, fmt: str) -> str:
+    """Per-language output: seed_generated.de.sql, or <dir>/de for --format csv."""
+    if fmt == "csv":
+        return os.path.join(path, language)
+    root, ext = os.path.splitext(path)
+    return f"{root}.{language}{ext}"
+
+
+def select_articles(args: argparse.Namespace, language: str,
+                    title_index: Optional[TitleIndex]) -> list[str]:
+    """
+    Pick one language's candidate articles: from the title index or the
+    pageview top lists, minus unchanged ones with --delta, reordered by
+    topic with --balance (as a BalancedOrder, which picks lazily).
+    """
+    # Fetch top articles (get extra in case some fail, more to choose from when balancing)
+    candidates = args.max_articles * (BALANCE_OVERSAMPLE if balance_scheduler else 2)
+    if title_index:
+        articles = get_index_articles(title_index, candidates, args.band, args.days,
+                                      args.topic, sample=args.band != (0.0, 100.0), language=language)
+    else:
+        articles = get_top_articles(candidates, language, args.pageview_days, args.pageview_score)
+    if articles and args.delta:
+        articles = select_delta(mined_ledger, articles, args.flag_refresh, language)
+    if articles and balance_scheduler:
+        articles = balance_articles(balance_scheduler, articles, args.max_articles, language)
+    return articles
+
+
+def start_language(args: argparse.Namespace, language: str, run_id: str,
+                   title_index: Optional[TitleIndex], dedup_index: Optional[DedupIndex]) -> Optional[dict]:
+    """
+    Set up one language's share of the run: its validator, its journal (in
+    runs/<run-id>-<language> when mining several languages) and its article
+    list, fetched fresh or reloaded with --resume.
+    Returns the lane, or None if it has nothing to do.
+    """
+    multilingual = len(args.languages) > 1
+    lane_run_id = f"{run_id}-{language}" if multilingual else run_id
+    lane = {
+        "language": language,
+        "validator": make_validator(not args.no_title_check, response_cache, title_index, language),
+        "output": language_output(args.output, language, args.format) if multilingual else args.output,
+        "articles": None,
+        "processed": 0,
+    }
+    
+    def row_filter(index: int, rows: dict) -> dict:
+        if dedup_index:
+            rows = dedup_index.filter_rows(rows, source=f"{lane_run_id}:{index}")
+        if mined_ledger and rows:
+            mined_ledger.record(lane["articles"][index], rows, lane_run_id, language)
+        if balance_scheduler and rows:
+            lane["articles"].observe(index, rows)
+        return rows
+    
+    journal = RunJournal(lane_run_id, CATEGORIES, runs_dir=args.runs_dir,
+                         row_filter=row_filter if dedup_index or mined_ledger or balance_scheduler else None)
+    articles = journal.load_articles() if args.resume else None
+    if args.resume:
+        if articles is None:
+            print(f"❌ No journal found for run {lane_run_id}")
+            journal.close()
+            return None
+        print(f"🔄 Resuming run {lane_run_id}: {journal.next_index} articles already done")
+        if balance_scheduler:
+            articles = balance_articles(balance_scheduler, articles, args.max_articles, language,
+                                        journal.done_titles)
+            for category in CATEGORIES:
+                for row in journal.iter_rows(category):
+                    balance_scheduler.observe({category: row})
+    else:
+        articles = select_articles(args, language, title_index)
+        if not articles:
+            print(f"❌ No {language} articles to process")
+            journal.close()
+            return None
+        # A balanced run saves its candidates; the journal records which were picked
+        journal.save_articles(articles.candidates if balance_scheduler else articles)
+        print(f"📓 Run {lane_run_id} (resume with --resume {run_id})")
+    lane["journal"] = journal
+    lane["articles"] = articles
+    return lane
+
+
+def mine_language(args: argparse.Namespace, language: str, run_id: str, lanes: list[dict],
+                  model: genai.GenerativeModel, batch_model: Optional[genai.GenerativeModel],
+                  title_indexes: dict[str, TitleIndex], index_paths: dict[str, str],
+                  dedup_index: Optional[DedupIndex]) -> None:
+    """
+    Mine one language edition end to end - article discovery, summaries,
+    generation, output and optional load - with its own workers and Gemini
+    limiter. Runs in its own thread, one per language.
+    """
+    lane = start_language(args, language, run_id, title_indexes.get(language), dedup_index)
+    if not lane:
+        return
+    lanes.append(lane)
+    journal = lane["journal"]
+    articles = lane["articles"]
+    
+    print(f"\n📝 Processing {args.max_articles} {language} articles...")
+    print("-" * 40)
+    if args.concurrent:
+        asyncio.run(run_pipeline(
+            model, articles, args.max_articles, journal,
+            fetch_workers=args.fetch_workers,
+            generate_workers=args.generate_workers,
+            queue_size=args.queue_size,
+            batch_model=batch_model,
+            gemini_batch=args.gemini_batch,
+            validator=lane["validator"],
+            language=language,
+        ))
+    else:
+        run_serial(model, articles, args.max_articles, journal,
+                   batch_model=batch_model, gemini_batch=args.gemini_batch,
+                   workers=args.workers, check_titles=not args.no_title_check,
+                   cache_path=None if args.no_cache else args.cache,
+                   index_path=index_paths.get(language),
+                   validator=lane["validator"], language=language)
+    lane["processed"] = min(args.max_articles, len(articles))
+    
+    # Write output file
+    print(f"\n📁 Writing {language} SQL to {lane['output']}...")
+    write_output(lane["output"], journal, lane["processed"], args.format, args.batch_size, args.workers)
+    
+    if args.load:
+        print(f"🐘 Loading {language} rows into Postgres...")
+        try:
+            loader = PostgresLoader(args.database_url, commit_size=args.commit_size,
+                                    method=args.load_method)
+            try:
+                print_load_report(loader.load_all(
+                    {category: journal.iter_rows(category) for category in CATEGORIES}
+                ))
+            finally:
+                loader.close()
+        except Exception as e:
+            print(f"   ❌ Load failed: {e}")
+
+
+def mine_queue(args: argparse.Namespace, model: genai.GenerativeModel,
+               batch_model: Optional[genai.GenerativeModel], title_indexes: dict[str, TitleIndex],
+               dedup_index: Optional[DedupIndex]) -> None:
+    """--queue: fill the work queue (--enqueue) or run as one of its workers."""
+    queue = WorkQueue(args.queue, args.queue_name, lease=args.lease)
+    if args.enqueue:
+        for language in args.languages:
+            articles = select_articles(args, language, title_indexes.get(language))
+            added = queue.enqueue(articles[:args.max_articles], language)
+            print(f"📥 Queued {added} {language} articles in '{args.queue_name}'")
+    else:
+        if dedup_index:
+            print("   Near-duplicates are removed on export (python work_queue.py export)")
+        print(f"👷 Worker {args.worker_id} on queue '{args.queue_name}'")
+        if args.metrics_interval and (args.metrics or args.prometheus):
+            metrics.start_reporting(args.metrics_interval, args.metrics, args.prometheus,
+                                    before_write=collect_run_gauges)
+        try:
+            outcome, validators = run_worker(queue, args.worker_id, model, batch_model, args, title_indexes)
+        finally:
+            metrics.stop_reporting()
+        collect_run_gauges()
+        if args.metrics or args.prometheus:
+            metrics.write(args.metrics, args.prometheus)
+        
+        print(f"\n{'=' * 60}")
+        print("📊 SUMMARY")
+        print("-" * 40)
+        print(f"   Articles done: {outcome['done']}, failed: {outcome['failed']}, lost leases: {outcome['lost']}")
+        for validator in validators.values():
+            print_validation_report(validator)
+        print_stage_report(metrics)
+        if model_router:
+            print_route_report(model_router)
+            model_router.save(args.route_stats)
+    print_queue_report(queue)
+    queue.close()
+    for title_index in title_indexes.values():
+        title_index.close()
+    if response_cache:
+        response_cache.close()
+    if dedup_index:
+        dedup_index.close()
+    if mined_ledger:
+        mined_ledger.close()
+    if distractor_engine:
+        distractor_engine.save(args.connection_pool)
+
+
 def main():
     """
     Main execution flow:
     1. Initialize Gemini model
-    2. Fetch top Wikipedia articles
-    3. For each article: fetch summary, generate questions, create SQL
-    4. Write all SQL to output file
+    2. For each language, concurrently: fetch top Wikipedia articles (or
+       reload them with --resume), then for each article fetch the summary
+       and generate questions (serially, or as concurrent stages with
+       --concurrent), journaling each step and appending SQL to the run
+       directory as articles finish
+    3. Assemble each language's output file, in article order
     """
+    global response_cache, question_validator, mined_ledger, balance_scheduler, stream_generations
+    global distractor_engine, model_router
+    
+    args = parse_args()
+    
     print("=" * 60)
     print("🎮 Wiki Guesser - Bulk Question Generator")
     print("=" * 60)
     
+    if args.local_distractors:
+        distractor_engine = DistractorEngine.load(args.connection_pool)
+        if len(distractor_engine) < MIN_POOL_SIZE:
+            print(f"❌ --local-distractors needs at least {MIN_POOL_SIZE} connections in {args.connection_pool} "
+                  f"(has {len(distractor_engine)}). Build it with: python distractors.py build --sql ...")
+            return
+        print(f"🎭 Making distractors locally ({len(distractor_engine)} pooled connections)")
+    
     # Initialize Gemini
-    model = initialize_gemini()
+    model = initialize_gemini(system_instruction())
     if not model:
         return
+    batch_model = None
+    if args.gemini_batch > 1:
+        batch_model = initialize_gemini(
+            system_instruction(batch=True),
+            LOCAL_BATCH_GENERATION_CONFIG if distractor_engine else BATCH_GENERATION_CONFIG,
+        )
+        if not batch_model:
+            return
+        print(f"   📦 Batching {args.gemini_batch} articles per Gemini request")
     
-    # Fetch top articles
-    articles = get_top_articles(MAX_ARTICLES * 2)  # Get extra in case some fail
-    if not articles:
-        print("❌ No articles to process")
+    if args.route:
+        model_router = ModelRouter.load(args.route_stats, budget=TokenBudget(args.max_tokens, args.max_cost))
+        limits = [f"{args.max_tokens} tokens" if args.max_tokens else "", f"${args.max_cost:.4g}" if args.max_cost else ""]
+        print(f"🧭 Routing across {', '.join(tier['model'] for tier in model_router.tiers)}"
+              + (f" (budget: {', '.join(limit for limit in limits if limit)})" if any(limits) else ""))
+    elif args.max_tokens or args.max_cost:
+        print("   ⚠️ --max-tokens / --max-cost need --route; no budget is enforced")
+    
+    stream_generations = args.stream
+    if args.stream and args.gemini_batch > 1:
+        print("   ⚠️ --stream only applies to single-article requests; batches are not streamed")
+    
+    if not args.no_cache:
+        response_cache = ResponseCache(args.cache, ttl=CACHE_TTL_DAYS * 86400,
+                                       max_bytes=CACHE_MAX_MB * 1024 * 1024)
+        print(f"✅ Using response cache: {args.cache}")
+    
+    # A bare --title-index PATH belongs to the first language
+    index_paths = {language or args.languages[0]: path for language, path in args.title_index or []}
+    title_indexes = {language: TitleIndex(path) for language, path in index_paths.items()}
+    
+    mined_ledger = None if args.no_ledger else MinedLedger(args.ledger)
+    if args.delta and not mined_ledger:
+        print("❌ --delta needs the mined-article ledger (drop --no-ledger)")
         return
     
-    # Track all generated SQL statements
-    sql_statements = {
-        "odd_wiki_out": [],
-        "when_in_wiki": [],
-        "wiki_or_fiction": [],
-        "wiki_links": []
-    }
+    if args.balance:
+        existing = count_sql(args.balance_sql)
+        if args.balance_db:
+            try:
+                existing += count_database(args.database_url)
+            except Exception as e:
+                print(f"   ⚠️ Could not count database questions: {e}")
+        balance_scheduler = BalanceScheduler(args.balance_target, existing)
+        print(f"⚖️ Balancing topics against {sum(existing.values())} existing questions")
     
-    processed = 0
-    success = 0
+    run_id = args.resume or new_run_id()
+    dedup_index = None if args.no_dedup else DedupIndex(args.dedup_index)
+    if dedup_index:
+        print(f"✅ Using near-duplicate index: {args.dedup_index}")
     
-    print(f"\n📝 Processing {MAX_ARTICLES} articles...")
-    print("-" * 40)
+    if args.queue:
+        mine_queue(args, model, batch_model, title_indexes, dedup_index)
+        return
     
-    for title in articles:
-        if processed >= MAX_ARTICLES:
-            break
-            
-        processed += 1
-        print(f"\n[{processed}/{MAX_ARTICLES}] {title}")
-        
-        # Fetch article summary
-        summary = get_article_summary(title, MAX_SUMMARY_WORDS)
-        if not summary:
-            continue
-        print(f"   📖 Got {len(summary.split())} words")
-        
-        # Generate questions via Gemini
-        questions = generate_questions(model, title, summary)
-        if not questions:
-            continue
-        print("   ✨ Generated questions")
-        
-        # Create Wikipedia URL
-        wiki_url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
-        
-        # Generate SQL for each category
-        for category in sql_statements.keys():
-            if category in questions:
-                sql = generate_sql_insert(category, questions[category], wiki_url)
-                if sql:
-                    sql_statements[category].append(sql)
-        
-        success += 1
-        
-        # Rate limiting delay
-        if processed < MAX_ARTICLES:
-            time.sleep(API_DELAY_SECONDS)
+    lanes: list[dict] = []
+    if args.metrics_interval and (args.metrics or args.prometheus):
+        metrics.start_reporting(args.metrics_interval, args.metrics, args.prometheus,
+                                before_write=lambda: collect_run_gauges(lanes))
+    if len(args.languages) > 1:
+        print(f"   🌐 Mining {', '.join(args.languages)} in parallel")
+    if args.concurrent:
+        print(f"   ⚡ Concurrent mode: {args.fetch_workers} fetch / {args.generate_workers} generate workers"
+              + (" per language" if len(args.languages) > 1 else ""))
+    elif args.workers > 1:
+        print(f"   🧮 Post-processing on {args.workers} processes")
     
-    # Write output file
-    print(f"\n{'=' * 40}")
-    print("📁 Writing SQL to file...")
+    with ThreadPoolExecutor(max_workers=len(args.languages)) as pool:
+        futures = [
+            pool.submit(mine_language, args, language, run_id, lanes, model, batch_model,
+                        title_indexes, index_paths, dedup_index)
+            for language in args.languages
+        ]
+        for future in futures:
+            future.result()
+    lanes.sort(key=lambda lane: args.languages.index(lane["language"]))
+    if not lanes:
+        return
+    question_validator = lanes[0]["validator"]
     
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write("-- Wiki Guesser - Generated Questions\n")
-        f.write(f"-- Generated on {datetime.now().isoformat()}\n")
-        f.write(f"-- Articles processed: {success}/{processed}\n")
-        f.write(f"-- Total questions: {sum(len(v) for v in sql_statements.values())}\n\n")
-        
-        for category, statements in sql_statements.items():
-            if statements:
-                f.write(f"\n-- =============================================================================\n")
-                f.write(f"-- {category.upper().replace('_', ' ')} ({len(statements)} questions)\n")
-                f.write(f"-- =============================================================================\n\n")
-                for sql in statements:
-                    f.write(sql + "\n\n")
+    if args.packs:
+        print(f"\n📦 Updating question packs in {args.packs}...")
+        result = build_packs(
+            ((category, row) for lane in lanes for category in CATEGORIES
+             for row in lane["journal"].iter_rows(category)),
+            args.packs,
+        )
+        print(f"   Added {result['added']} questions, {result['shards_written']} shards written "
+              f"(manifest version {result['version']})")
+    
+    for lane in lanes:
+        lane["journal"].close()
+    for title_index in title_indexes.values():
+        title_index.close()
+    metrics.stop_reporting()
+    collect_run_gauges(lanes)
+    if args.metrics or args.prometheus:
+        metrics.write(args.metrics, args.prometheus)
     
     # Summary
     print(f"\n{'=' * 60}")
     print("📊 SUMMARY")
     print("-" * 40)
-    print(f"   Articles processed: {success}/{processed}")
-    for category, statements in sql_statements.items():
-        print(f"   {category}: {len(statements)} questions")
-    print(f"   Total: {sum(len(v) for v in sql_statements.values())} questions")
-    print(f"\n✅ Output written to: {OUTPUT_FILE}")
+    for lane in lanes:
+        journal = lane["journal"]
+        if len(lanes) > 1:
+            print(f"   🌐 {lane['language']}:")
+        print(f"   Articles processed: {journal.success}/{lane['processed']}")
+        for category in CATEGORIES:
+            print(f"   {category}: {journal.counts[category]} questions")
+        print(f"   Total: {sum(journal.counts.values())} questions")
+        print_validation_report(lane["validator"])
+    if response_cache:
+        for namespace, counts in response_cache.stats().items():
+            print(f"   Cache {namespace}: {counts['hits']} hits / {counts['misses']} misses "
+                  f"({counts['hit_rate']:.0%})")
+        response_cache.close()
+    print_stage_report(metrics)
+    if model_router:
+        print_route_report(model_router)
+        model_router.save(args.route_stats)
+    if balance_scheduler:
+        print_balance_report(balance_scheduler)
+    if dedup_index:
+        print(f"   Near-duplicates rejected: {dedup_index.rejected}")
+        dedup_index.close()
+    if mined_ledger:
+        print(f"   Articles recorded in ledger: {mined_ledger.recorded}")
+        mined_ledger.close()
+    if distractor_engine:
+        distractor_engine.save(args.connection_pool)
+        print(f"   Connection pool: {len(distractor_engine)} connections")
+    for lane in lanes:
+        print(f"\n✅ Output written to: {lane['output']}")
     print("=" * 60)
 
 
@@ -7,33 +7,52 @@ and generates SQL INSERT statements for the wiki_or_fiction_questions table.
 
 Usage:
     python opentdb_importer.py
+    python opentdb_importer.py --batch-size 500
+    python opentdb_importer.py --format csv --output opentdb_csv/
+    python opentdb_importer.py --load   # insert straight into Postgres (DATABASE_URL)
+    python opentdb_importer.py --exhaust   # every question in every category/difficulty
 
 No API key required! Rate limit: 1 request per 5 seconds.
 """
 
+import os
 import json
-import time
 import random
 import html
+import argparse
 from datetime import datetime
+from typing import Optional
 from urllib.request import urlopen
-from urllib.error import URLError
+from urllib.error import HTTPError, URLError
+
+from dedup import DEFAULT_INDEX_PATH, DedupIndex
+from limiter import RateLimited, RetryableError, TokenBucket, parse_retry_after, retry_call
+from loader import DEFAULT_COMMIT_SIZE, LOAD_METHODS, PostgresLoader, print_load_report
+from sql_writer import FORMATS, csv_path, insert_statement, write_csv_rows, write_table
 
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
 
-# Open Trivia DB API endpoint
+# Open Trivia DB API endpoints
 API_BASE = "https://opentdb.com/api.php"
+TOKEN_URL = "https://opentdb.com/api_token.php"
+COUNT_URL = "https://opentdb.com/api_count.php"
 
 # How many questions to fetch per category (max 50 per request)
 QUESTIONS_PER_CATEGORY = 20
 
-# Delay between API calls (seconds) - API rate limit is 1 per 5 seconds
-API_DELAY = 5.5
+# Exhaustive mode (--exhaust): page every category x difficulty with a session token
+MAX_PAGE_SIZE = 50
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+# API rate limit is 1 request per 5 seconds per IP
+API_RATE_PER_SECOND = 1 / 5.2
+API_MAX_RETRIES = 3
 
 # Output file
 OUTPUT_FILE = "seed_opentdb.sql"
+SQL_BATCH_SIZE = 1  # Rows per INSERT statement
 
 # Categories to fetch (category_id: name) - from opentdb.com/api_category.php
 CATEGORIES = {
@@ -54,9 +73,103 @@ CATEGORIES = {
 # API FETCHING
 # =============================================================================
 
+# One bucket for the whole process: the rate limit is per IP, not per category
+opentdb_limiter = TokenBucket(rate=API_RATE_PER_SECOND, capacity=1)
+
+
+def request_questions(url: str) -> dict:
+    """
+    Make one Open Trivia DB request.
+    Raises RateLimited on HTTP 429 or response_code 5, RetryableError on
+    network errors and 5xx responses.
+    """
+    try:
+        with urlopen(url, timeout=30) as response:
+            data = json.loads(response.read().decode('utf-8'))
+    except HTTPError as e:
+        if e.code == 429:
+            raise RateLimited("HTTP 429", retry_after=parse_retry_after(e.headers.get("Retry-After"))) from e
+        if e.code >= 500:
+            raise RetryableError(f"HTTP {e.code}") from e
+        raise
+    except URLError as e:
+        raise RetryableError(f"Network error: {e}") from e
+    
+    if data.get("response_code") == 5:
+        raise RateLimited("Rate limit (response_code 5)", retry_after=5)
+    return data
+
+
+# Open Trivia DB response codes
+CODE_SUCCESS = 0
+CODE_NO_RESULTS = 1  # Fewer questions left than `amount`
+CODE_TOKEN_NOT_FOUND = 3
+CODE_TOKEN_EMPTY = 4  # Session token has seen every question for this query
+
+
+def api_request(url: str) -> Optional[dict]:
+    """Paced, retried request. Returns the decoded response or None on failure."""
+    def log_retry(attempt: int, error: Exception, delay: float) -> None:
+        print(f"   🔁 Retry {attempt}/{API_MAX_RETRIES} in {delay:.1f}s: {error}")
+    
+    try:
+        return retry_call(request_questions, url, limiter=opentdb_limiter,
+                          retries=API_MAX_RETRIES, base_delay=5.0, on_retry=log_retry)
+    except RetryableError as e:
+        print(f"   ❌ Giving up: {e}")
+    except HTTPError as e:
+        print(f"   ❌ HTTP error: {e}")
+    except json.JSONDecodeError as e:
+        print(f"   ❌ JSON parse error: {e}")
+    return None
+
+
+def request_session_token() -> Optional[str]:
+    """
+    Get a session token. Requests made with it never return the same
+    question twice, until the pool for a query is exhausted (code 4).
+    """
+    data = api_request(f"{TOKEN_URL}?command=request")
+    return data.get("token") if data and data.get("response_code") == CODE_SUCCESS else None
+
+
+def fetch_counts(category_id: int) -> Optional[dict[str, int]]:
+    """
+    Questions of every type in a category, by difficulty
+    ({"easy": 120, ...}), or None if the request failed.
+    """
+    data = api_request(f"{COUNT_URL}?category={category_id}")
+    counts = (data or {}).get("category_question_count")
+    if not isinstance(counts, dict):
+        return None
+    return {difficulty: int(counts.get(f"total_{difficulty}_question_count", 0)) for difficulty in DIFFICULTIES}
+
+
+def fetch_page(category_id: int, amount: int, difficulty: str = None,
+               token: str = None, question_type: Optional[str] = "boolean") -> tuple[Optional[int], list]:
+    """
+    Fetch one page of questions (boolean unless `question_type` says
+    otherwise; None for every type).
+    Returns (response_code, results); response_code is None if the request failed.
+    """
+    url = f"{API_BASE}?amount={amount}&category={category_id}&encode=url3986"
+    if question_type:
+        url += f"&type={question_type}"
+    if difficulty:
+        url += f"&difficulty={difficulty}"
+    if token:
+        url += f"&token={token}"
+    
+    data = api_request(url)
+    if data is None:
+        return None, []
+    return data.get("response_code"), data.get("results", [])
+
+
 def fetch_questions(category_id: int, amount: int = 20, difficulty: str = None) -> list:
     """
     Fetch questions from Open Trivia DB API.
+    Requests are paced by the shared limiter and retried with backoff.
     
     Args:
         category_id: The category ID to fetch from
@@ -66,29 +179,88 @@ def fetch_questions(category_id: int, amount: int = 20, difficulty: str = None)
     Returns:
         List of question dictionaries
     """
-    url = f"{API_BASE}?amount={amount}&category={category_id}&type=boolean&encode=url3986"
-    if difficulty:
-        url += f"&difficulty={difficulty}"
+    code, results = fetch_page(category_id, amount, difficulty)
+    if code == CODE_SUCCESS:
+        return results
+    elif code == CODE_NO_RESULTS:
+        print(f"   ⚠️ Not enough questions in category {category_id}")
+    elif code is not None:
+        print(f"   ❌ API error code: {code}")
+    return []
+
+
+def iter_category_batches(amount: int = QUESTIONS_PER_CATEGORY):
+    """Classic mode: one batch per category. Yields (category_name, questions)."""
+    for cat_id, cat_name in CATEGORIES.items():
+        print(f"📚 Fetching: {cat_name} (ID: {cat_id})")
+        yield cat_name, fetch_questions(cat_id, amount)
+
+
+def iter_exhaustive_pages(token: str, max_pages: Optional[int] = None):
+    """
+    Exhaustive mode: page every (category, difficulty) pool with one session
+    token until it is drained.
     
-    try:
-        with urlopen(url, timeout=30) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            
-        if data.get("response_code") == 0:
-            return data.get("results", [])
-        elif data.get("response_code") == 1:
-            print(f"   ⚠️ Not enough questions in category {category_id}")
-            return []
-        else:
-            print(f"   ❌ API error code: {data.get('response_code')}")
-            return []
+    api_count.php gives each pool's size once per category, but only over
+    every question type, so pools are paged across all types - each page
+    asks for exactly min(50, questions left) - and the boolean questions
+    are kept. A pool is done when its count is used up, without a request
+    to find out. Should a count be off and the API answer "fewer questions
+    left" (code 1), the page size is halved until the remainder is drained.
+    
+    Cursors are served round-robin through the single global rate-limit
+    slot, so every category makes progress from the start and pages are
+    yielded as soon as they arrive. A cursor whose page brings no question
+    it has not seen before is retired too, so paging always ends even if
+    the token stops working. Stops early if an expired token cannot be
+    replaced. Yields (category_name, questions).
+    """
+    cursors = []
+    for cat_id, cat_name in CATEGORIES.items():
+        counts = fetch_counts(cat_id)
+        if counts is None:
+            print(f"   ⚠️ {cat_name}: no question counts, skipping")
+            continue
+        cursors += [
+            {"cat_id": cat_id, "cat_name": cat_name, "difficulty": difficulty, "left": counts[difficulty],
+             "amount": MAX_PAGE_SIZE, "seen": set()}
+            for difficulty in DIFFICULTIES
+            if counts[difficulty] > 0
+        ]
+    pages = 0
+    while cursors and (max_pages is None or pages < max_pages):
+        for cursor in list(cursors):
+            if max_pages is not None and pages >= max_pages:
+                break
+            pages += 1
+            amount = min(cursor["amount"], cursor["left"])
+            code, results = fetch_page(cursor["cat_id"], amount, cursor["difficulty"], token, question_type=None)
+            label = f"{cursor['cat_name']} ({cursor['difficulty']})"
             
-    except URLError as e:
-        print(f"   ❌ Network error: {e}")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"   ❌ JSON parse error: {e}")
-        return []
+            if code == CODE_SUCCESS:
+                fresh = [q for q in results if q.get("question") not in cursor["seen"]]
+                cursor["seen"].update(q.get("question") for q in fresh)
+                cursor["left"] -= len(results)
+                boolean = [q for q in fresh if q.get("type") == "boolean"]
+                print(f"📚 {label}: {len(boolean)} new true/false questions ({cursor['left']} left)")
+                if not fresh or cursor["left"] <= 0:
+                    print(f"   🏁 {label}: {'exhausted' if fresh else 'no new questions, retiring'}")
+                    cursors.remove(cursor)
+                if boolean:
+                    yield cursor["cat_name"], boolean
+            elif code == CODE_NO_RESULTS and amount > 1:
+                cursor["amount"] = amount // 2
+            elif code == CODE_TOKEN_NOT_FOUND:
+                token = request_session_token()
+                if not token:
+                    print("   ❌ Session token expired and no new one could be obtained; stopping --exhaust")
+                    return
+            elif code in (CODE_NO_RESULTS, CODE_TOKEN_EMPTY):
+                print(f"   🏁 {label}: exhausted")
+                cursors.remove(cursor)
+            else:
+                print(f"   ⚠️ {label}: dropping (response code {code})")
+                cursors.remove(cursor)
 
 
 def decode_question(q: dict) -> dict:
@@ -149,78 +321,151 @@ def transform_to_wiki_or_fiction(question: dict, category_name: str) -> dict:
 # SQL GENERATION
 # =============================================================================
 
-def escape_sql_string(s: str) -> str:
-    """Escape single quotes for SQL strings."""
-    if s is None:
-        return ""
-    # Decode HTML entities first
-    s = html.unescape(str(s))
-    return s.replace("'", "''")
+def question_row(data: dict) -> tuple:
+    """
+    Build a wiki_or_fiction_questions row, in the column order of
+    sql_writer.QUESTION_TABLES (HTML entities decoded).
+    """
+    def clean(s):
+        return html.unescape(str(s)) if s is not None else ""
+    
+    return (
+        clean(data["statement"]),
+        bool(data["is_true"]),
+        clean(data["explanation"]),
+        clean(data["topic"]),
+        clean(data["wikipedia_url"]),
+    )
 
 
 def generate_sql_insert(data: dict) -> str:
     """Generate SQL INSERT statement for wiki_or_fiction_questions."""
-    statement = escape_sql_string(data["statement"])
-    is_true = "true" if data["is_true"] else "false"
-    explanation = escape_sql_string(data["explanation"])
-    topic = escape_sql_string(data["topic"])
-    url = escape_sql_string(data["wikipedia_url"])
-    
-    return f"""INSERT INTO wiki_or_fiction_questions (statement, is_true, explanation, topic, wikipedia_url)
-VALUES ('{statement}', {is_true}, '{explanation}', '{topic}', '{url}');"""
+    return insert_statement("wiki_or_fiction", [question_row(data)])
 
 
 # =============================================================================
 # MAIN EXECUTION
 # =============================================================================
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Wiki Guesser Open Trivia DB importer")
+    parser.add_argument("--output", default=OUTPUT_FILE,
+                        help="SQL output file (directory for --format csv)")
+    parser.add_argument("--format", choices=FORMATS, default="insert",
+                        help="insert statements, COPY FROM STDIN blocks, or CSV")
+    parser.add_argument("--batch-size", type=int, default=SQL_BATCH_SIZE,
+                        help="Rows per INSERT statement (with --format insert)")
+    parser.add_argument("--load", action="store_true",
+                        help="Also load rows directly into Postgres (DATABASE_URL)")
+    parser.add_argument("--database-url", default=None, help="Postgres DSN (default: $DATABASE_URL)")
+    parser.add_argument("--commit-size", type=int, default=DEFAULT_COMMIT_SIZE,
+                        help="Rows per transaction (with --load)")
+    parser.add_argument("--load-method", choices=LOAD_METHODS, default="copy",
+                        help="COPY or multi-row parameterized INSERT (with --load)")
+    parser.add_argument("--dedup-index", default=DEFAULT_INDEX_PATH,
+                        help="Near-duplicate index shared with miner.py (see dedup.py)")
+    parser.add_argument("--no-dedup", action="store_true", help="Disable near-duplicate rejection")
+    parser.add_argument("--exhaust", action="store_true",
+                        help="Page every category and difficulty with a session token until exhausted")
+    parser.add_argument("--max-pages", type=int, default=None,
+                        help="Stop after this many API pages (with --exhaust)")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    
     print("=" * 60)
     print("🎮 Wiki Guesser - Open Trivia DB Importer")
     print("=" * 60)
-    print(f"\nFetching {QUESTIONS_PER_CATEGORY} boolean questions from {len(CATEGORIES)} categories...")
-    print(f"Rate limit delay: {API_DELAY}s between requests\n")
+    if args.exhaust:
+        print(f"\nPaging every category x difficulty until exhausted ({len(CATEGORIES)} categories)...")
+        token = request_session_token()
+        if not token:
+            # Without a token the API repeats questions forever instead of reporting a pool empty
+            print("❌ Could not get a session token, which --exhaust needs. Try again later.")
+            return
+        pages = iter_exhaustive_pages(token, args.max_pages)
+    else:
+        print(f"\nFetching {QUESTIONS_PER_CATEGORY} boolean questions from {len(CATEGORIES)} categories...")
+        pages = iter_category_batches()
+    print(f"Rate limit: {API_RATE_PER_SECOND * 60:.1f} requests/minute\n")
     
-    all_questions = []
+    dedup_index = None if args.no_dedup else DedupIndex(args.dedup_index)
+    dedup_source = f"opentdb:{datetime.now().isoformat()}"
+    loaded_rows = []
+    total = 0
     
-    for cat_id, cat_name in CATEGORIES.items():
-        print(f"📚 Fetching: {cat_name} (ID: {cat_id})")
-        
-        questions = fetch_questions(cat_id, QUESTIONS_PER_CATEGORY)
+    # Rows are written as each page arrives
+    print(f"📁 Writing SQL to: {args.output}")
+    if args.format == "csv":
+        os.makedirs(args.output, exist_ok=True)
+        out = open(csv_path(args.output, "wiki_or_fiction"), "w", encoding="utf-8", newline="")
+        write_csv_rows(out, "wiki_or_fiction", [], header=True)
+    else:
+        out = open(args.output, "w", encoding="utf-8")
+        out.write("-- Wiki Guesser - Open Trivia DB Import\n")
+        out.write(f"-- Generated on {datetime.now().isoformat()}\n")
+        out.write(f"-- Source: opentdb.com (Creative Commons BY-SA 4.0)\n\n")
         
-        if questions:
+        out.write("-- =============================================================================\n")
+        out.write("-- WIKI OR FICTION QUESTIONS\n")
+        out.write("-- =============================================================================\n\n")
+    
+    with out:
+        for cat_name, questions in pages:
+            if not questions:
+                print(f"   ⚠️ No questions retrieved")
+                continue
+            
             decoded = [decode_question(q) for q in questions]
             transformed = [transform_to_wiki_or_fiction(q, cat_name) for q in decoded]
-            all_questions.extend(transformed)
+            if dedup_index:
+                fresh = [
+                    q for q in transformed
+                    if dedup_index.add_if_new("wiki_or_fiction", question_row(q), dedup_source) is None
+                ]
+                if len(fresh) < len(transformed):
+                    print(f"   ♻️ Skipped {len(transformed) - len(fresh)} near-duplicates")
+                transformed = fresh
             print(f"   ✅ Got {len(questions)} questions")
-        else:
-            print(f"   ⚠️ No questions retrieved")
+            
+            rows = [question_row(q) for q in transformed]
+            if not rows:
+                continue
+            if args.format == "csv":
+                write_csv_rows(out, "wiki_or_fiction", rows)
+            else:
+                write_table(out, "wiki_or_fiction", rows, args.format, args.batch_size)
+            out.flush()
+            if args.load:
+                loaded_rows.extend(rows)
+            total += len(rows)
         
-        # Rate limiting
-        time.sleep(API_DELAY)
+        if args.format != "csv":
+            out.write(f"-- Total questions: {total}\n")
     
     print(f"\n{'=' * 40}")
-    print(f"📊 Total questions: {len(all_questions)}")
-    
-    # Generate SQL
-    print(f"📁 Writing SQL to: {OUTPUT_FILE}")
+    print(f"📊 Total questions: {total}")
+    if dedup_index:
+        print(f"   Near-duplicates rejected: {dedup_index.rejected}")
+        dedup_index.close()
     
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write("-- Wiki Guesser - Open Trivia DB Import\n")
-        f.write(f"-- Generated on {datetime.now().isoformat()}\n")
-        f.write(f"-- Source: opentdb.com (Creative Commons BY-SA 4.0)\n")
-        f.write(f"-- Total questions: {len(all_questions)}\n\n")
-        
-        f.write("-- =============================================================================\n")
-        f.write("-- WIKI OR FICTION QUESTIONS\n")
-        f.write("-- =============================================================================\n\n")
-        
-        for q in all_questions:
-            sql = generate_sql_insert(q)
-            f.write(sql + "\n\n")
+    if args.load:
+        print("🐘 Loading rows into Postgres...")
+        try:
+            loader = PostgresLoader(args.database_url, commit_size=args.commit_size,
+                                    method=args.load_method)
+            try:
+                print_load_report(loader.load_all({"wiki_or_fiction": loaded_rows}))
+            finally:
+                loader.close()
+        except Exception as e:
+            print(f"   ❌ Load failed: {e}")
     
-    print(f"\n✅ Done! Generated {len(all_questions)} questions.")
-    print(f"   Run the SQL in Supabase SQL Editor to import.")
+    print(f"\n✅ Done! Generated {total} questions.")
+    if not args.load:
+        print(f"   Run the SQL in Supabase SQL Editor to import.")
     print("=" * 60)
 
 
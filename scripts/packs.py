@@ -0,0 +1,335 @@
+"""
+Wiki Guesser - Question Pack Export
+===================================
+Builds static, versioned "question packs" that clients and CDN edges can
+load in one cached request instead of querying the four question tables.
+
+    packs/manifest.json                               - small index of everything below
+    packs/<category>/<topic>/<shard>-<hash>.json.gz   - up to SHARD_SIZE questions
+    packs/games/<n>-<hash>.json.gz                    - a game's worth of every category
+
+Questions use the client's camelCase field names (as in src/data/questions),
+plus a stable `id` and `wikipediaUrl`. Every pack also carries ORDERINGS
+precomputed shuffles of its questions, so clients can pick one at random
+instead of shuffling. Files are named by the SHA-256 of their content, so
+they can be cached forever; the manifest lists each file's path (without
+the compression suffix), count, hash and compressed sizes. gzip is always
+written, brotli too when the `brotli` package is installed (--compression).
+
+Packs are regenerated incrementally: questions already packed (by id, the
+hash of their normalized text) are skipped, new ones top up the last shard
+of their topic and then open new shards, so existing shards - and their
+CDN cache entries - stay valid. Replaced files are kept for clients still
+holding an old manifest until `prune` removes them.
+
+Usage:
+    python packs.py build --sql ../supabase/seed_all_categories.sql seed_opentdb.sql
+    python packs.py build --runs runs/20241224-031500
+    python packs.py stats
+    python packs.py prune
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import random
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from dedup import normalize_text
+from mined import question_id
+from sql_writer import QUESTION_TABLES, columns_for, iter_sql_rows, row_from_values
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+DEFAULT_PACKS_DIR = "packs"
+PACK_FORMAT_VERSION = 1
+
+SHARD_SIZE = 200  # Questions per category/topic shard
+ORDERINGS = 8  # Precomputed shuffles per pack
+GAME_PACKS = 16  # Mixed packs, each a game's worth of every category
+GAME_QUESTIONS_PER_CATEGORY = 10
+DEFAULT_TOPIC = "general"
+
+MANIFEST_FILE = "manifest.json"
+STATE_FILE = ".state.json"  # Build state (question ids per shard); not for clients
+COMPRESSIONS = {"gzip": ".gz", "br": ".br"}
+
+
+# =============================================================================
+# QUESTIONS
+# =============================================================================
+
+def camel_case(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.title() for part in rest)
+
+
+def pack_question(category: str, row: tuple) -> dict:
+    """A question row in the client's shape: camelCase fields plus a stable id."""
+    question = {"id": question_id(category, row)}
+    for column, value in zip(columns_for(category), row):
+        question[camel_case(column)] = value
+    return question
+
+
+def topic_slug(topic: Optional[str]) -> str:
+    slug = "-".join(normalize_text(topic or "").split())
+    return slug or DEFAULT_TOPIC
+
+
+def iter_sql_questions(paths: Iterable[str]) -> Iterator[tuple[str, tuple]]:
+    for path in paths:
+        for category, values in iter_sql_rows(path):
+            yield category, row_from_values(category, values)
+
+
+def iter_run_questions(run_dirs: Iterable[str]) -> Iterator[tuple[str, tuple]]:
+    """Rows from miner.py run journals (runs/<run-id>/<category>.jsonl)."""
+    for run_dir in run_dirs:
+        for category in QUESTION_TABLES:
+            path = os.path.join(run_dir, f"{category}.jsonl")
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    yield category, tuple(json.loads(line))
+
+
+# =============================================================================
+# PACK FILES
+# =============================================================================
+
+def canonical_json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def orderings(ids: list[str], count: int = ORDERINGS) -> list[list[int]]:
+    """Deterministic shuffles of a pack's positions, seeded by its content."""
+    rng = random.Random(hashlib.sha256("\n".join(ids).encode("utf-8")).digest())
+    result = []
+    for _ in range(count):
+        order = list(range(len(ids)))
+        rng.shuffle(order)
+        result.append(order)
+    return result
+
+
+def compress(payload: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(payload, compresslevel=9, mtime=0)
+    return brotli.compress(payload, quality=11)
+
+
+def write_pack(root: str, directory: str, stem: str, body: dict, compressions: list[str]) -> dict:
+    """
+    Write one pack under `directory`, named <stem>-<hash>.json(.gz|.br).
+    Returns its manifest entry.
+    """
+    body = {**body, "version": PACK_FORMAT_VERSION,
+            "orders": orderings([question["id"] for question in body["questions"]])}
+    payload = canonical_json(body)
+    digest = hashlib.sha256(payload).hexdigest()
+    path = f"{directory}/{stem}-{digest[:12]}.json"
+    os.makedirs(os.path.join(root, directory), exist_ok=True)
+    sizes = {}
+    for compression in compressions:
+        target = os.path.join(root, path + COMPRESSIONS[compression])
+        if not os.path.exists(target):
+            data = compress(payload, compression)
+            with open(target + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(target + ".tmp", target)
+        sizes[compression] = os.path.getsize(target)
+    return {"path": path, "count": len(body["questions"]), "sha256": digest, "bytes": sizes}
+
+
+def read_pack(root: str, entry: dict) -> dict:
+    with gzip.open(os.path.join(root, entry["path"] + ".gz"), "rb") as f:
+        return json.loads(f.read().decode("utf-8"))
+
+
+# =============================================================================
+# BUILD
+# =============================================================================
+
+def load_state(root: str) -> dict:
+    manifest_path = os.path.join(root, MANIFEST_FILE)
+    state_path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(manifest_path) or not os.path.exists(state_path):
+        return {"manifest": {"version": 0, "categories": {}, "games": []}, "ids": {}}
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    with open(state_path, encoding="utf-8") as f:
+        ids = json.load(f)
+    return {"manifest": manifest, "ids": ids}
+
+
+def _write_json(path: str, data) -> None:
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def build_game_packs(root: str, categories: dict, compressions: list[str], seed: str,
+                     count: int = GAME_PACKS,
+                     per_category: int = GAME_QUESTIONS_PER_CATEGORY) -> list[dict]:
+    """
+    Mixed packs of `per_category` questions from every category, sampled
+    across topics. The sample is seeded by the category shards' hashes, so
+    unchanged shards give unchanged game packs.
+    """
+    rng = random.Random(seed)
+    loaded: dict[str, list[dict]] = {}
+
+    def questions_of(entry: dict) -> list[dict]:
+        if entry["path"] not in loaded:
+            loaded[entry["path"]] = read_pack(root, entry)["questions"]
+        return loaded[entry["path"]]
+
+    games = []
+    for number in range(count):
+        questions = {}
+        for category, topics in sorted(categories.items()):
+            shards = [shard for topic in sorted(topics) for shard in topics[topic]["shards"]]
+            total = sum(shard["count"] for shard in shards)
+            picks = sorted(rng.sample(range(total), min(per_category, total)))
+            chosen, offset = [], 0
+            for shard in shards:
+                inside = [pick - offset for pick in picks if offset <= pick < offset + shard["count"]]
+                if inside:
+                    pack = questions_of(shard)
+                    chosen.extend({**pack[i], "category": category} for i in inside)
+                offset += shard["count"]
+            questions[category] = chosen
+        flat = [question for category in sorted(questions) for question in questions[category]]
+        if not flat:
+            break
+        games.append(write_pack(root, "games", f"{number:04d}", {"questions": flat}, compressions))
+    return games
+
+
+def build_packs(rows: Iterable[tuple[str, tuple]], root: str = DEFAULT_PACKS_DIR,
+                compressions: Optional[list[str]] = None, shard_size: int = SHARD_SIZE) -> dict:
+    """
+    Add new questions to the packs under `root` and rewrite only the shards
+    they land in (plus the game packs and manifest, if anything changed).
+    Returns {"added": n, "duplicates": n, "shards_written": n, "version": n}.
+    """
+    compressions = compressions or ["gzip"]
+    if "gzip" not in compressions:
+        compressions = ["gzip", *compressions]  # shards are read back from the .gz copy
+    state = load_state(root)
+    manifest, ids = state["manifest"], state["ids"]
+    known = {qid for shards in ids.values() for shard in shards for qid in shard}
+
+    fresh: dict[tuple[str, str], list[dict]] = {}
+    duplicates = 0
+    for category, row in rows:
+        question = pack_question(category, row)
+        if question["id"] in known:
+            duplicates += 1
+            continue
+        known.add(question["id"])
+        fresh.setdefault((category, topic_slug(question.get("topic"))), []).append(question)
+
+    written = 0
+    for (category, topic), questions in sorted(fresh.items()):
+        group = f"{category}/{topic}"
+        entry = manifest["categories"].setdefault(category, {}).setdefault(topic, {"count": 0, "shards": []})
+        shard_ids = ids.setdefault(group, [])
+        # Top up the last shard, then open new ones
+        if entry["shards"] and entry["shards"][-1]["count"] < shard_size:
+            last = entry["shards"].pop()
+            shard_ids.pop()
+            questions = read_pack(root, last)["questions"] + questions
+        for start in range(0, len(questions), shard_size):
+            chunk = questions[start:start + shard_size]
+            body = {"category": category, "topic": topic, "questions": chunk}
+            entry["shards"].append(write_pack(root, group, f"{len(entry['shards']):04d}", body, compressions))
+            shard_ids.append([question["id"] for question in chunk])
+            written += 1
+        entry["count"] = sum(shard["count"] for shard in entry["shards"])
+
+    if written or manifest["version"] == 0:
+        seed = hashlib.sha256("".join(
+            shard["sha256"] for category in sorted(manifest["categories"])
+            for topic in sorted(manifest["categories"][category])
+            for shard in manifest["categories"][category][topic]["shards"]
+        ).encode("utf-8")).hexdigest()
+        manifest["games"] = build_game_packs(root, manifest["categories"], compressions, seed)
+        manifest["version"] += 1
+        manifest["generated"] = datetime.now().isoformat()
+        manifest["format"] = PACK_FORMAT_VERSION
+        manifest["compression"] = compressions
+        manifest["shardSize"] = shard_size
+        os.makedirs(root, exist_ok=True)
+        _write_json(os.path.join(root, STATE_FILE), ids)
+        _write_json(os.path.join(root, MANIFEST_FILE), manifest)
+    return {"added": sum(len(questions) for questions in fresh.values()), "duplicates": duplicates,
+            "shards_written": written, "version": manifest["version"]}
+
+
+def prune_packs(root: str = DEFAULT_PACKS_DIR) -> int:
+    """Delete pack files the current manifest no longer references."""
+    manifest = load_state(root)["manifest"]
+    referenced = {
+        shard["path"] for topics in manifest["categories"].values()
+        for topic in topics.values() for shard in topic["shards"]
+    } | {game["path"] for game in manifest["games"]}
+    removed = 0
+    for path in glob.glob(os.path.join(root, "**", "*.json.*"), recursive=True):
+        relative = os.path.relpath(path, root).replace(os.sep, "/")
+        if relative.rsplit(".", 1)[0] not in referenced:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser question pack export")
+    parser.add_argument("--packs", default=DEFAULT_PACKS_DIR, help="Pack directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Add questions to the packs (incremental)")
+    build.add_argument("--sql", nargs="*", default=[], help="Seed .sql files with INSERT statements")
+    build.add_argument("--runs", nargs="*", default=[], help="miner.py run directories")
+    build.add_argument("--compression", choices=["gzip", "br", "both"], default="gzip",
+                       help="Compressed copies to write (br needs the brotli package)")
+    build.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Questions per shard")
+    sub.add_parser("stats", help="Show packed questions per category and topic")
+    sub.add_parser("prune", help="Delete pack files the manifest no longer references")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        compressions = ["gzip", "br"] if args.compression == "both" else [args.compression]
+        if "br" in compressions and not BROTLI_AVAILABLE:
+            print("ERROR: brotli not installed. Run: pip install brotli")
+            return
+        rows = (*iter_sql_questions(args.sql), *iter_run_questions(args.runs))
+        result = build_packs(rows, args.packs, compressions, args.shard_size)
+        print(f"📦 Added {result['added']} questions ({result['duplicates']} already packed), "
+              f"{result['shards_written']} shards written, manifest version {result['version']}")
+    elif args.command == "prune":
+        print(f"🧹 Removed {prune_packs(args.packs)} unreferenced pack files")
+    else:
+        manifest = load_state(args.packs)["manifest"]
+        print(f"📦 Manifest version {manifest['version']}, {len(manifest['games'])} game packs")
+        for category, topics in sorted(manifest["categories"].items()):
+            total = sum(topic["count"] for topic in topics.values())
+            shards = sum(len(topic["shards"]) for topic in topics.values())
+            print(f"   {category}: {total} questions in {shards} shards across {len(topics)} topics")
+
+
+if __name__ == "__main__":
+    main()
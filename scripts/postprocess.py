@@ -0,0 +1,255 @@
+"""
+Wiki Guesser - Question Post-Processing
+=======================================
+Everything that happens to a question set after Gemini returns it:
+validation and repair, Wikipedia URL construction, and turning sections
+into table rows - plus rendering those rows as SQL.
+
+This is pure CPU work. When cached generations for a large run are
+replayed, it dominates the run. With more than one worker it is spread over
+a process pool in chunks. Results come back through an iterator in input
+order, and at most a few chunks per worker are in flight, so output is
+identical to an inline run and memory stays flat.
+"""
+
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+
+from cache import ResponseCache
+from sql_writer import QUESTION_TABLES, columns_for, copy_line, iter_insert_statements, table_for
+from title_index import TitleIndex
+from validation import QuestionValidator, TitleResolver
+
+CHUNK_SIZE = 256  # Articles (or rows, when rendering SQL) per worker task
+CHUNKS_PER_WORKER = 4  # Chunks in flight per worker
+
+
+# =============================================================================
+# ROWS
+# =============================================================================
+
+def build_wikipedia_url(title: str, language: str = "en") -> str:
+    """Build the Wikipedia URL for an article title on a language edition."""
+    return f"https://{language}.wikipedia.org/wiki/{title.replace(' ', '_')}"
+
+
+def question_row(category: str, data: dict, wikipedia_url: str,
+                 rng: Optional[random.Random] = None) -> Optional[tuple]:
+    """
+    Build the row for a question category, in the column order of
+    sql_writer.QUESTION_TABLES. `rng` shuffles the wiki_links options
+    (default: the module-level random).
+    """
+    if category == "odd_wiki_out":
+        return (
+            data.get("items", []),
+            int(data.get("impostor_index", 0)),
+            data.get("connection", ""),
+            data.get("topic", ""),
+            wikipedia_url,
+        )
+
+    elif category == "when_in_wiki":
+        return (
+            data.get("event", ""),
+            int(data.get("correct_year", 2000)),
+            data.get("year_options", [2000, 2001, 2002, 2003]),
+            data.get("topic", ""),
+            wikipedia_url,
+        )
+
+    elif category == "wiki_or_fiction":
+        return (
+            data.get("statement", ""),
+            bool(data.get("is_true", False)),
+            data.get("explanation", ""),
+            data.get("topic", ""),
+            wikipedia_url,
+        )
+
+    elif category == "wiki_links":
+        # Shuffle options so correct answer isn't always first
+        options = list(data.get("connection_options", ["", "", "", ""]))
+        if options and len(options) >= 4:
+            (rng or random).shuffle(options)
+        return (
+            data.get("titles", []),
+            data.get("connection", ""),
+            options,
+            data.get("topic", ""),
+            wikipedia_url,
+        )
+
+    return None
+
+
+def questions_to_rows(questions: dict, wiki_url: str) -> dict:
+    """
+    Turn a generated question set into table rows, keyed by category.
+    """
+    rows = {}
+    for category in QUESTION_TABLES:
+        if category in questions:
+            row = question_row(category, questions[category], wiki_url)
+            if row:
+                rows[category] = row
+    return rows
+
+
+def postprocess(validator: QuestionValidator, items: list[tuple[str, Optional[dict]]],
+                language: str = "en") -> list[Optional[dict]]:
+    """
+    Validate a group of (title, question set) pairs from one language
+    edition as a batch and turn each into {category: row}, or None when
+    nothing survives.
+    """
+    validated = validator.validate_batch([questions for _, questions in items])
+    return [
+        questions_to_rows(questions, build_wikipedia_url(title, language)) or None if questions else None
+        for (title, _), questions in zip(items, validated)
+    ]
+
+
+# =============================================================================
+# PROCESS POOL
+# =============================================================================
+
+def make_validator(check_titles: bool = True, cache: Optional[ResponseCache] = None,
+                   index: Optional[TitleIndex] = None, language: str = "en") -> QuestionValidator:
+    """Validator whose title check uses the offline index when it has a title listing."""
+    if not check_titles:
+        return QuestionValidator()
+    if index and index.has_listing:
+        return QuestionValidator(index.resolve)
+    return QuestionValidator(TitleResolver(language, cache).resolve)
+
+
+# Per-process state, set up by init_worker
+_worker_validator: Optional[QuestionValidator] = None
+_worker_language = "en"
+
+
+def init_worker(check_titles: bool, cache_path: Optional[str], index_path: Optional[str],
+                language: str = "en") -> None:
+    """
+    Pool initializer: each worker opens its own cache and index handles,
+    and re-seeds `random` so forked workers do not shuffle options in step.
+    """
+    global _worker_validator, _worker_language
+    random.seed()
+    cache = ResponseCache(cache_path) if cache_path and check_titles else None
+    index = TitleIndex(index_path) if index_path and check_titles else None
+    _worker_validator = make_validator(check_titles, cache, index, language)
+    _worker_language = language
+
+
+def _postprocess_chunk(items: list[tuple[str, Optional[dict]]]) -> tuple[list[Optional[dict]], tuple]:
+    rows = postprocess(_worker_validator, items, _worker_language)
+    return rows, _worker_validator.take_stats()
+
+
+def imap_chunks(fn: Callable, chunks: Iterable, workers: int,
+                initializer: Optional[Callable] = None, initargs: tuple = ()) -> Iterator:
+    """
+    Yield fn(chunk) for each chunk, in input order, computed by a pool of
+    `workers` processes (inline when workers <= 1). Chunks are submitted
+    lazily, CHUNKS_PER_WORKER per worker at most, and finished results are
+    yielded as soon as every earlier chunk is done, so a slow input stream
+    never holds back output.
+    """
+    if workers <= 1:
+        if initializer:
+            initializer(*initargs)
+        for chunk in chunks:
+            yield fn(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(fn, chunk))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield pending.popleft().result()
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_postprocessed(items: Iterable[tuple[int, str, Optional[dict]]], validator: QuestionValidator,
+                       workers: int, check_titles: bool = True, cache_path: Optional[str] = None,
+                       index_path: Optional[str] = None, chunk_size: Optional[int] = None,
+                       language: str = "en") -> Iterator[tuple[int, str, Optional[dict]]]:
+    """
+    Post-process a stream of (index, title, question set) on `workers`
+    processes, yielding (index, title, rows) in input order. Validation
+    counts from the workers are merged into `validator`. Inline (workers <= 1)
+    each chunk is validated with `validator` itself.
+    """
+    chunks = chunked(items, chunk_size or CHUNK_SIZE)
+    if workers <= 1:
+        for chunk in chunks:
+            rows_list = postprocess(validator, [(title, questions) for _, title, questions in chunk], language)
+            for (index, title, _), rows in zip(chunk, rows_list):
+                yield index, title, rows
+        return
+    pending: deque = deque()
+
+    def tracked():
+        for chunk in chunks:
+            pending.append(chunk)
+            yield [(title, questions) for _, title, questions in chunk]
+
+    for rows_list, stats in imap_chunks(_postprocess_chunk, tracked(), workers,
+                                        init_worker, (check_titles, cache_path, index_path, language)):
+        validator.add_stats(stats)
+        for (index, title, _), rows in zip(pending.popleft(), rows_list):
+            yield index, title, rows
+
+
+# =============================================================================
+# SQL RENDERING
+# =============================================================================
+
+def _render_chunk(job: tuple[str, str, int, list[tuple]]) -> str:
+    category, fmt, batch_size, rows = job
+    if fmt == "copy":
+        return "".join(copy_line(category, row) + "\n" for row in rows)
+    return "".join(statement + "\n\n" for statement in iter_insert_statements(category, rows, batch_size))
+
+
+def write_table_parallel(f, category: str, rows: Iterable[tuple], fmt: str = "insert",
+                         batch_size: int = 1, workers: int = 1) -> int:
+    """
+    Like sql_writer.write_table, with literal escaping spread over `workers`
+    processes. Chunks hold whole INSERT batches, so the output is identical.
+    """
+    if fmt not in ("insert", "copy"):
+        raise ValueError(f"Unsupported SQL format: {fmt}")
+    count = 0
+
+    def jobs():
+        nonlocal count
+        size = max(1, CHUNK_SIZE // batch_size) * batch_size
+        for chunk in chunked(rows, size):
+            count += len(chunk)
+            yield category, fmt, batch_size, chunk
+
+    if fmt == "copy":
+        f.write(f"COPY {table_for(category)} ({', '.join(columns_for(category))}) FROM STDIN;\n")
+    for text in imap_chunks(_render_chunk, jobs(), workers):
+        f.write(text)
+    if fmt == "copy":
+        f.write("\\.\n\n")
+    return count
@@ -0,0 +1,550 @@
+"""
+Wiki Guesser - Model Router
+===========================
+Picks the Gemini model and output token cap for each article, escalates to
+a stronger model only when an answer fails validation, and holds the run
+to a token and cost budget (miner.py --route).
+
+For every article:
+    output cap      OUTPUT_TOKENS_BASE + OUTPUT_TOKENS_PER_WORD per summary
+                    word, rounded up to 128 (a question set is a few hundred
+                    tokens; the flat 2048 only pays off for truncated answers)
+    first model     the cheapest tier whose failure rate for summaries of
+                    that length (short / medium / long) is at most
+                    MAX_FAILURE_RATE. Rates start from a prior and are kept
+                    in .router_stats.json, so each run starts from the last
+                    run's experience
+    escalation      an answer that is missing, truncated or fails the
+                    validation shape checks is asked again one tier up, with
+                    OUTPUT_ESCALATION times the output cap
+
+Budget: before each request its worst case (estimated prompt tokens plus
+the output cap, at the tier's price) is reserved; a request that could take
+the run past --max-tokens / --max-cost is not sent (BudgetExhausted), and
+once not even the cheapest tier's smallest request fits, the miner fails
+the remaining articles fast instead. Real usage from each
+response's usage_metadata is charged as it arrives, so the totals are live.
+
+Prices are USD per million tokens (https://ai.google.dev/pricing); update
+MODEL_TIERS when they change.
+
+StubModel is a stand-in for genai.GenerativeModel (canned answers, token
+usage, truncation and per-tier failure rates); `simulate` runs the routing
+policy against it, so routing changes can be compared without API calls.
+
+Usage:
+    python router.py simulate --articles 1000
+    python router.py simulate --articles 1000 --fixed gemini-2.0-flash   # today's single-model baseline
+    python router.py simulate --articles 1000 --max-cost 0.05
+    python router.py stats
+"""
+
+import argparse
+import copy
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+from validation import CHECKS
+
+DEFAULT_STATS_PATH = ".router_stats.json"
+
+# Cheapest first; USD per million input / output tokens
+MODEL_TIERS = [
+    {"model": "gemini-2.0-flash-lite", "input": 0.075, "output": 0.30},
+    {"model": "gemini-2.0-flash", "input": 0.10, "output": 0.40},
+    {"model": "gemini-2.5-flash", "input": 0.30, "output": 2.50},
+]
+
+OUTPUT_TOKENS_BASE = 512  # Output cap for an empty summary
+OUTPUT_TOKENS_PER_WORD = 0.5  # Extra output cap per summary word
+MIN_OUTPUT_TOKENS = 512
+MAX_OUTPUT_TOKENS = 2048
+OUTPUT_ESCALATION = 1.5  # Output cap multiplier for each escalation
+SHORT_SUMMARY_WORDS = 120  # Summaries up to this long are "short"...
+LONG_SUMMARY_WORDS = 350  # ...and from this long "long"
+MAX_FAILURE_RATE = 0.25  # A tier failing more often than this is skipped for that summary length
+PRIOR_ATTEMPTS = 10  # Weight of the prior failure rate...
+PRIOR_FAILURE_RATE = 0.1  # ...which new tiers and lengths start from
+CHARS_PER_TOKEN = 4  # For estimating prompt sizes before sending
+
+
+class BudgetExhausted(RuntimeError):
+    """The next request could take the run past its token or cost budget."""
+
+
+class OutputTruncated(ValueError):
+    """The model stopped at the output cap, so the answer is incomplete."""
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def summary_bucket(words: int) -> str:
+    if words <= SHORT_SUMMARY_WORDS:
+        return "short"
+    return "long" if words >= LONG_SUMMARY_WORDS else "medium"
+
+
+def output_tokens_for(words: int) -> int:
+    tokens = OUTPUT_TOKENS_BASE + OUTPUT_TOKENS_PER_WORD * words
+    return max(MIN_OUTPUT_TOKENS, min(MAX_OUTPUT_TOKENS, math.ceil(tokens / 128) * 128))
+
+
+def model_name_of(model, default: str = "") -> str:
+    """Model id of a genai.GenerativeModel ("models/gemini-2.0-flash" -> "gemini-2.0-flash")."""
+    name = getattr(model, "model_name", None) or default
+    return name.removeprefix("models/")
+
+
+def is_truncated(response) -> bool:
+    """Did generation stop at max_output_tokens?"""
+    for candidate in getattr(response, "candidates", None) or []:
+        reason = getattr(candidate, "finish_reason", None)
+        if getattr(reason, "name", reason) in ("MAX_TOKENS", 2):
+            return True
+    return False
+
+
+def passes_checks(questions) -> bool:
+    """All four sections present and passing validation's shape checks."""
+    if not isinstance(questions, dict):
+        return False
+    for category, check in CHECKS.items():
+        section = questions.get(category)
+        if not isinstance(section, dict) or check(copy.deepcopy(section))[0]:
+            return False
+    return True
+
+
+# =============================================================================
+# BUDGET
+# =============================================================================
+
+class TokenBudget:
+    """
+    Run-wide token and cost accounting, safe to share between threads.
+    None limits are not enforced (the totals are still kept).
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None,
+                 tiers: list[dict] = MODEL_TIERS):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.prices = {tier["model"]: (tier["input"], tier["output"]) for tier in tiers}
+        self.tokens = Counter()  # (model, "in" | "out") -> tokens
+        self.requests = Counter()  # model -> requests charged
+        self.cost = 0.0
+        self.refused = 0
+        self._reserved_tokens = 0
+        self._reserved_cost = 0.0
+        self._lock = threading.Lock()
+
+    def price(self, model: str, tokens_in: int, tokens_out: int) -> float:
+        # Unknown models are priced like the most expensive tier
+        prices = self.prices.get(model) or max(self.prices.values(), key=lambda price: price[1])
+        return (tokens_in * prices[0] + tokens_out * prices[1]) / 1e6
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.tokens.values())
+
+    @property
+    def exhausted(self) -> bool:
+        """
+        True once the cheapest tier's smallest request (MIN_OUTPUT_TOKENS of
+        output, no prompt) no longer fits. Larger requests are refused one
+        at a time by reserve(). Open reservations are not counted: they are
+        worst cases, released when their responses are charged.
+        """
+        cheapest = min(self.price(model, 0, MIN_OUTPUT_TOKENS) for model in self.prices)
+        with self._lock:
+            if self.max_tokens is not None and self.total_tokens + MIN_OUTPUT_TOKENS > self.max_tokens:
+                return True
+            return self.max_cost is not None and self.cost + cheapest > self.max_cost
+
+    def reserve(self, model: str, prompt_tokens: int, max_output_tokens: int) -> tuple[int, float]:
+        """Hold a request's worst case, or raise BudgetExhausted if it might not fit."""
+        tokens = prompt_tokens + max_output_tokens
+        cost = self.price(model, prompt_tokens, max_output_tokens)
+        with self._lock:
+            if self.max_tokens is not None and self.total_tokens + self._reserved_tokens + tokens > self.max_tokens:
+                self.refused += 1
+                raise BudgetExhausted(f"token budget of {self.max_tokens} reached ({self.total_tokens} used)")
+            if self.max_cost is not None and self.cost + self._reserved_cost + cost > self.max_cost:
+                self.refused += 1
+                raise BudgetExhausted(f"cost budget of ${self.max_cost:.4g} reached (${self.cost:.4f} spent)")
+            self._reserved_tokens += tokens
+            self._reserved_cost += cost
+        return tokens, cost
+
+    def release(self, reservation: tuple[int, float]) -> None:
+        with self._lock:
+            self._reserved_tokens -= reservation[0]
+            self._reserved_cost -= reservation[1]
+
+    def charge(self, model: str, tokens_in: int, tokens_out: int) -> float:
+        """Record a response's real usage. Returns its cost."""
+        cost = self.price(model, tokens_in, tokens_out)
+        with self._lock:
+            self.tokens[model, "in"] += tokens_in
+            self.tokens[model, "out"] += tokens_out
+            self.requests[model] += 1
+            self.cost += cost
+        return cost
+
+    def summary(self) -> dict:
+        with self._lock:
+            models = sorted(self.requests)
+            return {
+                "tokens": self.total_tokens,
+                "cost": self.cost,
+                "max_tokens": self.max_tokens,
+                "max_cost": self.max_cost,
+                "refused": self.refused,
+                "models": {
+                    model: {
+                        "requests": self.requests[model],
+                        "tokens_in": self.tokens[model, "in"],
+                        "tokens_out": self.tokens[model, "out"],
+                    }
+                    for model in models
+                },
+            }
+
+
+# =============================================================================
+# ROUTER
+# =============================================================================
+
+class ModelRouter:
+    """
+    Chooses a route - {"tier", "model", "max_output_tokens", "bucket"} - per
+    article and learns each tier's failure rate per summary length. Safe to
+    share between threads.
+
+    `output_tokens` fixes the output cap (no per-article sizing); a single
+    tier with it reproduces the unrouted miner.
+    """
+
+    def __init__(self, tiers: list[dict] = MODEL_TIERS, budget: Optional[TokenBudget] = None,
+                 stats: Optional[dict] = None, max_failure_rate: float = MAX_FAILURE_RATE,
+                 output_tokens: Optional[int] = None):
+        self.tiers = tiers
+        self.budget = budget or TokenBudget(tiers=tiers)
+        self.max_failure_rate = max_failure_rate
+        self.output_tokens = output_tokens
+        # model -> bucket -> [attempts, failures]
+        self.stats: dict[str, dict[str, list[int]]] = stats or {}
+        self.outcomes = Counter()  # "first_try", "escalated", "failed", "escalations"
+        self.latency: dict[str, float] = {}  # model -> moving average seconds per attempt
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_STATS_PATH, **kwargs) -> "ModelRouter":
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, encoding="utf-8") as f:
+            return cls(stats=json.load(f), **kwargs)
+
+    def save(self, path: str = DEFAULT_STATS_PATH) -> None:
+        with self._lock:
+            data = json.dumps(self.stats, indent=1, sort_keys=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def tier_of(self, model: str) -> Optional[int]:
+        for index, tier in enumerate(self.tiers):
+            if tier["model"] == model:
+                return index
+        return None
+
+    def failure_rate(self, model: str, bucket: str) -> float:
+        with self._lock:
+            attempts, failures = self.stats.get(model, {}).get(bucket, (0, 0))
+        return (failures + PRIOR_FAILURE_RATE * PRIOR_ATTEMPTS) / (attempts + PRIOR_ATTEMPTS)
+
+    def _route(self, tier: int, max_output_tokens: int, bucket: str) -> dict:
+        return {"tier": tier, "model": self.tiers[tier]["model"],
+                "max_output_tokens": max_output_tokens, "bucket": bucket}
+
+    def first_route(self, words: int, above: Optional[str] = None) -> Optional[dict]:
+        """
+        The route to try first for a summary of `words` words: the cheapest
+        tier that is reliable enough for its length (the strongest if none
+        is). `above` skips that model's tier and every cheaper one (e.g. the
+        --gemini-batch model whose answer already failed); None if no tier
+        is left.
+        """
+        bucket = summary_bucket(words)
+        lowest = 0
+        if above is not None:
+            found = self.tier_of(above)
+            lowest = 0 if found is None else found + 1
+        if lowest >= len(self.tiers):
+            return None
+        tier = next((index for index in range(lowest, len(self.tiers))
+                     if self.failure_rate(self.tiers[index]["model"], bucket) <= self.max_failure_rate),
+                    len(self.tiers) - 1)
+        return self._route(tier, self.output_tokens or output_tokens_for(words), bucket)
+
+    def escalate(self, route: dict) -> Optional[dict]:
+        """The next tier up with a larger output cap, or None at the top."""
+        if route["tier"] + 1 >= len(self.tiers):
+            return None
+        tokens = self.output_tokens or min(MAX_OUTPUT_TOKENS, math.ceil(route["max_output_tokens"] * OUTPUT_ESCALATION))
+        return self._route(route["tier"] + 1, tokens, route["bucket"])
+
+    def record(self, route: dict, ok: bool, seconds: float) -> None:
+        with self._lock:
+            counts = self.stats.setdefault(route["model"], {}).setdefault(route["bucket"], [0, 0])
+            counts[0] += 1
+            counts[1] += 0 if ok else 1
+            previous = self.latency.get(route["model"])
+            self.latency[route["model"]] = seconds if previous is None else 0.9 * previous + 0.1 * seconds
+
+    def run(self, words: int, attempt: Callable[[dict], Optional[dict]], prompt_tokens: int,
+            valid: Callable[[dict], bool] = passes_checks, above: Optional[str] = None) -> Optional[dict]:
+        """
+        Call attempt(route) from the first route up the tiers until it
+        returns an answer `valid` accepts. Returns that answer, or None once
+        every tier failed. Each attempt reserves its worst case against the
+        budget first; raises BudgetExhausted if it does not fit.
+        """
+        route = self.first_route(words, above)
+        escalations = 0
+        while route:
+            reservation = self.budget.reserve(route["model"], prompt_tokens, route["max_output_tokens"])
+            start = time.perf_counter()
+            try:
+                answer = attempt(route)
+            finally:
+                self.budget.release(reservation)
+            ok = answer is not None and valid(answer)
+            self.record(route, ok, time.perf_counter() - start)
+            if ok:
+                with self._lock:
+                    self.outcomes["escalated" if escalations else "first_try"] += 1
+                    self.outcomes["escalations"] += escalations
+                return answer
+            route = self.escalate(route)
+            if route:
+                escalations += 1
+        with self._lock:
+            self.outcomes["failed"] += 1
+            self.outcomes["escalations"] += escalations
+        return None
+
+    def report(self) -> dict:
+        with self._lock:
+            rates = {
+                model: {bucket: {"attempts": counts[0], "failure_rate": counts[1] / counts[0] if counts[0] else 0.0}
+                        for bucket, counts in sorted(buckets.items())}
+                for model, buckets in self.stats.items()
+            }
+            return {"outcomes": dict(self.outcomes), "latency": dict(self.latency), "rates": rates,
+                    "budget": self.budget.summary()}
+
+
+def print_route_report(router: ModelRouter) -> None:
+    report = router.report()
+    outcomes = report["outcomes"]
+    budget = report["budget"]
+    print(f"   🧭 Routing: {outcomes.get('first_try', 0)} first try, {outcomes.get('escalated', 0)} after "
+          f"escalation, {outcomes.get('failed', 0)} failed ({outcomes.get('escalations', 0)} escalations)")
+    for model, usage in budget["models"].items():
+        latency = report["latency"].get(model)
+        print(f"      {model}: {usage['requests']} requests, {usage['tokens_in']} in / {usage['tokens_out']} out"
+              + (f", {latency:.1f}s per attempt" if latency and latency >= 0.05 else ""))
+    spent = f"{budget['tokens']} tokens"
+    if budget["max_tokens"] is not None:
+        spent += f" of {budget['max_tokens']}"
+    spent += f", ${budget['cost']:.4f}"
+    if budget["max_cost"] is not None:
+        spent += f" of ${budget['max_cost']:.4g}"
+    if budget["refused"]:
+        spent += f" ({budget['refused']} requests refused)"
+    print(f"   💸 Spent {spent}")
+
+
+# =============================================================================
+# STUB BACKEND
+# =============================================================================
+
+# Invalid-answer rate per tier and summary length (short summaries give the
+# cheap models too little to work with)
+STUB_FAILURE_RATES = {
+    "gemini-2.0-flash-lite": {"short": 0.35, "medium": 0.12, "long": 0.08},
+    "gemini-2.0-flash": {"short": 0.12, "medium": 0.05, "long": 0.04},
+    "gemini-2.5-flash": {"short": 0.03, "medium": 0.02, "long": 0.02},
+}
+STUB_SECONDS = {"gemini-2.0-flash-lite": 1.2, "gemini-2.0-flash": 1.8, "gemini-2.5-flash": 4.5}
+STUB_SECONDS_PER_TOKEN = 0.004
+
+
+class _StubCandidate:
+    def __init__(self, finish_reason: str):
+        self.finish_reason = finish_reason
+
+
+class _StubUsage:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class StubResponse:
+    def __init__(self, text: str, prompt_tokens: int, output_tokens: int, finish_reason: str = "STOP"):
+        self.text = text
+        self.usage_metadata = _StubUsage(prompt_tokens, output_tokens)
+        self.candidates = [_StubCandidate(finish_reason)]
+
+
+class StubModel:
+    """
+    Stand-in for genai.GenerativeModel. Answers every prompt with a valid
+    question set about its "**Article Title:**", except at the tier's
+    STUB_FAILURE_RATES for the summary's length, where one section is
+    broken. Answers longer than max_output_tokens are cut off with
+    finish_reason MAX_TOKENS. `latency` (seconds) is slept per call. With
+    stream=True the answer arrives as a single chunk.
+    """
+
+    def __init__(self, model_name: str, seed: Optional[int] = None, latency: float = 0.0):
+        self.model_name = f"models/{model_name}"
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def answer(self, title: str, words: int) -> dict:
+        padding = " ".join(["detail"] * (words // 8))  # Richer summaries, longer explanations
+        return {
+            "odd_wiki_out": {"items": [f"{title} {n}" for n in "ABCD"], "impostor_index": 2,
+                             "connection": f"Linked to {title}", "topic": "Other"},
+            "when_in_wiki": {"event": f"{title} began", "correct_year": 1990,
+                             "year_options": [1985, 1990, 1995, 2000], "topic": "Other"},
+            "wiki_or_fiction": {"statement": f"{title} is real", "is_true": True,
+                                "explanation": f"Its article says so. {padding}", "topic": "Other"},
+            "wiki_links": {"titles": [f"{title} {n}" for n in "WXYZ"], "connection": title,
+                           "connection_options": [title, "Rivers", "Kings", "Operas"], "topic": "Other"},
+        }
+
+    def generate_content(self, prompt: str, generation_config: Optional[dict] = None, stream: bool = False):
+        response = self._respond(prompt, generation_config)
+        # A streamed answer arrives as one chunk carrying the text, usage and finish reason
+        return iter([response]) if stream else response
+
+    def _respond(self, prompt: str, generation_config: Optional[dict]) -> StubResponse:
+        title = prompt.split("**Article Title:**", 1)[-1].strip().split("\n", 1)[0] or "Article"
+        words = len(prompt.split("**Article Summary:**", 1)[-1].split())
+        model = model_name_of(self)
+        with self._lock:
+            broken = self._rng.random() < STUB_FAILURE_RATES.get(model, {}).get(summary_bucket(words), 0.0)
+        answer = self.answer(title, words)
+        if broken:
+            answer["odd_wiki_out"]["items"] = answer["odd_wiki_out"]["items"][:3]
+        text = json.dumps(answer)
+        output_tokens = estimate_tokens(text)
+        limit = (generation_config or {}).get("max_output_tokens", MAX_OUTPUT_TOKENS)
+        if self.latency:
+            time.sleep(self.latency)
+        if output_tokens > limit:
+            return StubResponse(text[:limit * CHARS_PER_TOKEN], estimate_tokens(prompt), limit, "MAX_TOKENS")
+        return StubResponse(text, estimate_tokens(prompt), output_tokens)
+
+
+def stub_attempt(models: dict[str, StubModel], budget: TokenBudget, title: str, summary: str,
+                 clock: Counter) -> Callable[[dict], Optional[dict]]:
+    """
+    attempt(route) for ModelRouter.run against stub models: charges the
+    budget like miner.py's record_usage and adds simulated model time to
+    clock["seconds"].
+    """
+    prompt = f"**Article Title:** {title}\n\n**Article Summary:**\n{summary}\n"
+
+    def attempt(route: dict) -> Optional[dict]:
+        response = models[route["model"]].generate_content(
+            prompt, generation_config={"max_output_tokens": route["max_output_tokens"]}
+        )
+        usage = response.usage_metadata
+        budget.charge(route["model"], usage.prompt_token_count, usage.candidates_token_count)
+        clock["seconds"] += STUB_SECONDS[route["model"]] + STUB_SECONDS_PER_TOKEN * usage.candidates_token_count
+        if is_truncated(response):
+            return None
+        return json.loads(response.text)
+
+    return attempt
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def simulate(articles: int, fixed: Optional[str] = None, max_tokens: Optional[int] = None,
+             max_cost: Optional[float] = None, seed: int = 0) -> ModelRouter:
+    """
+    Route `articles` synthetic articles (summary lengths like the miner's:
+    mostly 100-500 words) through the stub backend. With `fixed`, every
+    article goes to that one model with the flat 2048-token cap and no
+    escalation, like miner.py without --route.
+    """
+    rng = random.Random(seed)
+    tiers = [tier for tier in MODEL_TIERS if tier["model"] == fixed] if fixed else MODEL_TIERS
+    if not tiers:
+        raise ValueError(f"Unknown model: {fixed}")
+    budget = TokenBudget(max_tokens, max_cost)
+    router = ModelRouter(tiers, budget, output_tokens=MAX_OUTPUT_TOKENS if fixed else None)
+    models = {tier["model"]: StubModel(tier["model"], seed=seed + n) for n, tier in enumerate(MODEL_TIERS)}
+    clock = Counter()
+    for n in range(articles):
+        words = min(500, max(20, int(rng.lognormvariate(5.3, 0.6))))
+        summary = " ".join(["word"] * words)
+        try:
+            router.run(words, stub_attempt(models, budget, f"Article {n}", summary, clock),
+                       estimate_tokens(summary) + 600)
+        except BudgetExhausted:
+            router.outcomes["skipped"] += 1
+    router.outcomes["model_seconds"] = round(clock["seconds"])
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser model router")
+    parser.add_argument("--stats", default=DEFAULT_STATS_PATH, help="Failure-rate file kept by miner.py --route")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show the learned failure rates")
+    sim = sub.add_parser("simulate", help="Route synthetic articles through the stub backend")
+    sim.add_argument("--articles", type=int, default=1000)
+    sim.add_argument("--fixed", choices=[tier["model"] for tier in MODEL_TIERS],
+                     help="Send everything to one model with a 2048-token cap (baseline)")
+    sim.add_argument("--max-tokens", type=int, default=None, help="Run-wide token budget")
+    sim.add_argument("--max-cost", type=float, default=None, help="Run-wide budget in USD")
+    sim.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        router = ModelRouter.load(args.stats)
+        for model, buckets in router.report()["rates"].items():
+            print(f"   {model}: " + ", ".join(
+                f"{bucket} {entry['failure_rate']:.0%} of {entry['attempts']}" for bucket, entry in buckets.items()
+            ))
+        return
+
+    router = simulate(args.articles, args.fixed, args.max_tokens, args.max_cost, args.seed)
+    outcomes = router.outcomes
+    valid = outcomes["first_try"] + outcomes["escalated"]
+    print(f"🧪 {args.articles} articles, {'fixed ' + args.fixed if args.fixed else 'routed'}: "
+          f"{valid} valid ({valid / args.articles:.1%}), {outcomes['skipped']} skipped by budget, "
+          f"{outcomes['model_seconds']}s of model time")
+    print_route_report(router)
+
+
+if __name__ == "__main__":
+    main()
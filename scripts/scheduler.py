@@ -0,0 +1,404 @@
+"""
+Wiki Guesser - Topic Balance Scheduler
+======================================
+Orders miner.py's candidate articles so a run's Gemini budget goes to the
+topics the question bank is short of, instead of whatever is trending
+(which is mostly celebrities and sports).
+
+Each candidate is pre-classified without calling Gemini: its title and
+Wikipedia short description ("American professional basketball player")
+are matched against keyword patterns for the topic tags the prompt asks
+Gemini to use. The scheduler starts from the questions already in the bank
+per (category, topic) - counted from seed .sql files and/or the database -
+and repeatedly takes the most popular remaining candidate of whichever
+topic is furthest below its target share. The miner only generates the
+first MAX_ARTICLES of that order, so over-represented candidates are
+dropped before they cost anything.
+
+The order is built lazily: each article is picked when the miner reaches
+it, from the rows emitted so far (using the topic Gemini actually tagged)
+plus the picks still in flight, so misclassified candidates are corrected
+as the run goes. The final report compares the emitted rows with the
+target.
+
+Usage:
+    python scheduler.py stats --sql ../supabase/seed_all_categories.sql seed_generated.sql
+    python scheduler.py stats --database      # count the live tables (DATABASE_URL)
+    python scheduler.py classify "LeBron James" "Treaty of Versailles"
+"""
+
+import argparse
+import os
+import re
+import threading
+from collections import Counter, deque
+from typing import Iterable, Optional
+
+from sql_writer import QUESTION_TABLES, columns_for, iter_sql_rows, table_for
+
+try:
+    import psycopg2
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+# Topic tags the generation prompt asks for
+TOPICS = ["Science", "History", "Technology", "Sports", "Entertainment", "Geography", "Arts", "Politics"]
+OTHER_TOPIC = "Other"  # Unclassified candidates / unrecognized tags
+
+BALANCE_OVERSAMPLE = 4  # Candidates fetched per article mined when balancing
+OTHER_SHARE = 1.0  # Target weight of unclassified candidates, relative to a topic's 1.0
+
+# Keywords matched (as whole words, case-insensitively) against title + short description
+TOPIC_KEYWORDS = {
+    "Science": [
+        "species", "genus", "disease", "virus", "bacteria", "physicist", "chemist", "biologist",
+        "mathematician", "scientist", "astronomer", "planet", "galaxy", "chemical element",
+        "theory", "physics", "chemistry", "biology", "mathematics", "medicine", "syndrome",
+        "vaccine", "dinosaur", "mammal", "bird", "fish", "plant", "protein", "mineral",
+    ],
+    "History": [
+        "war", "battle", "empire", "dynasty", "revolution", "ancient", "medieval", "century",
+        "historical", "emperor", "pharaoh", "massacre", "assassination", "siege", "treaty",
+        "kingdom", "civilization", "archaeological", "explorer", "holocaust", "crusade",
+    ],
+    "Technology": [
+        "software", "computer", "internet", "programming language", "smartphone", "website",
+        "social network", "artificial intelligence", "technology", "operating system",
+        "spacecraft", "aircraft", "engineer", "inventor", "video game console", "search engine",
+        "cryptocurrency", "semiconductor", "electric vehicle", "rocket", "app",
+    ],
+    "Sports": [
+        "footballer", "football", "soccer", "basketball", "baseball", "cricketer", "cricket",
+        "tennis", "golfer", "boxer", "wrestler", "athlete", "olympics", "olympic", "racing driver",
+        "formula one", "grand prix", "world cup", "super bowl", "league", "championship",
+        "tournament", "nfl", "nba", "ufc", "fc", "sports", "swimmer", "cyclist", "quarterback",
+    ],
+    "Entertainment": [
+        "actor", "actress", "singer", "rapper", "film", "movie", "television", "tv series",
+        "sitcom", "album", "song", "band", "musician", "video game", "comedian", "youtuber",
+        "streamer", "reality", "anime", "manga", "disc jockey", "record producer", "miniseries",
+        "soundtrack", "media franchise", "netflix", "drama series", "boy band", "pop", "music",
+    ],
+    "Geography": [
+        "city", "country", "river", "mountain", "island", "lake", "capital", "town", "village",
+        "region", "province", "municipality", "ocean", "sea", "desert", "national park",
+        "volcano", "continent", "archipelago", "peninsula", "state of", "county", "waterfall",
+    ],
+    "Arts": [
+        "painter", "painting", "sculptor", "sculpture", "artist", "novel", "novelist", "poet",
+        "poem", "writer", "author", "playwright", "architect", "opera", "ballet", "museum",
+        "literature", "composer", "symphony", "photographer", "fresco", "play by",
+    ],
+    "Politics": [
+        "politician", "president", "prime minister", "election", "political party", "senator",
+        "minister", "monarch", "king", "queen", "parliament", "government", "chancellor",
+        "diplomat", "activist", "referendum", "governor", "congressman", "dictator", "royal",
+    ],
+}
+
+_TOPIC_PATTERNS = {
+    topic: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+                      + r")s?\b", re.IGNORECASE)
+    for topic, words in TOPIC_KEYWORDS.items()
+}
+
+
+# =============================================================================
+# PRE-CLASSIFICATION
+# =============================================================================
+
+def classify(title: str, description: str = "") -> str:
+    """
+    Best-guess topic of an article from its title and short description
+    (OTHER_TOPIC when nothing matches). Description matches count double:
+    they describe the subject, titles often only name it.
+    """
+    scores = Counter()
+    for topic, pattern in _TOPIC_PATTERNS.items():
+        scores[topic] = len(pattern.findall(title)) + 2 * len(pattern.findall(description or ""))
+    topic, score = max(scores.items(), key=lambda item: item[1])
+    return topic if score else OTHER_TOPIC
+
+
+def canonical_topic(tag: Optional[str]) -> str:
+    """
+    Map a stored topic tag onto TOPICS: Gemini's free-form tags ("Science &
+    Nature") and OpenTDB's categories ("Entertainment: Film") mostly name
+    one directly; the rest are classified like a title.
+    """
+    if not tag:
+        return OTHER_TOPIC
+    lowered = tag.lower()
+    for topic in TOPICS:
+        if topic.lower() in lowered:
+            return topic
+    return classify(tag)
+
+
+def parse_target(text: str) -> dict[str, float]:
+    """
+    Parse --balance-target weights ("Science=2,Sports=0.5"). Topics not
+    listed keep weight 1 (OTHER_SHARE for Other).
+    """
+    weights = {topic: 1.0 for topic in TOPICS}
+    weights[OTHER_TOPIC] = OTHER_SHARE
+    known = {topic.lower(): topic for topic in weights}
+    for part in filter(None, (part.strip() for part in (text or "").split(","))):
+        name, _, value = part.partition("=")
+        topic = known.get(name.strip().lower())
+        if not topic:
+            raise argparse.ArgumentTypeError(f"unknown topic {name.strip()!r} (one of {', '.join(weights)})")
+        try:
+            weights[topic] = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad weight in {part!r}, expected TOPIC=NUMBER")
+        if weights[topic] < 0:
+            raise argparse.ArgumentTypeError(f"negative weight in {part!r}")
+    return weights
+
+
+# =============================================================================
+# EXISTING COUNTS
+# =============================================================================
+
+def count_sql(paths: Iterable[str]) -> Counter:
+    """(category, topic) question counts in seed .sql files."""
+    counts = Counter()
+    for path in paths:
+        for category, values in iter_sql_rows(path):
+            counts[category, canonical_topic(values.get("topic"))] += 1
+    return counts
+
+
+def count_database(dsn: Optional[str] = None) -> Counter:
+    """(category, topic) question counts in the live question tables."""
+    if not PSYCOPG2_AVAILABLE:
+        raise RuntimeError("psycopg2 not installed. Run: pip install psycopg2-binary")
+    dsn = dsn or os.getenv("DATABASE_URL")
+    if not dsn:
+        raise RuntimeError("DATABASE_URL not set")
+    counts = Counter()
+    connection = psycopg2.connect(dsn)
+    try:
+        with connection.cursor() as cursor:
+            for category in QUESTION_TABLES:
+                cursor.execute(f"SELECT topic, COUNT(*) FROM {table_for(category)} GROUP BY topic")
+                for tag, count in cursor.fetchall():
+                    counts[category, canonical_topic(tag)] += count
+    finally:
+        connection.close()
+    return counts
+
+
+# =============================================================================
+# SCHEDULER
+# =============================================================================
+
+class BalanceScheduler:
+    """
+    Orders candidates towards a target topic distribution, given the
+    questions already in the bank, and keeps running counts of what the run
+    emits. Safe to share between the miner's language threads.
+    """
+
+    def __init__(self, target: Optional[dict[str, float]] = None, existing: Optional[Counter] = None):
+        self.target = target or parse_target("")
+        self.existing = Counter(existing or {})
+        self.emitted = Counter()  # (category, topic) rows the run has emitted
+        self.planned = Counter()  # topic -> picks not yet emitted or failed
+        self._lock = threading.Lock()
+
+    def _topic_totals(self) -> Counter:
+        totals = Counter()
+        for (_, topic), count in self.existing.items():
+            totals[topic] += count
+        return totals
+
+    def order(self, candidates: list[tuple[str, str]], limit: int,
+              picked: Iterable[str] = ()) -> "BalancedOrder":
+        """
+        Reorder (title, predicted topic) candidates, most popular first (see
+        BalancedOrder). `picked` are titles already mined by a resumed run,
+        which keep their positions.
+        """
+        return BalancedOrder(self, candidates, limit, picked)
+
+    def pick_topic(self, heads: dict[str, int]) -> str:
+        """
+        Of the topics with candidates left ({topic: rank of its next
+        candidate}), take the one with the lowest (questions + emitted +
+        in-flight picks) / weight and count one more pick in flight.
+        """
+        per_article = len(QUESTION_TABLES)
+        with self._lock:
+            totals = self._topic_totals()
+            for (_, topic), count in self.emitted.items():
+                totals[topic] += count
+
+            def need(topic: str) -> tuple:
+                filled = totals[topic] + self.planned[topic] * per_article
+                return (filled / self.target[topic], heads[topic])
+
+            topic = min(heads, key=need)
+            self.planned[topic] += 1
+        return topic
+
+    def settle(self, topics: Iterable[str]) -> None:
+        """Take picks out of flight once their articles are emitted or failed."""
+        with self._lock:
+            for topic in topics:
+                if self.planned[topic] > 0:
+                    self.planned[topic] -= 1
+
+    def observe(self, rows: dict) -> None:
+        """Count an article's emitted {category: row} questions."""
+        with self._lock:
+            for category, row in rows.items():
+                topic = dict(zip(columns_for(category), row)).get("topic")
+                self.emitted[category, canonical_topic(topic)] += 1
+
+    def report(self) -> list[dict]:
+        """Per topic: questions before the run, emitted by it, and actual vs target share."""
+        with self._lock:
+            before = self._topic_totals()
+            emitted = Counter()
+            for (_, topic), count in self.emitted.items():
+                emitted[topic] += count
+        total = sum(before.values()) + sum(emitted.values())
+        weights = sum(self.target.values()) or 1.0
+        return [
+            {
+                "topic": topic,
+                "before": before[topic],
+                "emitted": emitted[topic],
+                "share": (before[topic] + emitted[topic]) / total if total else 0.0,
+                "target": self.target.get(topic, 0.0) / weights,
+            }
+            for topic in [*TOPICS, OTHER_TOPIC]
+        ]
+
+
+class BalancedOrder:
+    """
+    A run's article list, balanced lazily: the first `limit` titles are
+    picked one at a time as they are first read, each from the topic
+    furthest below target when it is read (BalanceScheduler.pick_topic),
+    then the rest follow in their original order as spares. Picks are
+    fixed once made. observe() feeds an article's emitted rows back, so
+    later picks follow what Gemini actually tagged rather than the
+    predicted topics. Safe to read from several threads.
+    """
+
+    def __init__(self, scheduler: BalanceScheduler, candidates: list[tuple[str, str]], limit: int,
+                 picked: Iterable[str] = ()):
+        self.scheduler = scheduler
+        self.candidates = [title for title, _ in candidates]
+        self.limit = min(limit, len(candidates))
+        self._topics = {title: topic if topic in scheduler.target else OTHER_TOPIC
+                        for title, topic in candidates}
+        self._queues: dict[str, deque] = {}
+        for rank, title in enumerate(self.candidates):
+            self._queues.setdefault(self._topics[title], deque()).append((rank, title))
+        self._picked: list[str] = []
+        self._taken: set[str] = set()
+        self._spares = iter(self.candidates)
+        self._settled = 0  # Picks before this index are emitted or failed
+        self._lock = threading.Lock()
+        for title in picked:
+            if title in self._topics and title not in self._taken:
+                self._picked.append(title)
+                self._taken.add(title)
+        self._settled = len(self._picked)
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("article index out of range")
+        with self._lock:
+            while len(self._picked) <= index:
+                title = self._next()
+                self._picked.append(title)
+                self._taken.add(title)
+            return self._picked[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def _next(self) -> str:
+        if len(self._picked) < self.limit:
+            heads = {}
+            for topic, queue in self._queues.items():
+                while queue and queue[0][1] in self._taken:
+                    queue.popleft()
+                if queue and self.scheduler.target.get(topic, 0.0) > 0:
+                    heads[topic] = queue[0][0]
+            if heads:
+                return self._queues[self.scheduler.pick_topic(heads)].popleft()[1]
+            self.limit = len(self._picked)  # Only zero-weight topics left
+        return next(title for title in self._spares if title not in self._taken)
+
+    def observe(self, index: int, rows: dict) -> None:
+        """
+        Count article `index`'s emitted rows. Articles are emitted in order,
+        so every earlier pick has now finished too.
+        """
+        self.scheduler.observe(rows)
+        with self._lock:
+            end = min(index + 1, self.limit, len(self._picked))
+            finished = self._picked[self._settled:end]
+            self._settled = max(self._settled, end)
+        self.scheduler.settle(self._topics[title] for title in finished)
+
+
+def print_balance_report(scheduler: BalanceScheduler) -> None:
+    for entry in scheduler.report():
+        if entry["before"] or entry["emitted"]:
+            print(f"   ⚖️ {entry['topic']}: {entry['before']} + {entry['emitted']} questions, "
+                  f"{entry['share']:.0%} of bank (target {entry['target']:.0%})")
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser topic balance scheduler")
+    sub = parser.add_subparsers(dest="command", required=True)
+    stats = sub.add_parser("stats", help="Show the bank's (category, topic) distribution")
+    stats.add_argument("--sql", nargs="*", default=[], help="Seed .sql files to count")
+    stats.add_argument("--database", action="store_true", help="Count the live tables (DATABASE_URL)")
+    stats.add_argument("--database-url", default=None, help="Postgres DSN (default: $DATABASE_URL)")
+    stats.add_argument("--target", type=parse_target, default=None, help="Topic weights, e.g. Science=2,Sports=0.5")
+    classify_cmd = sub.add_parser("classify", help="Pre-classify titles (as miner.py --balance would)")
+    classify_cmd.add_argument("titles", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "classify":
+        from wiki_client import get_client
+        descriptions = get_client().query_descriptions(args.titles[:50])
+        for title in args.titles[:50]:
+            description = descriptions.get(title) or ""
+            print(f"{classify(title, description):<14} {title}" + (f" ({description})" if description else ""))
+        return
+
+    counts = count_sql(args.sql)
+    if args.database:
+        counts += count_database(args.database_url)
+    for category in QUESTION_TABLES:
+        topics = {topic: count for (cat, topic), count in counts.items() if cat == category}
+        if topics:
+            print(f"   {category}: " + ", ".join(f"{topic} {count}" for topic, count in
+                                               sorted(topics.items(), key=lambda item: -item[1])))
+    print_balance_report(BalanceScheduler(args.target, counts))
+
+
+if __name__ == "__main__":
+    main()
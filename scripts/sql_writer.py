@@ -0,0 +1,366 @@
+"""
+Wiki Guesser - Streaming SQL Writer
+===================================
+Turns question rows into load files for the four *_questions tables in
+supabase/questions.sql. Rows are consumed from any iterable and written as
+they arrive, so output size never has to fit in memory.
+
+Formats:
+    insert  - INSERT statements, `batch_size` rows per statement
+              (batch_size=1 reproduces the classic one-row-per-INSERT file)
+    copy    - `COPY ... FROM STDIN` blocks for psql (not the Supabase SQL
+              Editor, which cannot read STDIN)
+    csv     - one CSV file per table, for `\\copy ... WITH (FORMAT csv, HEADER)`
+              or the Supabase table importer
+"""
+
+import csv
+import os
+import re
+from typing import IO, Iterable, Iterator, Optional
+
+FORMATS = ("insert", "copy", "csv")
+
+# category -> (table, [(column, type)]), in the column order rows are built
+QUESTION_TABLES = {
+    "odd_wiki_out": ("odd_wiki_out_questions", [
+        ("items", "text[]"),
+        ("impostor_index", "int"),
+        ("connection", "text"),
+        ("topic", "text"),
+        ("wikipedia_url", "text"),
+    ]),
+    "when_in_wiki": ("when_in_wiki_questions", [
+        ("event", "text"),
+        ("correct_year", "int"),
+        ("year_options", "int[]"),
+        ("topic", "text"),
+        ("wikipedia_url", "text"),
+    ]),
+    "wiki_or_fiction": ("wiki_or_fiction_questions", [
+        ("statement", "text"),
+        ("is_true", "bool"),
+        ("explanation", "text"),
+        ("topic", "text"),
+        ("wikipedia_url", "text"),
+    ]),
+    "wiki_links": ("wiki_links_questions", [
+        ("titles", "text[]"),
+        ("connection", "text"),
+        ("connection_options", "text[]"),
+        ("topic", "text"),
+        ("wikipedia_url", "text"),
+    ]),
+}
+
+
+def table_for(category: str) -> str:
+    return QUESTION_TABLES[category][0]
+
+
+def columns_for(category: str) -> list[str]:
+    return [name for name, _ in QUESTION_TABLES[category][1]]
+
+
+# =============================================================================
+# SQL LITERALS (insert format)
+# =============================================================================
+
+def escape_sql_string(s: str) -> str:
+    """Escape single quotes for SQL strings."""
+    if s is None:
+        return ""
+    return str(s).replace("'", "''")
+
+
+def format_array_for_sql(items: list) -> str:
+    """Format a Python list as a PostgreSQL array literal."""
+    if not items:
+        return "ARRAY[]::TEXT[]"
+    escaped = [escape_sql_string(str(item)) for item in items]
+    return "ARRAY[" + ", ".join(f"'{item}'" for item in escaped) + "]"
+
+
+def format_int_array_for_sql(items: list) -> str:
+    """Format a Python list of integers as a PostgreSQL array literal."""
+    return "ARRAY[" + ", ".join(str(int(item)) for item in items) + "]"
+
+
+def sql_literal(value, column_type: str) -> str:
+    if column_type == "text":
+        return f"'{escape_sql_string(value)}'"
+    if column_type == "int":
+        return str(int(value))
+    if column_type == "bool":
+        return "true" if value else "false"
+    if column_type == "text[]":
+        return format_array_for_sql(value)
+    if column_type == "int[]":
+        return format_int_array_for_sql(value)
+    raise ValueError(f"Unknown column type: {column_type}")
+
+
+def format_values(category: str, row: tuple) -> str:
+    """Render one row as a parenthesized VALUES tuple."""
+    types = [column_type for _, column_type in QUESTION_TABLES[category][1]]
+    return "(" + ", ".join(sql_literal(value, t) for value, t in zip(row, types)) + ")"
+
+
+def insert_statement(category: str, rows: list[tuple]) -> str:
+    """One INSERT statement for one or more rows."""
+    header = f"INSERT INTO {table_for(category)} ({', '.join(columns_for(category))})"
+    if len(rows) == 1:
+        return f"{header}\nVALUES {format_values(category, rows[0])};"
+    values = ",\n".join("  " + format_values(category, row) for row in rows)
+    return f"{header}\nVALUES\n{values};"
+
+
+def iter_insert_statements(category: str, rows: Iterable[tuple], batch_size: int = 1) -> Iterator[str]:
+    """Yield INSERT statements of up to `batch_size` rows each."""
+    batch: list[tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield insert_statement(category, batch)
+            batch = []
+    if batch:
+        yield insert_statement(category, batch)
+
+
+# =============================================================================
+# COPY / CSV ENCODING
+# =============================================================================
+
+def pg_array_literal(items: list, column_type: str) -> str:
+    """PostgreSQL array input syntax, e.g. {"a","b"} or {1,2}."""
+    if column_type == "int[]":
+        return "{" + ",".join(str(int(item)) for item in items) + "}"
+    quoted = (
+        '"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"'
+        for item in items
+    )
+    return "{" + ",".join(quoted) + "}"
+
+
+def text_value(value, column_type: str) -> Optional[str]:
+    """Value in PostgreSQL text input form (None stays None)."""
+    if value is None:
+        return None
+    if column_type == "bool":
+        return "t" if value else "f"
+    if column_type == "int":
+        return str(int(value))
+    if column_type.endswith("[]"):
+        return pg_array_literal(value or [], column_type)
+    return str(value)
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_line(category: str, row: tuple) -> str:
+    """One line of COPY text format."""
+    fields = []
+    for value, (_, column_type) in zip(row, QUESTION_TABLES[category][1]):
+        text = text_value(value, column_type)
+        fields.append("\\N" if text is None else text.translate(_COPY_ESCAPES))
+    return "\t".join(fields)
+
+
+def iter_copy_block(category: str, rows: Iterable[tuple]) -> Iterator[str]:
+    """Yield the lines of a `COPY ... FROM STDIN` block (without newlines)."""
+    yield f"COPY {table_for(category)} ({', '.join(columns_for(category))}) FROM STDIN;"
+    for row in rows:
+        yield copy_line(category, row)
+    yield "\\."
+
+
+# =============================================================================
+# WRITERS
+# =============================================================================
+
+def write_table(f: IO[str], category: str, rows: Iterable[tuple], fmt: str = "insert",
+                batch_size: int = 1) -> int:
+    """
+    Stream rows for one category into an open SQL file in the given format
+    ("insert" or "copy"). Returns the number of rows written.
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    if fmt == "insert":
+        for statement in iter_insert_statements(category, counted(), batch_size):
+            f.write(statement + "\n\n")
+    elif fmt == "copy":
+        for line in iter_copy_block(category, counted()):
+            f.write(line + "\n")
+        f.write("\n")
+    else:
+        raise ValueError(f"Unsupported SQL format: {fmt}")
+    return count
+
+
+def csv_path(directory: str, category: str) -> str:
+    return os.path.join(directory, f"{table_for(category)}.csv")
+
+
+def write_csv_rows(f: IO[str], category: str, rows: Iterable[tuple], header: bool = False) -> int:
+    """Append rows for one category to an open CSV file. Returns the number written."""
+    types = [column_type for _, column_type in QUESTION_TABLES[category][1]]
+    writer = csv.writer(f)
+    if header:
+        writer.writerow(columns_for(category))
+    count = 0
+    for row in rows:
+        writer.writerow([text_value(value, t) for value, t in zip(row, types)])
+        count += 1
+    return count
+
+
+def write_csv(directory: str, category: str, rows: Iterable[tuple]) -> int:
+    """
+    Stream rows for one category into <directory>/<table>.csv (with a header).
+    Returns the number of rows written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(csv_path(directory, category), "w", encoding="utf-8", newline="") as f:
+        return write_csv_rows(f, category, rows, header=True)
+
+
+def section_header(category: str, count: int) -> str:
+    """Comment banner that precedes each category in generated SQL files."""
+    return (
+        f"\n-- =============================================================================\n"
+        f"-- {category.upper().replace('_', ' ')} ({count} questions)\n"
+        f"-- =============================================================================\n\n"
+    )
+
+
+# =============================================================================
+# READING EXISTING SEED FILES
+# =============================================================================
+
+TABLE_CATEGORIES = {table: category for category, (table, _) in QUESTION_TABLES.items()}
+
+_INSERT_RE = re.compile(r"INSERT\s+INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES", re.IGNORECASE)
+
+
+class _ValuesParser:
+    """Recursive-descent parser for the VALUES lists our seed files use."""
+
+    def __init__(self, text: str, pos: int):
+        self.text = text
+        self.pos = pos
+
+    def skip(self) -> None:
+        text = self.text
+        while self.pos < len(text):
+            if text[self.pos].isspace():
+                self.pos += 1
+            elif text.startswith("--", self.pos):
+                end = text.find("\n", self.pos)
+                self.pos = len(text) if end == -1 else end + 1
+            else:
+                return
+
+    def peek(self) -> str:
+        self.skip()
+        return self.text[self.pos] if self.pos < len(self.text) else ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        char = self.peek()
+        if char == "'":
+            return self.string()
+        if self.text[self.pos:self.pos + 6].upper() == "ARRAY[":
+            self.pos += 6
+            items = []
+            while self.peek() != "]":
+                items.append(self.value())
+                if self.peek() == ",":
+                    self.pos += 1
+            self.pos += 1
+            self.cast()
+            return items
+        match = re.compile(r"[^,)\]\s]+").match(self.text, self.pos)
+        if not match:
+            raise ValueError(f"Unexpected input at offset {self.pos}")
+        self.pos = match.end()
+        token = match.group(0)
+        lowered = token.lower()
+        if lowered in ("true", "false"):
+            return lowered == "true"
+        if lowered == "null":
+            return None
+        try:
+            return int(token)
+        except ValueError:
+            return float(token)
+
+    def string(self) -> str:
+        self.pos += 1
+        parts = []
+        while True:
+            end = self.text.index("'", self.pos)
+            parts.append(self.text[self.pos:end])
+            if self.text.startswith("''", end):
+                parts.append("'")
+                self.pos = end + 2
+            else:
+                self.pos = end + 1
+                self.cast()
+                return "".join(parts)
+
+    def cast(self) -> None:
+        match = re.compile(r"\s*::\s*\w+(?: \w+)*(?:\[\])*").match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+
+    def row(self) -> list:
+        self.expect("(")
+        values = []
+        while self.peek() != ")":
+            values.append(self.value())
+            if self.peek() == ",":
+                self.pos += 1
+        self.pos += 1
+        return values
+
+
+def iter_sql_rows(path: str) -> Iterator[tuple[str, dict]]:
+    """
+    Read INSERT statements from a seed .sql file (single- or multi-row),
+    yielding (category, {column: value}) for the four question tables.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    pos = 0
+    while True:
+        match = _INSERT_RE.search(text, pos)
+        if not match:
+            return
+        table = match.group(1).lower()
+        columns = [column.strip() for column in match.group(2).split(",")]
+        parser = _ValuesParser(text, match.end())
+        while True:
+            values = parser.row()
+            if table in TABLE_CATEGORIES:
+                yield TABLE_CATEGORIES[table], dict(zip(columns, values))
+            if parser.peek() != ",":
+                break
+            parser.pos += 1
+        pos = parser.pos
+
+
+def row_from_values(category: str, values: dict) -> tuple:
+    """Order a {column: value} mapping as a row (missing columns become None)."""
+    return tuple(values.get(column) for column in columns_for(category))
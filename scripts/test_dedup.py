@@ -0,0 +1,80 @@
+"""Unit tests for dedup.py (run with: python -m pytest scripts)."""
+
+import pytest
+
+from dedup import DedupIndex, minhash, normalize_text, question_text, similarity
+
+STATEMENT = ("The Eiffel Tower was originally intended to be dismantled after "
+             "twenty years, but it was kept as a radio antenna.")
+
+
+def fiction_row(statement):
+    return (statement, True, "It was saved by radio.", "Landmarks", "https://en.wikipedia.org/wiki/Eiffel_Tower")
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = DedupIndex(str(tmp_path / "index.sqlite3"))
+    yield index
+    index.close()
+
+
+def test_normalize_text():
+    assert normalize_text("  Café, CRÈME-brûlée!\n") == "cafe creme brulee"
+
+
+def test_question_text_ignores_item_order():
+    a = ("Rome", "Paris", "Oslo", "Lima"), 3, "Capitals", "Geo", "url"
+    b = ("Lima", "Oslo", "Paris", "Rome"), 0, "Capitals", "Geo", "url"
+    assert question_text("odd_wiki_out", a) == question_text("odd_wiki_out", b)
+
+
+def test_similarity_tracks_overlap():
+    base = minhash(normalize_text(STATEMENT))
+    assert similarity(base, base) == 1.0
+    close = minhash(normalize_text(STATEMENT.replace("twenty", "20")))
+    far = minhash(normalize_text("Honey never spoils and edible honey was found in Egyptian tombs."))
+    assert similarity(base, close) > similarity(base, far)
+
+
+def test_add_if_new_rejects_near_duplicates(index):
+    assert index.add_if_new("wiki_or_fiction", fiction_row(STATEMENT), source="a") is None
+    match = index.add_if_new("wiki_or_fiction", fiction_row(STATEMENT.upper() + "!!"), source="b")
+    assert match and match["similarity"] == 1.0
+    near = index.add_if_new("wiki_or_fiction", fiction_row(STATEMENT.replace("kept", "retained")), source="b")
+    assert near and near["similarity"] >= index.threshold
+    assert index.add_if_new("wiki_or_fiction", fiction_row("Octopuses have three hearts."), source="b") is None
+    assert (index.accepted, index.rejected) == (2, 2)
+    assert index.counts() == {"wiki_or_fiction": 2}
+
+
+def test_same_source_is_not_rejected(index):
+    index.add_if_new("wiki_or_fiction", fiction_row(STATEMENT), source="Eiffel Tower")
+    assert index.add_if_new("wiki_or_fiction", fiction_row(STATEMENT), source="Eiffel Tower") is None
+    assert index.check("wiki_or_fiction", fiction_row(STATEMENT))["source"] == "Eiffel Tower"
+
+
+def test_categories_are_indexed_separately(index):
+    index.add_if_new("when_in_wiki", ("The Eiffel Tower opens", 1889, [1889, 1900, 1850, 1920], "t", "u"))
+    assert index.check("wiki_or_fiction", fiction_row("The Eiffel Tower opens")) is None
+
+
+def test_filter_rows_drops_duplicates(index):
+    index.add_if_new("wiki_or_fiction", fiction_row(STATEMENT), source="seed")
+    rows = {
+        "wiki_or_fiction": fiction_row(STATEMENT),
+        "when_in_wiki": ("The Eiffel Tower opens", 1889, [1889, 1900, 1850, 1920], "t", "u"),
+    }
+    assert list(index.filter_rows(rows, source="run")) == ["when_in_wiki"]
+
+
+def test_seed_from_sql(index, tmp_path):
+    seed = tmp_path / "seed.sql"
+    seed.write_text(
+        "INSERT INTO wiki_or_fiction_questions (statement, is_true, explanation, topic, wikipedia_url)\n"
+        f"VALUES\n  ('{STATEMENT}', true, 'x', 't', 'u'),\n"
+        f"  ('{STATEMENT}', true, 'x', 't', 'u');\n",
+        encoding="utf-8",
+    )
+    assert index.seed_from_sql(str(seed)) == (2, 0)  # Same source, so the repeat counts as present
+    assert index.counts() == {"wiki_or_fiction": 1}
@@ -0,0 +1,86 @@
+"""Unit tests for journal.py (run with: python -m pytest scripts)."""
+
+from journal import RunJournal
+
+CATEGORIES = ["odd_wiki_out", "when_in_wiki"]
+
+
+def rows_for(title):
+    return {"odd_wiki_out": (title, "odd"), "when_in_wiki": (title, 1969)}
+
+
+def open_journal(tmp_path, **kwargs):
+    return RunJournal("run", CATEGORIES, runs_dir=str(tmp_path), **kwargs)
+
+
+def test_emits_in_article_order(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.complete(1, "B", rows_for("B"))
+    journal.complete(2, "C", None)
+    assert journal.next_index == 0
+    assert list(journal.iter_rows("odd_wiki_out")) == []
+    journal.complete(0, "A", rows_for("A"))
+    assert journal.next_index == 3
+    assert journal.done_titles == ["A", "B", "C"]
+    assert journal.success == 2
+    assert journal.counts == {"odd_wiki_out": 2, "when_in_wiki": 2}
+    assert list(journal.iter_rows("when_in_wiki")) == [("A", 1969), ("B", 1969)]
+    journal.close()
+
+
+def test_resume_continues_after_last_checkpoint(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.save_articles(["A", "B", "C"])
+    journal.complete(0, "A", rows_for("A"))
+    journal.complete(1, "B", None)
+    journal.mark(2, "C", "fetched")
+    journal.close()
+
+    resumed = open_journal(tmp_path)
+    assert resumed.load_articles() == ["A", "B", "C"]
+    assert resumed.next_index == 2
+    assert resumed.is_done(1) and not resumed.is_done(2)
+    assert resumed.done_titles == ["A", "B"]
+    assert resumed.success == 1
+    assert resumed.counts == {"odd_wiki_out": 1, "when_in_wiki": 1}
+    resumed.complete(2, "C", rows_for("C"))
+    assert list(resumed.iter_rows("odd_wiki_out")) == [("A", "odd"), ("C", "odd")]
+    resumed.close()
+
+
+def test_resume_truncates_rows_written_after_checkpoint(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.complete(0, "A", rows_for("A"))
+    journal.close()
+    with open(journal.part_path("odd_wiki_out"), "a", encoding="utf-8") as f:
+        f.write('["torn", "row"]\n')
+    with open(journal.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"index": 1, "sta')
+
+    resumed = open_journal(tmp_path)
+    assert resumed.next_index == 1
+    assert list(resumed.iter_rows("odd_wiki_out")) == [("A", "odd")]
+    resumed.complete(1, "B", rows_for("B"))
+    resumed.close()
+
+    # The torn line was dropped, so the record written after it survives
+    again = open_journal(tmp_path)
+    assert again.next_index == 2
+    assert again.done_titles == ["A", "B"]
+    again.close()
+
+
+def test_row_filter_sees_rows_in_emission_order(tmp_path):
+    seen = []
+
+    def row_filter(index, rows):
+        seen.append(index)
+        return {} if index == 1 else rows
+
+    journal = open_journal(tmp_path, row_filter=row_filter)
+    journal.complete(1, "B", rows_for("B"))
+    journal.complete(0, "A", rows_for("A"))
+    assert seen == [0, 1]
+    assert journal.success == 1
+    assert list(journal.iter_rows("odd_wiki_out")) == [("A", "odd")]
+    journal.close()
@@ -0,0 +1,63 @@
+"""Unit tests for json_stream.py (run with: python -m pytest scripts)."""
+
+import json
+
+import pytest
+
+from json_stream import SectionParser, StreamViolation
+
+SECTIONS = ["odd_wiki_out", "when_in_wiki"]
+ANSWER = json.dumps({
+    "odd_wiki_out": {"options": ["a", "b {c}"], "answer": "a"},
+    "when_in_wiki": {"year": 1969, "hint": "say \"moon\""},
+})
+
+
+def feed_all(parser, chunks):
+    completed = []
+    for chunk in chunks:
+        completed += parser.feed(chunk)
+    return completed
+
+
+def test_sections_arrive_in_order():
+    parser = SectionParser(SECTIONS)
+    completed = feed_all(parser, [ANSWER])
+    assert [key for key, _ in completed] == SECTIONS
+    assert completed[1][1]["hint"] == 'say "moon"'
+    assert parser.done
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 50])
+def test_chunking_does_not_change_result(size):
+    parser = SectionParser(SECTIONS)
+    chunks = [ANSWER[i:i + size] for i in range(0, len(ANSWER), size)]
+    assert dict(feed_all(parser, chunks)) == json.loads(ANSWER)
+    assert parser.done
+
+
+def test_section_is_handed_over_before_the_root_closes():
+    parser = SectionParser(SECTIONS)
+    first_end = ANSWER.index(', "when_in_wiki"')
+    assert [key for key, _ in parser.feed(ANSWER[:first_end])] == ["odd_wiki_out"]
+    assert not parser.done
+
+
+def test_fence_and_trailing_text_are_ignored():
+    parser = SectionParser(SECTIONS)
+    completed = feed_all(parser, ["``", "`json\n", ANSWER, "\n```\nHope this helps!"])
+    assert len(completed) == 2
+    assert parser.feed("{ more") == []
+
+
+@pytest.mark.parametrize("text, message", [
+    ("Sure! {", "expected a JSON object"),
+    ('{"bogus": {}}', "unexpected section"),
+    ('{"odd_wiki_out": [1]}', "is not an object"),
+    ('{"odd_wiki_out": {}, "odd_wiki_out": {}}', "repeated"),
+    ('{"odd_wiki_out": {"a": tru}}', "not valid JSON"),
+    ('{"odd_wiki_out": {} "when_in_wiki"', "expected ','"),
+])
+def test_violations(text, message):
+    with pytest.raises(StreamViolation, match=message):
+        SectionParser(SECTIONS).feed(text)
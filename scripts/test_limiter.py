@@ -0,0 +1,97 @@
+"""Unit tests for limiter.py (run with: python -m pytest scripts)."""
+
+import pytest
+
+import limiter
+from limiter import RateLimited, RetryableError, TokenBucket, backoff_delay, parse_retry_after, retry_call
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    slept = []
+    monkeypatch.setattr(limiter.time, "sleep", slept.append)
+    return slept
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("429 Quota exceeded. retry_delay { seconds: 37 }") == 37.0
+    assert parse_retry_after("Please retry after 4.5s") == 4.5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(20):
+        assert 0 <= backoff_delay(attempt, base_delay=1.0, max_delay=8.0) <= 8.0
+
+
+def test_bucket_serves_capacity_then_waits():
+    bucket = TokenBucket(rate=1000, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() > 0
+
+
+def test_bucket_penalize_and_reward():
+    bucket = TokenBucket(rate=8.0, recovery=0.25)
+    bucket.penalize()
+    bucket.penalize()
+    assert bucket.rate == 2.0
+    for _ in range(10):
+        bucket.penalize()
+    assert bucket.rate == bucket.min_rate == 1.0
+    bucket.reward()
+    assert bucket.rate == 3.0
+    for _ in range(10):
+        bucket.reward()
+    assert bucket.rate == 8.0
+
+
+def test_retry_call_retries_then_succeeds(no_sleep):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RetryableError("try again")
+        return "ok"
+
+    retried = []
+    assert retry_call(flaky, retries=4, on_retry=lambda n, e, d: retried.append(n)) == "ok"
+    assert retried == [1, 2]
+    assert len(no_sleep) == 2
+
+
+def test_retry_call_reraises_after_retries(no_sleep):
+    def failing():
+        raise RetryableError("still down")
+
+    with pytest.raises(RetryableError):
+        retry_call(failing, retries=2)
+    assert len(no_sleep) == 2
+
+
+def test_retry_call_does_not_retry_other_errors(no_sleep):
+    def broken():
+        raise KeyError("bug")
+
+    with pytest.raises(KeyError):
+        retry_call(broken, retries=5)
+    assert no_sleep == []
+
+
+def test_rate_limited_slows_limiter_and_honors_retry_after(no_sleep):
+    bucket = TokenBucket(rate=1000, capacity=1000)
+    calls = []
+
+    def limited():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RateLimited("429", retry_after=0.01)
+        return "ok"
+
+    assert retry_call(limited, limiter=bucket, base_delay=0.0) == "ok"
+    assert no_sleep[0] >= 0.01
+    assert bucket.rate < bucket.max_rate
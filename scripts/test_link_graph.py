@@ -0,0 +1,120 @@
+"""Unit tests for link_graph.py (run with: python -m pytest scripts)."""
+
+import random
+from array import array
+
+import pytest
+
+from link_graph import LinkGraph, build_csr, build_graph, iter_dump_rows, iter_sets, transpose_csr
+
+BEATLES = ["John Lennon", "Paul McCartney", "George Harrison", "Ringo Starr", "Pete Best", "Stuart Sutcliffe"]
+SONGS = [f"Song {n}" for n in range(1, 7)]
+
+PAGE_DUMP = """\
+CREATE TABLE `page` (
+  `page_id` int(8) unsigned NOT NULL AUTO_INCREMENT,
+  `page_namespace` int(11) NOT NULL DEFAULT 0,
+  `page_title` varbinary(255) NOT NULL DEFAULT '',
+  `page_is_redirect` tinyint(1) unsigned NOT NULL DEFAULT 0,
+  PRIMARY KEY (`page_id`)
+) ENGINE=InnoDB;
+INSERT INTO `page` VALUES {rows};
+"""
+CATEGORYLINKS_DUMP = """\
+CREATE TABLE `categorylinks` (
+  `cl_from` int(8) unsigned NOT NULL DEFAULT 0,
+  `cl_to` varbinary(255) NOT NULL DEFAULT '',
+  `cl_type` enum('page','subcat','file') NOT NULL DEFAULT 'page',
+  PRIMARY KEY (`cl_from`,`cl_to`)
+) ENGINE=InnoDB;
+INSERT INTO `categorylinks` VALUES {rows};
+"""
+PAGELINKS_DUMP = """\
+CREATE TABLE `pagelinks` (
+  `pl_from` int(8) unsigned NOT NULL DEFAULT 0,
+  `pl_namespace` int(11) NOT NULL DEFAULT 0,
+  `pl_title` varbinary(255) NOT NULL DEFAULT '',
+  `pl_from_namespace` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+INSERT INTO `pagelinks` VALUES {rows};
+"""
+
+
+def sql_rows(rows):
+    def literal(value):
+        if isinstance(value, int):
+            return str(value)
+        return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    return ",".join("(" + ",".join(map(literal, row)) + ")" for row in rows)
+
+
+def test_build_csr_sorts_and_dedupes_rows():
+    rows = array("I", [2, 0, 2, 0, 2, 0])
+    cols = array("I", [5, 3, 1, 1, 5, 3])
+    starts, ids = build_csr(rows, cols, 4)
+    assert list(starts) == [0, 2, 2, 4, 4]
+    assert list(ids) == [1, 3, 1, 5]
+
+
+def test_transpose_csr_matches_build_from_swapped_pairs():
+    rng = random.Random(3)
+    pairs = [(rng.randrange(30), rng.randrange(20)) for _ in range(400)]
+    rows, cols = array("I", (r for r, _ in pairs)), array("I", (c for _, c in pairs))
+    forward = build_csr(rows, cols, 30)
+    assert transpose_csr(*forward, 20) == build_csr(cols, rows, 20)
+
+
+def test_iter_dump_rows_uses_create_table_order(tmp_path):
+    path = tmp_path / "page.sql"
+    path.write_text(PAGE_DUMP.format(rows="(1,0,'Rock_\\'n\\'_roll',0),(2,14,'A,(b)',1),(3,0,'X',NULL)"),
+                    encoding="utf-8")
+    rows = list(iter_dump_rows(str(path), ["page_title", "page_id", "missing"]))
+    assert rows == [("Rock_'n'_roll", 1, None), ("A,(b)", 2, None), ("X", 3, None)]
+
+
+@pytest.fixture
+def graph(tmp_path):
+    titles = BEATLES + ["Liverpool", "Redirect"] + SONGS
+    pages = [(i + 1, 0, title.replace(" ", "_"), int(title == "Redirect")) for i, title in enumerate(titles)]
+    pages.append((99, 1, "Liverpool", 0))  # Talk page
+    memberships = [(i + 1, "The_Beatles_members", "page") for i in range(len(BEATLES))]
+    memberships += [(1, "Singers", "page"), (2, "Singers", "page"), (7, "Cities", "page"),
+                    (1, "Articles_with_short_description", "page"), (5, "Sub", "subcat")]
+    links = [(i + 1, 0, "Liverpool", 0) for i in range(len(BEATLES))]
+    links += [(7, 0, title.replace(" ", "_"), 0) for title in BEATLES]
+    links += [(i + 1, 0, song.replace(" ", "_"), 0) for i in range(len(BEATLES))
+              for song in (SONGS[i], SONGS[(i + 1) % len(SONGS)])]
+    links += [(1, 0, "Paul_McCartney", 0), (1, 0, "Nowhere", 0), (7, 0, "Liverpool", 0)]
+
+    files = {}
+    for name, template, rows in (("page", PAGE_DUMP, pages), ("categorylinks", CATEGORYLINKS_DUMP, memberships),
+                                 ("pagelinks", PAGELINKS_DUMP, links)):
+        files[name] = tmp_path / f"{name}.sql"
+        files[name].write_text(template.format(rows=sql_rows(rows)), encoding="utf-8")
+    path = str(tmp_path / "test.lg")
+    stats = build_graph(path, [str(files["page"])], [str(files["categorylinks"])], [str(files["pagelinks"])])
+    assert (stats["articles"], stats["categories"]) == (13, 3)
+    graph = LinkGraph(path)
+    yield graph
+    graph.close()
+
+
+def test_graph_reads_back(graph):
+    lennon, liverpool = graph.find("John_Lennon"), graph.find("Liverpool")
+    assert graph.find("Redirect") is None
+    assert sorted(graph.category(c) for c in graph.categories_of(lennon)) == ["Singers", "The Beatles members"]
+    assert graph.stats()["eligible categories"] == 1
+    beatles = graph.eligible_categories()[0]
+    assert sorted(graph.title(a) for a in graph.members(beatles)) == sorted(BEATLES)
+    # Self-links and links to missing pages are dropped
+    linked = sorted(graph.title(a) for a in graph.links_from(lennon))
+    assert linked == ["Liverpool", "Paul McCartney", "Song 1", "Song 2"]
+    assert list(graph.links_to(liverpool)) == sorted(graph.find(title) for title in BEATLES)
+
+
+def test_iter_sets_is_seeded(graph):
+    sets = list(iter_sets(graph, 3, mode="neighbor", seed=1))
+    assert sets and all(found["connection"] == "Liverpool" for found in sets)
+    assert all(set(found["titles"]) <= set(BEATLES) for found in sets)
+    assert all(len(set(found["connection_options"])) == 4 for found in sets)
+    assert sets == list(iter_sets(graph, 3, mode="neighbor", seed=1))
@@ -0,0 +1,83 @@
+"""Unit tests for sql_writer.py (run with: python -m pytest scripts)."""
+
+import io
+
+import pytest
+
+from sql_writer import (copy_line, iter_insert_statements, iter_sql_rows, row_from_values,
+                        write_csv, write_table)
+
+ROWS = [
+    (["O'Hare", 'Say "hi"', "Tab\there", "Back\\slash"], 2, "It's odd", "Travel", "https://x/O'Hare"),
+    (["A", "B", "C", "D"], 0, None, "Misc", "https://x/A"),
+]
+
+
+def test_insert_batches():
+    statements = list(iter_insert_statements("odd_wiki_out", ROWS * 3, batch_size=4))
+    assert len(statements) == 2
+    assert statements[0].count("\n  (") == 4
+    assert statements[1].count("\n  (") == 2
+    single = list(iter_insert_statements("odd_wiki_out", ROWS[:1]))
+    assert single[0].startswith("INSERT INTO odd_wiki_out_questions (items, impostor_index, connection,")
+    assert "'O''Hare'" in single[0]
+
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_insert_output_reads_back(tmp_path, batch_size):
+    path = tmp_path / "out.sql"
+    with open(path, "w", encoding="utf-8") as f:
+        assert write_table(f, "odd_wiki_out", iter(ROWS), batch_size=batch_size) == 2
+    parsed = [(category, row_from_values(category, values)) for category, values in iter_sql_rows(str(path))]
+    expected = [("odd_wiki_out", ROWS[0]), ("odd_wiki_out", ROWS[1][:2] + ("",) + ROWS[1][3:])]
+    assert parsed == expected
+
+
+def test_copy_escapes_and_nulls():
+    line = copy_line("odd_wiki_out", ROWS[0])
+    assert line.split("\t")[0] == '{"O\'Hare","Say \\\\"hi\\\\"","Tab\\there","Back\\\\\\\\slash"}'
+    assert copy_line("odd_wiki_out", ROWS[1]).split("\t")[2] == "\\N"
+    assert copy_line("wiki_or_fiction", ("s", False, "e", "t", "u")).split("\t")[1] == "f"
+
+
+def test_copy_block_framing():
+    f = io.StringIO()
+    assert write_table(f, "when_in_wiki", [("Moon landing", 1969, [1969, 1970, 1968, 1972], "Space", "u")], fmt="copy") == 1
+    lines = f.getvalue().splitlines()
+    assert lines[0] == "COPY when_in_wiki_questions (event, correct_year, year_options, topic, wikipedia_url) FROM STDIN;"
+    assert lines[1] == "Moon landing\t1969\t{1969,1970,1968,1972}\tSpace\tu"
+    assert lines[2] == "\\."
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        write_table(io.StringIO(), "when_in_wiki", [], fmt="xml")
+
+
+def test_csv_has_header(tmp_path):
+    assert write_csv(str(tmp_path), "wiki_or_fiction", [("s, with comma", True, "e", "t", "u")]) == 1
+    text = (tmp_path / "wiki_or_fiction_questions.csv").read_text(encoding="utf-8")
+    assert text.splitlines() == ["statement,is_true,explanation,topic,wikipedia_url", '"s, with comma",t,e,t,u']
+
+
+def test_reads_hand_written_seed_files(tmp_path):
+    path = tmp_path / "seed.sql"
+    path.write_text(
+        "-- seed\nINSERT INTO wiki_links_questions (titles, connection, connection_options, topic, wikipedia_url)\n"
+        "VALUES (ARRAY['A', 'B']::TEXT[], 'It''s linked', ARRAY[]::TEXT[], NULL, 'u'); -- done\n"
+        "INSERT INTO other_table (x) VALUES (1);\n",
+        encoding="utf-8",
+    )
+    assert list(iter_sql_rows(str(path))) == [("wiki_links", {
+        "titles": ["A", "B"], "connection": "It's linked", "connection_options": [],
+        "topic": None, "wikipedia_url": "u",
+    })]
+
+
+def test_empty_arrays_read_back(tmp_path):
+    path = tmp_path / "out.sql"
+    row = (["A", "B", "C", "D"], "Linked", [], "Misc", "u")
+    with open(path, "w", encoding="utf-8") as f:
+        write_table(f, "wiki_links", [row])
+    assert "ARRAY[]::TEXT[]" in path.read_text(encoding="utf-8")
+    assert [row_from_values(c, v) for c, v in iter_sql_rows(str(path))] == [row]
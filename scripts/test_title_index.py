@@ -0,0 +1,103 @@
+"""Unit tests for title_index.py (run with: python -m pytest scripts)."""
+
+import bz2
+import gzip
+
+import pytest
+
+from title_index import (TitleIndex, build_index, dump_day, iter_all_titles, iter_pageviews, parse_band,
+                         parse_days)
+
+DAY_ONE = """\
+en Python_(programming_language) 50 0
+en.m Python_(programming_language) 20 0
+en Monty_Python 30 0
+en Talk:Monty_Python 9 0
+en Special:Search 999 0
+de Python 500 0
+en Fake_page 40 0
+en Cheese 1 0
+"""
+DAY_TWO = """\
+en.wikipedia Cheese 1 desktop 200 A200
+en.wikipedia Monty_Python 2 mobile-web 5 A5
+en.wikipedia Python_(programming_language) 3 desktop 10 A10
+"""
+TITLES = "page_namespace\tpage_title\n0\tCheese\n0\tMonty_Python\n0\tPython_(programming_language)\n1\tMonty_Python\n"
+
+
+@pytest.fixture
+def dumps(tmp_path):
+    day_one = tmp_path / "pageviews-20241201-000000"
+    day_one.write_text(DAY_ONE, encoding="utf-8")
+    day_two = tmp_path / "pageviews-20241202-user.bz2"
+    day_two.write_bytes(bz2.compress(DAY_TWO.encode("utf-8")))
+    titles = tmp_path / "enwiki-latest-all-titles.gz"
+    titles.write_bytes(gzip.compress(TITLES.encode("utf-8")))
+    return [str(day_one), str(day_two)], [str(titles)]
+
+
+@pytest.fixture
+def index(tmp_path, dumps):
+    path = str(tmp_path / "enwiki.idx")
+    pageviews, titles = dumps
+    stats = build_index(path, pageviews, titles)
+    assert stats["days"] == 2
+    index = TitleIndex(path)
+    yield index
+    index.close()
+
+
+def test_dump_parsing(dumps):
+    pageviews, titles = dumps
+    assert ("Python (programming language)", 20) in list(iter_pageviews(pageviews[0]))
+    assert ("Python", 500) not in list(iter_pageviews(pageviews[0]))
+    assert list(iter_pageviews(pageviews[1]))[0] == ("Cheese", 200)
+    assert list(iter_all_titles(titles[0])) == [
+        "Cheese", "Monty Python", "Python (programming language)", "Talk:Monty Python"]
+    assert dump_day(pageviews[1]) == "20241202"
+
+
+def test_find_and_resolve(index):
+    assert "Monty_Python" in index
+    assert index.views(index.find("Python (programming language)")) == 80
+    assert index.namespace(index.find("Talk:Monty Python")) == 1
+    # Viewed but missing from the all-titles listing
+    assert "Fake page" not in index
+    assert "Special:Search" not in index
+    assert index.resolve(["cheese", "Nope"]) == {"cheese": "Cheese", "Nope": None}
+
+
+def test_with_prefix(index):
+    assert index.with_prefix("Python") == ["Python (programming language)"]
+    assert index.with_prefix("")[:2] == ["Cheese", "Fake page"]
+    assert index.with_prefix("M", limit=1) == ["Monty Python"]
+
+
+def test_select_orders_by_total_views(index):
+    # Only listed namespace 0 articles are ranked
+    assert index.select(10) == ["Cheese", "Python (programming language)", "Monty Python"]
+    assert index.select(10, band=(0, 34)) == ["Cheese"]
+    assert index.select(10, topic="python") == ["Python (programming language)", "Monty Python"]
+    assert index.select(10, exclude=lambda title: title == "Cheese")[0] == "Python (programming language)"
+
+
+def test_select_by_day_range(index):
+    assert index.select(10, start="20241201", end="20241201") == [
+        "Python (programming language)", "Monty Python", "Cheese"]
+    assert index.select(10, start="20241202") == ["Cheese", "Python (programming language)", "Monty Python"]
+    assert index.select(10, start="20250101") == []
+
+
+def test_sample_is_seeded(index):
+    first = index.select(2, sample=True, seed=7)
+    assert len(first) == 2
+    assert index.select(2, sample=True, seed=7) == first
+
+
+def test_arguments():
+    assert parse_band("1:5") == (1.0, 5.0)
+    assert parse_band(":") == (0.0, 100.0)
+    with pytest.raises(Exception):
+        parse_band("50:10")
+    assert parse_days("20241201:") == ("20241201", None)
@@ -0,0 +1,91 @@
+"""Unit tests for work_queue.py (run with: python -m pytest scripts)."""
+
+import pytest
+
+import work_queue
+from work_queue import WorkQueue, merge_results
+
+ROW = ("Moon landing", 1969, [1969, 1970, 1968, 1972], "Space", "u")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(work_queue.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = WorkQueue(str(tmp_path / "work.sqlite3"), lease=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def titles(items):
+    return [item["title"] for item in items]
+
+
+def test_enqueue_keeps_order_and_skips_duplicates(queue):
+    assert queue.enqueue(["A", "B", "A"]) == 2
+    assert queue.enqueue(["B", "C"]) == 1
+    assert queue.enqueue(["A"], language="de") == 1
+    assert titles(queue.claim("w1", count=10)) == ["A", "B", "C", "A"]
+
+
+def test_workers_never_share_articles(queue):
+    queue.enqueue(["A", "B", "C"])
+    assert titles(queue.claim("w1", count=2)) == ["A", "B"]
+    assert titles(queue.claim("w2", count=2)) == ["C"]
+    assert queue.claim("w3") == []
+    assert queue.counts() == {"pending": 0, "leased": 3, "done": 0, "failed": 0}
+
+
+def test_lapsed_lease_is_reclaimed_and_old_holder_is_ignored(queue, clock):
+    queue.enqueue(["A"])
+    [item] = queue.claim("w1")
+    clock[0] += 30
+    assert queue.heartbeat("w1") == 1
+    clock[0] += 45
+    assert queue.claim("w2") == []  # The heartbeat pushed the lease out
+    clock[0] += 30
+    [again] = queue.claim("w2")
+    assert again["attempts"] == 2
+    assert not queue.complete("w1", item["position"], {"when_in_wiki": ROW})
+    assert queue.complete("w2", again["position"], {"when_in_wiki": ROW})
+    assert queue.is_drained()
+    assert list(queue.iter_results()) == [(0, "en", "A", {"when_in_wiki": ROW})]
+
+
+def test_attempts_run_out(queue, clock):
+    queue.enqueue(["A"])
+    [item] = queue.claim("w1")
+    assert queue.fail("w1", item["position"], "boom")
+    [item] = queue.claim("w1")
+    assert queue.fail("w1", item["position"], "boom")
+    assert queue.counts()["failed"] == 1
+    assert queue.requeue() == 1
+    queue.claim("w1")
+    clock[0] += 61
+    queue.claim("w2")
+    clock[0] += 61
+    assert queue.claim("w3") == []  # Third lapsed lease: given up on
+    assert queue.counts()["failed"] == 1
+
+
+def test_release_does_not_count_an_attempt(queue):
+    queue.enqueue(["A", "B"])
+    queue.claim("w1")
+    assert queue.release("w1") == 2
+    assert [item["attempts"] for item in queue.claim("w2")] == [1, 1]
+
+
+def test_merge_results_in_queue_order(queue):
+    queue.enqueue(["A", "B"])
+    first, second = queue.claim("w1")
+    later = ("B event", 1900, [1900, 1901, 1902, 1903], "t", "u")
+    queue.complete("w1", second["position"], {"when_in_wiki": later})
+    queue.complete("w1", first["position"], {"when_in_wiki": ROW})
+    merged = merge_results(queue)
+    assert [row[0] for row in merged["when_in_wiki"]] == ["Moon landing", "B event"]
+    assert merged["odd_wiki_out"] == []
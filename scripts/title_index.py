@@ -0,0 +1,496 @@
+"""
+Wiki Guesser - Offline Title & Pageview Index
+=============================================
+Builds a compact, memory-mapped index of Wikipedia titles and view counts
+from Wikimedia dump files, so articles can be selected (and wiki_links
+titles checked) without any network access.
+
+Inputs (plain, .gz or .bz2):
+    pageviews   - hourly "pageviews-YYYYMMDD-HHMMSS" files
+                  (`en Title 42 0` / `en.m Title 7 0` lines) or daily
+                  "pageviews-YYYYMMDD-user" files from pageview complete
+                  (`en.wikipedia Title 123 desktop 42 ...`)
+                  https://dumps.wikimedia.org/other/pageviews/
+    all-titles  - enwiki-latest-all-titles-in-ns0.gz (`Title` lines) or
+                  enwiki-latest-all-titles.gz (`namespace<TAB>Title` lines)
+                  https://dumps.wikimedia.org/enwiki/latest/
+
+Index layout (little-endian, every section 8-byte aligned):
+    header, section table
+    title offsets   (N + 1) x uint64 into the titles blob
+    titles          UTF-8 titles, sorted bytewise, spaces not underscores
+    views           N x uint32, summed over every ingested day
+    namespaces      N x uint16 (NS_SPECIAL for Special: pages)
+    flags           N x uint8 (FLAG_LISTED: present in the all-titles dump)
+    rank            article indexes (namespace 0, listed, views > 0),
+                    most viewed first - a percentile band is a slice of it
+    universe        U x uint32 article indexes that made some day's
+                    DAY_TOP_K most viewed, for date-range selection
+    days            per day, U x uint64 views of each universe title summed
+                    over every day up to and including that one
+
+Lookups are binary searches over the mmapped titles, and selection walks
+the rank slice of the requested band, so both stay in the millisecond range
+with millions of titles and barely touch memory. A date range is the
+difference of two cumulative day columns, one pass over the universe
+whatever the number of days.
+
+Usage:
+    python title_index.py build --output enwiki.idx \\
+        --pageviews dumps/pageviews-202412*.gz --titles enwiki-latest-all-titles-in-ns0.gz
+    python title_index.py select --index enwiki.idx --count 20 --band 1:5 --topic "football|cricket"
+    python title_index.py stats --index enwiki.idx
+"""
+
+import argparse
+import bisect
+import bz2
+import gzip
+import heapq
+import mmap
+import operator
+import os
+import random
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+from typing import Callable, Iterator, Optional
+
+MAGIC = b"WGTI"
+VERSION = 2
+DAY_TOP_K = 100_000  # Titles kept per day for date-range selection
+MAX_VIEWS = 2 ** 32 - 1
+
+FLAG_LISTED = 1
+NS_SPECIAL = 0xFFFF
+
+# Namespace prefixes as they appear in pageview titles
+NAMESPACES = {
+    "Talk": 1, "User": 2, "User talk": 3, "Wikipedia": 4, "Wikipedia talk": 5,
+    "File": 6, "File talk": 7, "MediaWiki": 8, "Template": 10, "Template talk": 11,
+    "Help": 12, "Category": 14, "Category talk": 15, "Portal": 100, "Book": 108,
+    "Draft": 118, "TimedText": 710, "Module": 828, "Special": NS_SPECIAL,
+}
+NAMESPACE_NAMES = {number: name for name, number in NAMESPACES.items()}
+
+_HEADER = struct.Struct("<4sIIIQQQ")  # magic, version, day count, has listing, titles, ranked, universe
+_SECTIONS = struct.Struct("<8Q")  # offsets, titles, views, namespaces, flags, rank, universe, days
+_DAY = struct.Struct("<8sQ")  # date, offset of its cumulative column
+_DUMP_DATE = re.compile(r"(\d{8})")
+
+
+def _check_byteorder() -> None:
+    if sys.byteorder != "little":
+        raise RuntimeError("title indexes are little-endian; this host is big-endian")
+
+
+def namespace_of(title: str) -> int:
+    prefix, colon, _ = title.partition(":")
+    return NAMESPACES.get(prefix, 0) if colon else 0
+
+
+def _open_dump(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+# =============================================================================
+# DUMP PARSING
+# =============================================================================
+
+def iter_pageviews(path: str, language: str = "en") -> Iterator[tuple[str, int]]:
+    """Yield (title, views) for one wiki from an hourly or daily pageview dump."""
+    domains = {language, f"{language}.m", f"{language}.wikipedia", f"{language}.m.wikipedia"}
+    with _open_dump(path) as f:
+        for line in f:
+            parts = line.split(" ")
+            if len(parts) < 3 or parts[0] not in domains:
+                continue
+            try:
+                if len(parts) >= 5 and parts[3] in ("desktop", "mobile-web", "mobile-app"):
+                    views = int(parts[4])  # pageview complete: wiki title page_id access daily hourly
+                else:
+                    views = int(parts[2])  # hourly: domain title views bytes
+            except (ValueError, IndexError):
+                continue
+            yield parts[1].replace("_", " "), views
+
+
+def iter_all_titles(path: str) -> Iterator[str]:
+    """Yield titles (with namespace prefix) from an all-titles dump."""
+    with _open_dump(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line in ("page_title", "page_namespace\tpage_title"):
+                continue
+            namespace, tab, title = line.partition("\t")
+            if tab:
+                if not namespace.isdigit() or int(namespace) not in (0, *NAMESPACE_NAMES):
+                    continue
+                if int(namespace):
+                    title = f"{NAMESPACE_NAMES[int(namespace)]}:{title}"
+            else:
+                title = namespace
+            yield title.replace("_", " ")
+
+
+def dump_day(path: str) -> Optional[str]:
+    """YYYYMMDD from a pageview dump file name, if it has one."""
+    match = _DUMP_DATE.search(os.path.basename(path))
+    return match.group(1) if match else None
+
+
+# =============================================================================
+# BUILDING
+# =============================================================================
+
+def _align(f) -> int:
+    padding = -f.tell() % 8
+    f.write(b"\0" * padding)
+    return f.tell()
+
+
+def build_index(output: str, pageview_files: list[str] = (), title_files: list[str] = (),
+                language: str = "en", min_views: int = 1, day_top_k: int = DAY_TOP_K) -> dict:
+    """
+    Ingest dump files and write an index. Titles seen fewer than
+    `min_views` times on a day are dropped from that day (the long tail of
+    one-view pages is most of a pageview dump). Returns build stats.
+    """
+    _check_byteorder()
+    start = time.perf_counter()
+    totals: Counter = Counter()
+    day_tops: dict[str, list[tuple[int, str]]] = {}
+
+    files_by_day: dict[Optional[str], list[str]] = {}
+    for path in pageview_files:
+        files_by_day.setdefault(dump_day(path), []).append(path)
+    for day in sorted(files_by_day, key=lambda day: day or ""):
+        views: Counter = Counter()
+        for path in files_by_day[day]:
+            print(f"   📥 {path}")
+            for title, count in iter_pageviews(path, language):
+                views[title] += count
+        if min_views > 1:
+            views = Counter({title: count for title, count in views.items() if count >= min_views})
+        totals.update(views)
+        if day:
+            day_tops[day] = heapq.nlargest(day_top_k, ((count, title) for title, count in views.items()))
+
+    listed: set[str] = set()
+    for path in title_files:
+        print(f"   📥 {path}")
+        listed.update(iter_all_titles(path))
+
+    keys = sorted({title.encode("utf-8") for title in totals} | {title.encode("utf-8") for title in listed})
+    count = len(keys)
+    views_column = array("I")
+    namespaces = array("H")
+    flags = array("B")
+    offsets = array("Q", [0])
+    for key in keys:
+        title = key.decode("utf-8")
+        views_column.append(min(totals.get(title, 0), MAX_VIEWS))
+        namespaces.append(namespace_of(title))
+        flags.append(FLAG_LISTED if title in listed else 0)
+        offsets.append(offsets[-1] + len(key))
+    rank = array("I", sorted(
+        (i for i in range(count)
+         if namespaces[i] == 0 and views_column[i] and (not listed or flags[i] & FLAG_LISTED)),
+        key=views_column.__getitem__, reverse=True,
+    ))
+    ranked = set(rank)
+    day_indexes = {
+        day: [(bisect.bisect_left(keys, title.encode("utf-8")), views) for views, title in top]
+        for day, top in day_tops.items()
+    }
+    universe = array("I", sorted({i for top in day_indexes.values() for i, _ in top if i in ranked}))
+    position = {i: u for u, i in enumerate(universe)}
+
+    with open(output + ".tmp", "wb") as f:
+        f.write(b"\0" * (_HEADER.size + _SECTIONS.size + _DAY.size * len(day_tops)))
+        sections = []
+        sections.append(_align(f)); offsets.tofile(f)
+        sections.append(_align(f)); f.writelines(keys)
+        sections.append(_align(f)); views_column.tofile(f)
+        sections.append(_align(f)); namespaces.tofile(f)
+        sections.append(_align(f)); flags.tofile(f)
+        sections.append(_align(f)); rank.tofile(f)
+        sections.append(_align(f)); universe.tofile(f)
+        sections.append(_align(f))
+        day_table = []
+        cumulative = array("Q", bytes(8 * len(universe)))
+        for day in sorted(day_indexes):
+            for i, views in day_indexes[day]:
+                if i in position:
+                    cumulative[position[i]] += views
+            day_table.append((day.encode("ascii"), _align(f)))
+            cumulative.tofile(f)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, len(day_table), int(bool(listed)), count, len(rank),
+                             len(universe)))
+        f.write(_SECTIONS.pack(*sections))
+        for entry in day_table:
+            f.write(_DAY.pack(*entry))
+    os.replace(output + ".tmp", output)
+    return {
+        "titles": count,
+        "ranked": len(rank),
+        "universe": len(universe),
+        "days": len(day_table),
+        "bytes": os.path.getsize(output),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+class TitleIndex:
+    """Read-only view of an index file; opening it only maps the file."""
+
+    def __init__(self, path: str):
+        _check_byteorder()
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, day_count, has_listing, count, ranked, universe = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} title index")
+        self.has_listing = bool(has_listing)
+        self.count = count
+        (offsets_at, titles_at, views_at, namespaces_at,
+         flags_at, rank_at, universe_at, _) = _SECTIONS.unpack_from(self._mm, _HEADER.size)
+
+        view = memoryview(self._mm)
+        self._offsets = view[offsets_at:offsets_at + 8 * (count + 1)].cast("Q")
+        self._titles_at = titles_at
+        self._views = view[views_at:views_at + 4 * count].cast("I")
+        self._namespaces = view[namespaces_at:namespaces_at + 2 * count].cast("H")
+        self._flags = view[flags_at:flags_at + count]
+        self.rank = view[rank_at:rank_at + 4 * ranked].cast("I")
+        self._universe = view[universe_at:universe_at + 4 * universe].cast("I")
+        self.days: dict[str, memoryview] = {}
+        for n in range(day_count):
+            day, at = _DAY.unpack_from(self._mm, _HEADER.size + _SECTIONS.size + n * _DAY.size)
+            self.days[day.decode("ascii")] = view[at:at + 8 * universe].cast("Q")
+        self._day_names = sorted(self.days)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key(self, i: int) -> bytes:
+        start = self._titles_at
+        return self._mm[start + self._offsets[i]:start + self._offsets[i + 1]]
+
+    def title(self, i: int) -> str:
+        return self._key(i).decode("utf-8")
+
+    def views(self, i: int) -> int:
+        return self._views[i]
+
+    def namespace(self, i: int) -> int:
+        return self._namespaces[i]
+
+    def find(self, title: str) -> Optional[int]:
+        """Index of a title (spaces or underscores), or None."""
+        key = title.replace("_", " ").encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key(lo) == key:
+            if not self.has_listing or self._flags[lo] & FLAG_LISTED:
+                return lo
+        return None
+
+    def __contains__(self, title: str) -> bool:
+        return self.find(title) is not None
+
+    def resolve(self, titles: list[str]) -> dict[str, Optional[str]]:
+        """
+        {title: title as indexed, or None}, for QuestionValidator. Tries the
+        title as given, then with its first letter capitalized like MediaWiki.
+        Only meaningful for indexes built with an all-titles dump.
+        """
+        resolved = {}
+        for title in titles:
+            found = self.find(title)
+            if found is None and title:
+                found = self.find(title[0].upper() + title[1:])
+            resolved[title] = None if found is None else self.title(found)
+        return resolved
+
+    def with_prefix(self, prefix: str, limit: int = 100) -> list[str]:
+        """Titles starting with `prefix`, in sorted order."""
+        key = prefix.replace("_", " ").encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        results = []
+        while lo < self.count and len(results) < limit and self._key(lo).startswith(key):
+            results.append(self.title(lo))
+            lo += 1
+        return results
+
+    def _ranked_between(self, start: Optional[str], end: Optional[str]) -> list[int]:
+        """
+        Article indexes by views summed over the days in [start, end]: the
+        last day's cumulative column minus the one before `start`.
+        """
+        first = bisect.bisect_left(self._day_names, start) if start else 0
+        last = bisect.bisect_right(self._day_names, end) if end else len(self._day_names)
+        if last <= first:
+            return []
+        totals = self.days[self._day_names[last - 1]]
+        if first:
+            totals = list(map(operator.sub, totals, self.days[self._day_names[first - 1]]))
+        order = sorted(filter(totals.__getitem__, range(len(totals))), key=totals.__getitem__, reverse=True)
+        return list(map(self._universe.__getitem__, order))
+
+    def select(self, count: int, band: tuple[float, float] = (0.0, 100.0),
+               start: Optional[str] = None, end: Optional[str] = None,
+               topic: Optional[str] = None, exclude: Optional[Callable[[str], bool]] = None,
+               sample: bool = False, seed: Optional[int] = None) -> list[str]:
+        """
+        Pick up to `count` article titles.
+
+        band:       view-rank percentiles, 0 = most viewed; (0, 1) is the top 1%
+        start, end: YYYYMMDD bounds; rank by views on those days instead of totals
+        topic:      regular expression the title must match (case-insensitive)
+        exclude:    callable(title) -> True to skip a title
+        sample:     random titles from the band instead of its most viewed
+        """
+        ranked = self._ranked_between(start, end) if (start or end) else self.rank
+        lo = int(len(ranked) * band[0] / 100)
+        hi = max(lo, int(len(ranked) * band[1] / 100))
+        matcher = re.compile(topic, re.IGNORECASE) if topic else None
+
+        def accept(position: int) -> Optional[str]:
+            title = self.title(ranked[position])
+            if matcher and not matcher.search(title):
+                return None
+            if exclude and exclude(title):
+                return None
+            return title
+
+        results = []
+        if sample:
+            rng = random.Random(seed)
+            tried: set[int] = set()
+            while len(results) < count and len(tried) < hi - lo:
+                position = rng.randrange(lo, hi)
+                if position in tried:
+                    continue
+                tried.add(position)
+                title = accept(position)
+                if title:
+                    results.append(title)
+        else:
+            for position in range(lo, hi):
+                title = accept(position)
+                if title:
+                    results.append(title)
+                    if len(results) >= count:
+                        break
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "titles": self.count,
+            "ranked": len(self.rank),
+            "listed": self.has_listing,
+            "days": sorted(self.days),
+            "bytes": os.path.getsize(self.path),
+        }
+
+    def close(self) -> None:
+        for name in ("_offsets", "_views", "_namespaces", "_flags", "rank", "_universe"):
+            getattr(self, name).release()
+        for column in self.days.values():
+            column.release()
+        self.days = {}
+        self._mm.close()
+        self._file.close()
+
+
+def parse_band(value: str) -> tuple[float, float]:
+    """'1:5' -> (1.0, 5.0): percentiles of the view ranking, 0 = most viewed."""
+    low, _, high = value.partition(":")
+    band = (float(low or 0), float(high or 100))
+    if not 0 <= band[0] <= band[1] <= 100:
+        raise argparse.ArgumentTypeError(f"Invalid percentile band: {value}")
+    return band
+
+
+def parse_days(value: str) -> tuple[Optional[str], Optional[str]]:
+    """'20241201:20241207' -> ('20241201', '20241207'); either side may be empty."""
+    start, _, end = value.partition(":")
+    return start or None, end or None
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser offline title/pageview index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build an index from dump files")
+    build.add_argument("--output", required=True)
+    build.add_argument("--pageviews", nargs="*", default=[], help="Pageview dump files")
+    build.add_argument("--titles", nargs="*", default=[], help="All-titles dump files")
+    build.add_argument("--language", default="en")
+    build.add_argument("--min-views", type=int, default=1, help="Drop titles below this per day")
+    build.add_argument("--day-top-k", type=int, default=DAY_TOP_K,
+                       help="Titles kept per day for date-range selection")
+    select = sub.add_parser("select", help="Pick articles from an index")
+    select.add_argument("--index", required=True)
+    select.add_argument("--count", type=int, default=20)
+    select.add_argument("--band", type=parse_band, default=(0.0, 100.0),
+                        help="Percentile band of the view ranking, e.g. 1:5")
+    select.add_argument("--days", type=parse_days, default=(None, None),
+                        help="Rank by views in YYYYMMDD:YYYYMMDD")
+    select.add_argument("--topic", help="Regular expression titles must match")
+    select.add_argument("--sample", action="store_true", help="Random titles from the band")
+    stats = sub.add_parser("stats", help="Describe an index")
+    stats.add_argument("--index", required=True)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"🔨 Building {args.output}...")
+        result = build_index(args.output, args.pageviews, args.titles, args.language,
+                             args.min_views, args.day_top_k)
+        print(f"✅ {result['titles']} titles ({result['ranked']} ranked articles, "
+              f"{result['days']} days) in {result['bytes'] / 1e6:.1f} MB, {result['seconds']:.1f}s")
+        return
+
+    index = TitleIndex(args.index)
+    if args.command == "select":
+        start = time.perf_counter()
+        titles = index.select(args.count, args.band, *args.days, topic=args.topic, sample=args.sample)
+        for title in titles:
+            print(title)
+        print(f"⏱️ {len(titles)} titles in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    else:
+        for key, value in index.stats().items():
+            print(f"   {key}: {value}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
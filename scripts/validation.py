@@ -0,0 +1,399 @@
+"""
+Wiki Guesser - Question Validation
+==================================
+Checks generated question sets against the rules in the miner's system
+prompt before they become rows, repairing what is cheap to repair and
+rejecting the rest, so a malformed question never reaches the database and
+never silently picks up a default (impostor 0, year 2000, ...).
+
+Validation runs over a whole batch of question sets at a time: each rule is
+applied to every section of a category in one pass, and the wiki_links
+titles of the batch are resolved together (cached titles first, then one
+MediaWiki query per 50 unknown titles).
+
+Each rule is named "<category>.<rule>". Rejections and repairs are counted
+per rule, so the run summary shows which parts of the prompt the model
+struggles with.
+"""
+
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Optional
+
+from cache import ResponseCache, content_key
+from wiki_client import MAX_TITLES_PER_REQUEST, get_client
+
+OPTION_COUNT = 4  # items, titles, year_options and connection_options
+DEFAULT_TOPIC = "General"
+MISSING_TITLE_TTL_HOURS = 24  # How long a "no such article" answer is trusted
+FOUND_TITLE_TTL_HOURS = 24
+
+
+# =============================================================================
+# TITLE EXISTENCE
+# =============================================================================
+
+class TitleResolver:
+    """
+    Bulk title lookup: {title: canonical title, or None if no such article}.
+
+    Answers come from the response cache when possible (the miner's
+    "revision" entries double as a title index), then from batched
+    MediaWiki info queries. Titles that cannot be checked because of a
+    network error are passed through unchanged.
+    """
+
+    def __init__(self, language: str = "en", cache: Optional[ResponseCache] = None):
+        self.language = language
+        self.cache = cache
+
+    def resolve(self, titles: list[str]) -> dict[str, Optional[str]]:
+        resolved: dict[str, Optional[str]] = {}
+        unknown = []
+        for title in dict.fromkeys(titles):
+            if self.cache:
+                page = self.cache.get("revision", content_key(self.language, title))
+                if page is not None:
+                    resolved[title] = page["title"]
+                    continue
+                if self.cache.get("missing_title", content_key(self.language, title)) is not None:
+                    resolved[title] = None
+                    continue
+            unknown.append(title)
+
+        client = get_client(self.language)
+        for start in range(0, len(unknown), MAX_TITLES_PER_REQUEST):
+            batch = unknown[start:start + MAX_TITLES_PER_REQUEST]
+            try:
+                pages = client.query_revisions(batch)
+            except Exception as e:
+                print(f"   ⚠️ Could not check {len(batch)} titles: {e}")
+                resolved.update({title: title for title in batch})
+                continue
+            for title, page in pages.items():
+                resolved[title] = page["title"] if page else None
+                if not self.cache:
+                    continue
+                if page:
+                    self.cache.set("revision", content_key(self.language, title), page,
+                                   ttl=FOUND_TITLE_TTL_HOURS * 3600)
+                else:
+                    self.cache.set("missing_title", content_key(self.language, title), True,
+                                   ttl=MISSING_TITLE_TTL_HOURS * 3600)
+        return resolved
+
+
+# =============================================================================
+# FIELD COERCION
+# =============================================================================
+
+def _text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _int(value) -> Optional[int]:
+    """int, integral float or a string containing one number ("1969", "c. 1969 AD")."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        numbers = re.findall(r"-?\d+", value.replace(",", ""))
+        if len(numbers) == 1:
+            return int(numbers[0])
+    return None
+
+
+def _bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    return None
+
+
+def _strings(value) -> Optional[list[str]]:
+    """A list of stripped strings, or None if `value` is not a list of strings."""
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        return None
+    return [item.strip() for item in value]
+
+
+def _has_duplicates(items: list[str]) -> bool:
+    return len({item.casefold() for item in items}) < len(items)
+
+
+# =============================================================================
+# RULES
+# =============================================================================
+# Each check takes a copy of one section, repairs it in place and returns
+# (failed rule or None, [repaired rules]).
+
+def _check_common(data: dict, category: str, repairs: list[str]) -> None:
+    topic = _text(data.get("topic"))
+    if not topic:
+        topic = DEFAULT_TOPIC
+        repairs.append(f"{category}.topic_missing")
+    data["topic"] = topic
+
+
+def _check_string_list(data: dict, field: str, category: str,
+                       repairs: list[str]) -> Optional[str]:
+    items = _strings(data.get(field))
+    if items is None:
+        return f"{category}.{field}_invalid"
+    if len(items) != OPTION_COUNT or not all(items):
+        return f"{category}.{field}_count"
+    if _has_duplicates(items):
+        return f"{category}.{field}_duplicate"
+    if items != data[field]:
+        repairs.append(f"{category}.{field}_whitespace")
+    data[field] = items
+    return None
+
+
+def check_odd_wiki_out(data: dict) -> tuple[Optional[str], list[str]]:
+    repairs: list[str] = []
+    failed = _check_string_list(data, "items", "odd_wiki_out", repairs)
+    if failed:
+        return failed, repairs
+    index = _int(data.get("impostor_index"))
+    if index is None or not 0 <= index < OPTION_COUNT:
+        return "odd_wiki_out.impostor_index_range", repairs
+    if index != data.get("impostor_index"):
+        repairs.append("odd_wiki_out.impostor_index_type")
+    data["impostor_index"] = index
+    data["connection"] = _text(data.get("connection"))
+    if not data["connection"]:
+        return "odd_wiki_out.connection_missing", repairs
+    _check_common(data, "odd_wiki_out", repairs)
+    return None, repairs
+
+
+def _nearby_years(year: int, taken: set[int], count: int) -> list[int]:
+    """Plausible distractor years around `year`, never in the future."""
+    latest = datetime.now().year
+    years = []
+    for step in (3, 5, 7, 10, 12, 15, 20, 25):
+        for candidate in (year - step, year + step):
+            if len(years) < count and candidate <= latest and candidate not in taken:
+                years.append(candidate)
+                taken.add(candidate)
+    return years
+
+
+def check_when_in_wiki(data: dict) -> tuple[Optional[str], list[str]]:
+    repairs: list[str] = []
+    data["event"] = _text(data.get("event"))
+    if not data["event"]:
+        return "when_in_wiki.event_missing", repairs
+
+    year = _int(data.get("correct_year"))
+    if year is None:
+        return "when_in_wiki.correct_year_invalid", repairs
+    if year > datetime.now().year:
+        return "when_in_wiki.correct_year_future", repairs
+    if year != data.get("correct_year"):
+        repairs.append("when_in_wiki.correct_year_type")
+    data["correct_year"] = year
+
+    raw = data.get("year_options")
+    options = [_int(option) for option in raw] if isinstance(raw, list) else []
+    if not all(option is not None for option in options):
+        return "when_in_wiki.year_options_invalid", repairs
+    unique = list(dict.fromkeys(options))
+    if year not in unique:
+        if len(unique) >= OPTION_COUNT:
+            # Assume the model meant the closest option
+            unique.remove(min(unique, key=lambda option: abs(option - year)))
+        unique.append(year)
+        repairs.append("when_in_wiki.year_options_missing_correct")
+    if len(unique) > OPTION_COUNT:
+        others = sorted((option for option in unique if option != year), key=lambda option: abs(option - year))
+        unique = [year] + others[:OPTION_COUNT - 1]
+        repairs.append("when_in_wiki.year_options_trimmed")
+    elif len(unique) < OPTION_COUNT:
+        unique += _nearby_years(year, set(unique), OPTION_COUNT - len(unique))
+        repairs.append("when_in_wiki.year_options_padded")
+    if len(unique) != OPTION_COUNT:
+        return "when_in_wiki.year_options_count", repairs
+    data["year_options"] = sorted(unique)
+    _check_common(data, "when_in_wiki", repairs)
+    return None, repairs
+
+
+def check_wiki_or_fiction(data: dict) -> tuple[Optional[str], list[str]]:
+    repairs: list[str] = []
+    data["statement"] = _text(data.get("statement"))
+    if not data["statement"]:
+        return "wiki_or_fiction.statement_missing", repairs
+    is_true = _bool(data.get("is_true"))
+    if is_true is None:
+        return "wiki_or_fiction.is_true_invalid", repairs
+    if not isinstance(data.get("is_true"), bool):
+        repairs.append("wiki_or_fiction.is_true_type")
+    data["is_true"] = is_true
+    data["explanation"] = _text(data.get("explanation"))
+    if not data["explanation"]:
+        return "wiki_or_fiction.explanation_missing", repairs
+    _check_common(data, "wiki_or_fiction", repairs)
+    return None, repairs
+
+
+def check_wiki_links(data: dict) -> tuple[Optional[str], list[str]]:
+    """Shape checks only; title existence is checked per batch."""
+    repairs: list[str] = []
+    failed = _check_string_list(data, "titles", "wiki_links", repairs)
+    if failed:
+        return failed, repairs
+    data["connection"] = _text(data.get("connection"))
+    if not data["connection"]:
+        return "wiki_links.connection_missing", repairs
+
+    options = _strings(data.get("connection_options"))
+    if options is None:
+        return "wiki_links.connection_options_invalid", repairs
+    options = [option for option in options if option]
+    folded = [option.casefold() for option in options]
+    if data["connection"].casefold() not in folded:
+        # connection_options[0] is the correct answer by prompt rule 4
+        if len(options) == OPTION_COUNT - 1:
+            options.insert(0, data["connection"])
+        elif options:
+            options[0] = data["connection"]
+        repairs.append("wiki_links.connection_options_aligned")
+    if len(options) != OPTION_COUNT:
+        return "wiki_links.connection_options_count", repairs
+    if _has_duplicates(options):
+        return "wiki_links.connection_options_duplicate", repairs
+    data["connection_options"] = options
+    _check_common(data, "wiki_links", repairs)
+    return None, repairs
+
+
+CHECKS: dict[str, Callable[[dict], tuple[Optional[str], list[str]]]] = {
+    "odd_wiki_out": check_odd_wiki_out,
+    "when_in_wiki": check_when_in_wiki,
+    "wiki_or_fiction": check_wiki_or_fiction,
+    "wiki_links": check_wiki_links,
+}
+
+
+# =============================================================================
+# BATCH VALIDATOR
+# =============================================================================
+
+class QuestionValidator:
+    """
+    Validates and repairs batches of generated question sets.
+
+    `resolve_titles(titles) -> {title: canonical title or None}` checks that
+    wiki_links titles are real articles (e.g. TitleResolver.resolve); with
+    None, titles are not checked. Safe to call from several threads.
+    """
+
+    def __init__(self, resolve_titles: Optional[Callable[[list[str]], dict]] = None):
+        self.resolve_titles = resolve_titles
+        self.checked = 0
+        self.passed = 0
+        self.failures: Counter = Counter()
+        self.repairs: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def validate_batch(self, question_sets: list[Optional[dict]]) -> list[Optional[dict]]:
+        """
+        Validate many question sets at once. Returns, position for position,
+        a repaired copy holding only the sections that passed (None if none did,
+        or if the input was None).
+        """
+        failures: Counter = Counter()
+        repairs: Counter = Counter()
+        checked = 0
+        results: list[Optional[dict]] = [None if questions is None else {} for questions in question_sets]
+
+        for category, check in CHECKS.items():
+            for position, questions in enumerate(question_sets):
+                if not questions or category not in questions:
+                    continue
+                checked += 1
+                section = questions[category]
+                if not isinstance(section, dict):
+                    failures[f"{category}.not_an_object"] += 1
+                    continue
+                section = dict(section)
+                failed, repaired = check(section)
+                repairs.update(repaired)
+                if failed:
+                    failures[failed] += 1
+                else:
+                    results[position][category] = section
+
+        if self.resolve_titles:
+            linked = [result["wiki_links"] for result in results if result and "wiki_links" in result]
+            if linked:
+                resolved = self.resolve_titles([title for section in linked for title in section["titles"]])
+                for result in results:
+                    if not result or "wiki_links" not in result:
+                        continue
+                    section = result["wiki_links"]
+                    canonical = [resolved.get(title, title) for title in section["titles"]]
+                    if None in canonical:
+                        failures["wiki_links.titles_missing"] += 1
+                        del result["wiki_links"]
+                    elif _has_duplicates(canonical):
+                        failures["wiki_links.titles_duplicate"] += 1
+                        del result["wiki_links"]
+                    elif canonical != section["titles"]:
+                        repairs["wiki_links.titles_normalized"] += 1
+                        section["titles"] = canonical
+
+        results = [result or None for result in results]
+        with self._lock:
+            self.checked += checked
+            self.passed += sum(len(result) for result in results if result)
+            self.failures.update(failures)
+            self.repairs.update(repairs)
+        return results
+
+    def take_stats(self) -> tuple:
+        """Return and reset the counts (for merging from worker processes)."""
+        with self._lock:
+            stats = (self.checked, self.passed, self.failures, self.repairs)
+            self.checked = self.passed = 0
+            self.failures, self.repairs = Counter(), Counter()
+        return stats
+
+    def add_stats(self, stats: tuple) -> None:
+        checked, passed, failures, repairs = stats
+        with self._lock:
+            self.checked += checked
+            self.passed += passed
+            self.failures.update(failures)
+            self.repairs.update(repairs)
+
+    def validate(self, questions: Optional[dict]) -> Optional[dict]:
+        return self.validate_batch([questions])[0]
+
+    def summary(self) -> dict:
+        return {
+            "checked": self.checked,
+            "passed": self.passed,
+            "rejected": sum(self.failures.values()),
+            "repaired": sum(self.repairs.values()),
+            "failures": dict(self.failures.most_common()),
+            "repairs": dict(self.repairs.most_common()),
+        }
+
+
+def print_validation_report(validator: QuestionValidator) -> None:
+    summary = validator.summary()
+    print(f"   Validation: {summary['passed']}/{summary['checked']} questions passed, "
+          f"{summary['repaired']} repairs")
+    for rule, count in summary["failures"].items():
+        print(f"      ❌ {rule}: {count}")
+    for rule, count in summary["repairs"].items():
+        print(f"      🔧 {rule}: {count}")
@@ -0,0 +1,206 @@
+"""
+Wiki Guesser - Wikipedia API Client
+===================================
+Persistent-connection client for the MediaWiki Action API, used by
+miner.py to fetch article intros in batches instead of one page per request.
+
+A single `action=query&prop=extracts|info` request covers up to 50 titles
+and resolves title normalization, redirects and missing pages in the same
+round trip. The API caps how many extracts it returns per response, so the
+rest of a batch is pulled with `continue` over the same keep-alive
+connection.
+
+The endpoint can be pointed at a local stub server:
+    WIKI_API_URL=http://127.0.0.1:8080/w/api.php python miner.py
+"""
+
+import http.client
+import json
+import os
+import threading
+from typing import Optional
+from urllib.parse import urlencode, urlsplit
+
+USER_AGENT = "WikiGuesserBot/1.0 (https://wiki-guesser.vercel.app)"
+
+# Titles per query (MediaWiki limit for non-bot clients)
+MAX_TITLES_PER_REQUEST = 50
+
+
+def api_url_for(language: str = "en") -> str:
+    """Action API endpoint for a language edition (or WIKI_API_URL if set)."""
+    return os.getenv("WIKI_API_URL") or f"https://{language}.wikipedia.org/w/api.php"
+
+
+class WikiClient:
+    """
+    Minimal MediaWiki API client that keeps one HTTP connection open per
+    thread, so repeated queries reuse the same TCP/TLS session.
+    """
+
+    def __init__(self, api_url: str, user_agent: str = USER_AGENT, timeout: float = 30.0):
+        parts = urlsplit(api_url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.path = parts.path or "/w/api.php"
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.requests_made = 0
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(self.host, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def get(self, params: dict) -> dict:
+        """Perform a GET against the API and return the decoded JSON."""
+        query = urlencode({**params, "format": "json", "formatversion": 2})
+        headers = {"User-Agent": self.user_agent, "Accept-Encoding": "identity"}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("GET", f"{self.path}?{query}", headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                # Server closed the idle keep-alive connection; reconnect once
+                self.close()
+                if attempt:
+                    raise
+                continue
+            self.requests_made += 1
+            if response.status != 200:
+                raise http.client.HTTPException(f"HTTP {response.status} from {self.host}")
+            return json.loads(body.decode("utf-8"))
+
+    def _query_pages(self, titles: list[str], params: dict) -> dict[str, Optional[dict]]:
+        """
+        Run a prop query for up to MAX_TITLES_PER_REQUEST titles, following
+        continuations, and map every requested title to its resolved page
+        (None if missing or invalid).
+        """
+        if len(titles) > MAX_TITLES_PER_REQUEST:
+            raise ValueError(f"At most {MAX_TITLES_PER_REQUEST} titles per request")
+        params = {**params, "action": "query", "redirects": 1, "titles": "|".join(titles)}
+
+        aliases: dict[str, str] = {}
+        pages: dict[str, dict] = {}
+        cont: dict = {}
+        while True:
+            data = self.get({**params, **cont})
+            query = data.get("query", {})
+            for entry in query.get("normalized", []) + query.get("redirects", []):
+                aliases[entry["from"]] = entry["to"]
+            for page in query.get("pages", []):
+                existing = pages.setdefault(page["title"], {"title": page["title"]})
+                if page.get("missing") or page.get("invalid"):
+                    existing["missing"] = True
+                if "extract" in page:
+                    existing["summary"] = page["extract"]
+                if "lastrevid" in page:
+                    existing["revision"] = page["lastrevid"]
+                if "description" in page:
+                    existing["description"] = page["description"]
+                for link in page.get("langlinks", []):
+                    existing.setdefault("langlinks", {})[link["lang"]] = link["title"]
+            if "continue" not in data:
+                break
+            cont = data["continue"]
+
+        results: dict[str, Optional[dict]] = {}
+        for title in titles:
+            resolved, seen = title, set()
+            while resolved in aliases and resolved not in seen:
+                seen.add(resolved)
+                resolved = aliases[resolved]
+            page = pages.get(resolved)
+            results[title] = None if not page or page.get("missing") else page
+        return results
+
+    def query_revisions(self, titles: list[str]) -> dict[str, Optional[dict]]:
+        """
+        Resolve up to MAX_TITLES_PER_REQUEST titles to their current revision
+        without downloading any text.
+
+        Returns {requested title: {"title": resolved title, "revision": int}} or None.
+        """
+        pages = self._query_pages(titles, {"prop": "info"})
+        return {
+            title: {"title": page["title"], "revision": page.get("revision")} if page else None
+            for title, page in pages.items()
+        }
+
+    def query_summaries(self, titles: list[str]) -> dict[str, Optional[dict]]:
+        """
+        Fetch plain-text intro extracts for up to MAX_TITLES_PER_REQUEST titles.
+
+        Returns {requested title: page} where page is
+        {"title": resolved title, "summary": str, "revision": int} or None for
+        missing/invalid pages.
+        """
+        pages = self._query_pages(titles, {
+            "prop": "extracts|info",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": "max",
+        })
+        return {
+            title: {
+                "title": page["title"],
+                "summary": page["summary"],
+                "revision": page.get("revision"),
+            } if page and page.get("summary") else None
+            for title, page in pages.items()
+        }
+
+    def query_langlinks(self, titles: list[str], language: str) -> dict[str, Optional[str]]:
+        """
+        Map up to MAX_TITLES_PER_REQUEST titles to the same article on another
+        language edition (None where there is no interlanguage link).
+        """
+        pages = self._query_pages(titles, {"prop": "langlinks", "lllang": language, "lllimit": "max"})
+        return {
+            title: page.get("langlinks", {}).get(language) if page else None
+            for title, page in pages.items()
+        }
+
+    def query_descriptions(self, titles: list[str]) -> dict[str, Optional[str]]:
+        """
+        Fetch the one-line short descriptions ("American singer-songwriter")
+        of up to MAX_TITLES_PER_REQUEST titles: "" where a page has none,
+        None for missing/invalid pages.
+        """
+        pages = self._query_pages(titles, {"prop": "description"})
+        return {
+            title: page.get("description", "") if page else None
+            for title, page in pages.items()
+        }
+
+    def fetch_summaries(self, titles: list[str]) -> dict[str, Optional[dict]]:
+        """Like query_summaries, for any number of titles."""
+        results: dict[str, Optional[dict]] = {}
+        for start in range(0, len(titles), MAX_TITLES_PER_REQUEST):
+            results.update(self.query_summaries(titles[start:start + MAX_TITLES_PER_REQUEST]))
+        return results
+
+
+_clients: dict[str, WikiClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(language: str = "en") -> WikiClient:
+    """Shared client per language edition."""
+    with _clients_lock:
+        if language not in _clients:
+            _clients[language] = WikiClient(api_url_for(language))
+        return _clients[language]
@@ -0,0 +1,438 @@
+"""
+Wiki Guesser - Distributed Work Queue
+=====================================
+Lease-based article queue that lets several miner.py workers, on one
+machine or many, share a run without doing any article twice.
+
+    python miner.py --queue URL --enqueue     picks articles as usual and queues them
+    python miner.py --queue URL               (any number of times, anywhere) works
+                                              through the queue until it is drained
+    python work_queue.py export --queue URL   writes (or --load s) the merged output
+
+URL is a SQLite file for workers on one machine, or a postgresql:// DSN
+(e.g. $DATABASE_URL) for workers on several hosts. Every article is one row
+of the work_items table:
+
+    pending -> leased (worker, lease_until) -> done (its question rows)
+                      \\-> pending again when the worker fails it, releases it
+                          on shutdown, or stops heartbeating (crash): once
+                          lease_until passes any worker can claim it
+                      \\-> failed after MAX_ATTEMPTS claims
+
+Workers claim the lowest pending positions a batch at a time (SELECT ...
+FOR UPDATE SKIP LOCKED on Postgres, BEGIN IMMEDIATE on SQLite, so two
+workers never get the same article) and a background thread renews their
+leases every LEASE_SECONDS / 3. Results are only accepted from the worker
+currently holding the lease, so an article whose lease lapsed and was
+re-claimed is still stored once. Export reads the results in position
+order and runs them through the near-duplicate index there, so the merged
+output matches a single-process run over the same articles.
+
+Local multi-process test:
+    python miner.py --queue work.sqlite3 --enqueue --max-articles 50
+    for i in 1 2 3; do python miner.py --queue work.sqlite3 & done; wait
+    python work_queue.py export --queue work.sqlite3 --output seed_generated.sql
+
+Usage:
+    python work_queue.py stats --queue work.sqlite3
+    python work_queue.py export --queue $DATABASE_URL --name nightly --output seed_generated.sql --load
+    python work_queue.py requeue --queue work.sqlite3
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional
+
+from dedup import DEFAULT_INDEX_PATH, DedupIndex
+from loader import DEFAULT_COMMIT_SIZE, LOAD_METHODS, PostgresLoader, print_load_report
+from sql_writer import FORMATS, QUESTION_TABLES, section_header, write_csv, write_table
+
+try:
+    import psycopg2
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+DEFAULT_QUEUE_NAME = "default"
+LEASE_SECONDS = 300  # A worker that stops heartbeating loses its articles after this long
+CLAIM_SIZE = 10  # Articles claimed per round trip
+MAX_ATTEMPTS = 3  # Claims before an article is given up on
+POLL_SECONDS = 15  # Idle workers re-check for lapsed leases this often
+
+STATES = ("pending", "leased", "done", "failed")
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS work_items (
+        queue TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        language TEXT NOT NULL,
+        title TEXT NOT NULL,
+        state TEXT NOT NULL,
+        worker TEXT,
+        lease_until DOUBLE PRECISION,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        updated_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (queue, position),
+        UNIQUE (queue, language, title)
+    );
+    CREATE INDEX IF NOT EXISTS work_items_claim ON work_items (queue, state, position);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_postgres(url: str) -> bool:
+    return url.startswith(("postgres://", "postgresql://"))
+
+
+class WorkQueue:
+    """
+    One named queue in a SQLite file or Postgres database. Safe to share
+    between threads (calls are serialized on one connection); every
+    process opens its own.
+    """
+
+    def __init__(self, url: str, name: str = DEFAULT_QUEUE_NAME, lease: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.url = url
+        self.name = name
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.postgres = is_postgres(url)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        if self.postgres:
+            if not PSYCOPG2_AVAILABLE:
+                raise RuntimeError("psycopg2 not installed. Run: pip install psycopg2-binary")
+            self._db = psycopg2.connect(url)
+            with self._db.cursor() as cursor:
+                cursor.execute(_SCHEMA)
+            self._db.commit()
+        else:
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            self._db = sqlite3.connect(url, timeout=60, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        """A cursor inside one write transaction (rolled back on error)."""
+        with self._lock:
+            cursor = self._db.cursor()
+            if not self.postgres:
+                cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield _Cursor(cursor, self.postgres)
+            except BaseException:
+                self._db.rollback()
+                raise
+            else:
+                self._db.commit()
+            finally:
+                cursor.close()
+
+    # -------------------------------------------------------------------------
+    # Producer
+    # -------------------------------------------------------------------------
+
+    def enqueue(self, titles: list[str], language: str = "en") -> int:
+        """Append articles after the ones already queued. Returns how many were new."""
+        now = time.time()
+        with self._transaction() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(position), -1) FROM work_items WHERE queue = ?", (self.name,))
+            position = cursor.fetchone()[0] + 1
+            cursor.execute("SELECT COUNT(*) FROM work_items WHERE queue = ?", (self.name,))
+            before = cursor.fetchone()[0]
+            for title in dict.fromkeys(titles):
+                cursor.execute(
+                    "INSERT INTO work_items (queue, position, language, title, state, attempts, updated_at) "
+                    "VALUES (?, ?, ?, ?, 'pending', 0, ?) ON CONFLICT DO NOTHING",
+                    (self.name, position, language, title, now),
+                )
+                position += 1
+            cursor.execute("SELECT COUNT(*) FROM work_items WHERE queue = ?", (self.name,))
+            return cursor.fetchone()[0] - before
+
+    # -------------------------------------------------------------------------
+    # Worker
+    # -------------------------------------------------------------------------
+
+    def claim(self, worker: str, count: int = CLAIM_SIZE) -> list[dict]:
+        """
+        Lease up to `count` of the lowest pending (or lease-expired)
+        articles. Expired articles that have used up their attempts are
+        marked failed instead. Returns [{"position", "language", "title",
+        "attempts"}].
+        """
+        now = time.time()
+        with self._transaction() as cursor:
+            cursor.execute(
+                "SELECT position, language, title, attempts FROM work_items "
+                "WHERE queue = ? AND (state = 'pending' OR (state = 'leased' AND lease_until < ?)) "
+                "ORDER BY position LIMIT ?" + (" FOR UPDATE SKIP LOCKED" if self.postgres else ""),
+                (self.name, now, count),
+            )
+            items = [
+                {"position": position, "language": language, "title": title, "attempts": attempts + 1}
+                for position, language, title, attempts in cursor.fetchall()
+            ]
+            exhausted = [item for item in items if item["attempts"] > self.max_attempts]
+            items = [item for item in items if item["attempts"] <= self.max_attempts]
+            for item in exhausted:
+                cursor.execute(
+                    "UPDATE work_items SET state = 'failed', worker = NULL, lease_until = NULL, "
+                    "error = ?, updated_at = ? WHERE queue = ? AND position = ?",
+                    (f"gave up after {self.max_attempts} attempts", now, self.name, item["position"]),
+                )
+            for item in items:
+                cursor.execute(
+                    "UPDATE work_items SET state = 'leased', worker = ?, lease_until = ?, attempts = ?, "
+                    "updated_at = ? WHERE queue = ? AND position = ?",
+                    (worker, now + self.lease, item["attempts"], now, self.name, item["position"]),
+                )
+        return items
+
+    def heartbeat(self, worker: str) -> int:
+        """Extend the worker's leases. Returns how many it still holds."""
+        now = time.time()
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE work_items SET lease_until = ?, updated_at = ? "
+                "WHERE queue = ? AND worker = ? AND state = 'leased'",
+                (now + self.lease, now, self.name, worker),
+            )
+            return cursor.rowcount
+
+    def complete(self, worker: str, position: int, rows: dict) -> bool:
+        """
+        Store an article's {category: row} questions. Returns False (and
+        stores nothing) if the worker no longer holds its lease.
+        """
+        result = json.dumps({category: list(row) for category, row in rows.items()}, ensure_ascii=False)
+        return self._finish(worker, position, "'done'", result=result)
+
+    def fail(self, worker: str, position: int, error: str, retry: bool = True) -> bool:
+        """
+        Give an article back after an error: pending again while it has
+        attempts left (and `retry`), otherwise failed for good.
+        """
+        state = f"CASE WHEN attempts < {self.max_attempts:d} THEN 'pending' ELSE 'failed' END" if retry \
+            else "'failed'"
+        return self._finish(worker, position, state, error=error)
+
+    def _finish(self, worker: str, position: int, state_sql: str, result: Optional[str] = None,
+                error: Optional[str] = None) -> bool:
+        with self._transaction() as cursor:
+            cursor.execute(
+                f"UPDATE work_items SET state = {state_sql}, worker = NULL, lease_until = NULL, result = ?, "
+                "error = ?, updated_at = ? WHERE queue = ? AND position = ? AND worker = ? AND state = 'leased'",
+                (result, error, time.time(), self.name, position, worker),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, worker: str) -> int:
+        """Hand back every article the worker holds without counting an attempt (clean shutdown)."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE work_items SET state = 'pending', worker = NULL, lease_until = NULL, "
+                "attempts = attempts - 1, updated_at = ? WHERE queue = ? AND worker = ? AND state = 'leased'",
+                (time.time(), self.name, worker),
+            )
+            return cursor.rowcount
+
+    def start_heartbeat(self, worker: str, interval: Optional[float] = None) -> None:
+        """Renew the worker's leases every `interval` seconds (lease / 3) until stop_heartbeat()."""
+        interval = interval or self.lease / 3
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.heartbeat(worker)
+                except Exception as e:
+                    print(f"   ⚠️ Heartbeat failed: {e}")
+
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=loop, daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self) -> None:
+        if self._heartbeat:
+            self._stop.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    # -------------------------------------------------------------------------
+    # Results
+    # -------------------------------------------------------------------------
+
+    def counts(self) -> dict[str, int]:
+        """Articles per state (lapsed leases still count as leased)."""
+        with self._transaction() as cursor:
+            cursor.execute("SELECT state, COUNT(*) FROM work_items WHERE queue = ? GROUP BY state", (self.name,))
+            found = dict(cursor.fetchall())
+        return {state: found.get(state, 0) for state in STATES}
+
+    def is_drained(self) -> bool:
+        counts = self.counts()
+        return not counts["pending"] and not counts["leased"]
+
+    def iter_results(self) -> Iterator[tuple[int, str, str, dict]]:
+        """(position, language, title, {category: row}) of finished articles, in position order."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                "SELECT position, language, title, result FROM work_items "
+                "WHERE queue = ? AND state = 'done' ORDER BY position",
+                (self.name,),
+            )
+            found = cursor.fetchall()
+        for position, language, title, result in found:
+            rows = {category: tuple(row) for category, row in json.loads(result).items()}
+            yield position, language, title, rows
+
+    def requeue(self, leased: bool = False) -> int:
+        """Put failed (and optionally still-leased) articles back to pending with fresh attempts."""
+        states = ["failed", "leased"] if leased else ["failed"]
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE work_items SET state = 'pending', worker = NULL, lease_until = NULL, attempts = 0, "
+                f"error = NULL, updated_at = ? WHERE queue = ? AND state IN ({', '.join('?' * len(states))})",
+                (time.time(), self.name, *states),
+            )
+            return cursor.rowcount
+
+    def close(self) -> None:
+        self.stop_heartbeat()
+        with self._lock:
+            self._db.close()
+
+
+class _Cursor:
+    """Cursor wrapper that takes SQLite-style ? placeholders on either backend."""
+
+    def __init__(self, cursor, postgres: bool):
+        self._cursor = cursor
+        self._postgres = postgres
+
+    def execute(self, sql: str, params: tuple = ()) -> None:
+        self._cursor.execute(sql.replace("?", "%s") if self._postgres else sql, params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+
+# =============================================================================
+# MERGED OUTPUT
+# =============================================================================
+
+def merge_results(queue: WorkQueue, dedup_index: Optional[DedupIndex] = None) -> dict[str, list[tuple]]:
+    """
+    Every finished article's rows by category, in queue order, minus
+    near-duplicates when an index is given.
+    """
+    merged: dict[str, list[tuple]] = {category: [] for category in QUESTION_TABLES}
+    for position, language, title, rows in queue.iter_results():
+        if dedup_index:
+            rows = dedup_index.filter_rows(rows, source=f"queue:{queue.name}:{position}")
+        for category, row in rows.items():
+            merged[category].append(row)
+    return merged
+
+
+def write_merged(output_file: str, merged: dict[str, list[tuple]], queue: WorkQueue,
+                 fmt: str = "insert", batch_size: int = 1) -> None:
+    """Write merged rows like miner.py's output (a directory of CSVs for --format csv)."""
+    if fmt == "csv":
+        for category, rows in merged.items():
+            if rows:
+                write_csv(output_file, category, rows)
+        return
+    counts = queue.counts()
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("-- Wiki Guesser - Generated Questions\n")
+        f.write(f"-- Generated on {datetime.now().isoformat()} from work queue '{queue.name}'\n")
+        f.write(f"-- Articles processed: {counts['done']}/{sum(counts.values())}\n")
+        f.write(f"-- Total questions: {sum(len(rows) for rows in merged.values())}\n\n")
+        for category, rows in merged.items():
+            if rows:
+                f.write(section_header(category, len(rows)))
+                write_table(f, category, rows, fmt, batch_size)
+
+
+def print_queue_report(queue: WorkQueue) -> None:
+    counts = queue.counts()
+    print(f"   Queue '{queue.name}': " + ", ".join(f"{counts[state]} {state}" for state in STATES))
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki Guesser distributed work queue")
+    parser.add_argument("--queue", required=True, help="SQLite file or postgresql:// DSN")
+    parser.add_argument("--name", default=DEFAULT_QUEUE_NAME, help="Queue name (several runs can share a database)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Articles per state")
+    export = sub.add_parser("export", help="Write the merged questions of finished articles")
+    export.add_argument("--output", default="seed_generated.sql", help="SQL output file (directory for csv)")
+    export.add_argument("--format", choices=FORMATS, default="insert")
+    export.add_argument("--batch-size", type=int, default=1, help="Rows per INSERT statement")
+    export.add_argument("--dedup-index", default=DEFAULT_INDEX_PATH,
+                        help="Near-duplicate index shared with miner.py (see dedup.py)")
+    export.add_argument("--no-dedup", action="store_true", help="Disable near-duplicate rejection")
+    export.add_argument("--load", action="store_true", help="Also load rows into Postgres (DATABASE_URL)")
+    export.add_argument("--database-url", default=None, help="Postgres DSN (default: $DATABASE_URL)")
+    export.add_argument("--commit-size", type=int, default=DEFAULT_COMMIT_SIZE)
+    export.add_argument("--load-method", choices=LOAD_METHODS, default="copy")
+    requeue = sub.add_parser("requeue", help="Retry failed articles")
+    requeue.add_argument("--leased", action="store_true",
+                         help="Also take back articles leased right now (only when no workers are running)")
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.queue, args.name)
+    if args.command == "stats":
+        print_queue_report(queue)
+    elif args.command == "requeue":
+        print(f"🔁 Requeued {queue.requeue(args.leased)} articles")
+    else:
+        if not queue.is_drained():
+            print("⚠️ Workers are still running; exporting the articles finished so far")
+        dedup_index = None if args.no_dedup else DedupIndex(args.dedup_index)
+        merged = merge_results(queue, dedup_index)
+        write_merged(args.output, merged, queue, args.format, args.batch_size)
+        print(f"✅ {sum(len(rows) for rows in merged.values())} questions written to {args.output}")
+        if dedup_index:
+            print(f"   Near-duplicates rejected: {dedup_index.rejected}")
+            dedup_index.close()
+        if args.load:
+            print("🐘 Loading rows into Postgres...")
+            loader = PostgresLoader(args.database_url, commit_size=args.commit_size, method=args.load_method)
+            try:
+                print_load_report(loader.load_all(merged))
+            finally:
+                loader.close()
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()